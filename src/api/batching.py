@@ -0,0 +1,274 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Priority lanes of the micro-batcher.
+REALTIME = "realtime"
+BULK = "bulk"
+PRIORITIES = [REALTIME, BULK]
+
+
+def _set_exception(future: asyncio.Future, exc: Exception):
+    """Set the exception of a future unless it is already done."""
+    if not future.done():
+        future.set_exception(exc)
+
+
+class MicroBatcher(object):
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        on_batch: Optional[Callable[[List[float]], None]] = None,
+        max_pending: Optional[Dict[str, int]] = None,
+    ):
+        """Collect concurrent requests into micro-batches.
+
+        Items submitted concurrently are grouped until `max_batch_size` items
+        are collected or `max_wait_ms` milliseconds have passed since the first
+        item of the batch arrived. The batch is then sent to `predict_fn` in a
+        worker thread, so the event loop keeps accepting requests while the
+        model runs.
+
+        Items are queued in a "realtime" or a "bulk" lane. The batches are
+        filled with the realtime items first, so bulk traffic only uses the
+        capacity left by the interactive requests. Each lane can be bounded
+        (see `submit` for what happens when it is full).
+
+        Args:
+        - predict_fn: A function that receives a list of items and returns a list of results (same order).
+        - max_batch_size: The maximum number of items in a batch.
+        - max_wait_ms: The maximum time (in milliseconds) to wait for a batch to be filled.
+        - on_batch: A function called before each batch is predicted with the time (in seconds) each of its items waited in the queue (e.g. to record metrics).
+        - max_pending: The maximum number of queued items of each lane (unbounded if not set or 0).
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be greater than 0.")
+        max_pending = max_pending or {}
+        invalid = [x for x in max_pending if x not in PRIORITIES]
+        if invalid:
+            raise ValueError(
+                f"Invalid priorities: {', '.join(invalid)}. "
+                f"They must be one of {', '.join(PRIORITIES)}."
+            )
+
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.on_batch = on_batch
+        self.max_pending = {x: max_pending.get(x, 0) for x in PRIORITIES}
+        # Moving average of the time (in seconds) to predict a batch.
+        self.batch_time = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._loop = None
+        self._queues = None
+        self._items = None
+        self._worker = None
+
+    def start(self):
+        """Start the batching worker on the running event loop.
+
+        The items left in the queues of a previous worker (e.g. one that
+        crashed) fail with a `RuntimeError` instead of waiting forever.
+        """
+        self._fail_pending(RuntimeError("The batching worker was restarted."))
+        self._loop = asyncio.get_running_loop()
+        self._queues = {
+            x: asyncio.Queue(maxsize=self.max_pending[x]) for x in PRIORITIES
+        }
+        # Number of queued items in all the lanes.
+        self._items = asyncio.Semaphore(0)
+        self._worker = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching worker."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending(RuntimeError("The batching worker was stopped."))
+        self._loop = None
+        self._queues = None
+        self._items = None
+        self._worker = None
+
+    def estimate_wait(self, priority: str = REALTIME) -> float:
+        """Estimate the time an item submitted now would wait for its result.
+
+        Args:
+        - priority: The lane of the item.
+
+        Returns:
+        - The estimated wait (in seconds), from the queued items and the average batch time.
+        """
+        if self._queues is None:
+            return 0.0
+        ahead = self._queues[REALTIME].qsize()
+        if priority == BULK:
+            ahead += self._queues[BULK].qsize()
+        return (ahead // self.max_batch_size + 1) * self.batch_time
+
+    async def submit(
+        self,
+        item: Any,
+        priority: str = REALTIME,
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """Submit an item and wait for its result.
+
+        A realtime item is rejected right away when its lane is full
+        (`asyncio.QueueFull`), while a bulk item waits for room in its lane.
+        An item with a deadline is rejected (`asyncio.TimeoutError`) if its
+        estimated wait is longer than the deadline or if the deadline
+        passes before its batch starts.
+
+        Args:
+        - item: The item to be predicted.
+        - priority: The lane of the item ("realtime" or "bulk").
+        - deadline: The maximum time (in seconds) to wait for the result (no limit if not set).
+
+        Returns:
+        - The prediction of the item.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(
+                f"Invalid priority: {priority}. "
+                f"It must be one of {', '.join(PRIORITIES)}."
+            )
+        if self._loop is not asyncio.get_running_loop() or self._worker.done():
+            self.start()
+
+        expires_at = None
+        if deadline is not None:
+            if self.estimate_wait(priority) > deadline:
+                raise asyncio.TimeoutError(
+                    f"The estimated wait is longer than {deadline} seconds."
+                )
+            expires_at = self._loop.time() + deadline
+
+        future = self._loop.create_future()
+        entry = (item, future, self._loop.time(), expires_at)
+        if priority == REALTIME:
+            self._queues[priority].put_nowait(entry)
+        else:
+            await self._queues[priority].put(entry)
+        self._items.release()
+        return await future
+
+    def _fail_pending(self, exc: Exception):
+        """Set an exception on the futures of the queued items.
+
+        Args:
+        - exc: The exception of the futures.
+        """
+        if self._queues is None:
+            return
+        same_loop = self._loop is asyncio.get_running_loop()
+        for queue in self._queues.values():
+            while not queue.empty():
+                _, future, _, _ = queue.get_nowait()
+                if future.done():
+                    continue
+                if same_loop:
+                    future.set_exception(exc)
+                elif not self._loop.is_closed():
+                    self._loop.call_soon_threadsafe(
+                        _set_exception, future, exc
+                    )
+
+    async def _get(self) -> tuple:
+        """Get the next queued item, from the realtime lane first."""
+        await self._items.acquire()
+        if not self._queues[REALTIME].empty():
+            return self._queues[REALTIME].get_nowait()
+        return self._queues[BULK].get_nowait()
+
+    async def _collect(self) -> list:
+        """Wait for the next batch of (item, future, enqueued time, expiration time) tuples."""
+        batch = [await self._get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Batching loop."""
+        while True:
+            batch = await self._collect()
+            try:
+                await self._predict(batch)
+            except asyncio.CancelledError:
+                for _, future, _, _ in batch:
+                    future.cancel()
+                raise
+            except Exception as exc:
+                # The worker dies, but the callers of the batch don't hang.
+                for _, future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                raise
+
+    async def _predict(self, batch: list):
+        """Predict a batch of (item, future, enqueued time, expiration time) tuples and set the results."""
+        # Items that can't meet their deadline are rejected.
+        now = self._loop.time()
+        for _, future, _, expires_at in batch:
+            if expires_at is not None and expires_at < now:
+                if not future.done():
+                    future.set_exception(
+                        asyncio.TimeoutError("The deadline has passed.")
+                    )
+
+        # Skip items whose callers are gone (e.g. client disconnected).
+        batch = [x for x in batch if not x[1].done()]
+        if len(batch) == 0:
+            return
+
+        if self.on_batch is not None:
+            self.on_batch([now - enqueued for _, _, enqueued, _ in batch])
+
+        start = time.perf_counter()
+        try:
+            results = await self._loop.run_in_executor(
+                self._executor,
+                self.predict_fn,
+                [x for x, _, _, _ in batch],
+            )
+        except Exception as exc:
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            elapsed = time.perf_counter() - start
+            self.batch_time = (
+                elapsed
+                if self.batch_time == 0
+                else 0.8 * self.batch_time + 0.2 * elapsed
+            )
+
+        if len(results) != len(batch):
+            exc = RuntimeError(
+                f"predict_fn returned {len(results)} results "
+                f"for a batch of {len(batch)} items."
+            )
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future, _, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
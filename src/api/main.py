@@ -1,5 +1,31 @@
-from fastapi import FastAPI
+import time
+import asyncio
+import threading
+from functools import partial
+from typing import Any, Dict, List
+from fastapi import FastAPI, HTTPException, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from .audit import AuditLogger
+from .batching import BULK, REALTIME, MicroBatcher
+from .cache import LRUCache, PostgresCache, PredictionCache, get_cache_key
+from .metrics import (
+    REJECTED,
+    CacheCollector,
+    MetricsMiddleware,
+    observe_batch,
+    observe_route_request,
+    observe_stage,
+    registry,
+)
+from .predictors import (
+    get_model_fingerprint,
+    load_predictor,
+    warmup_predictor,
+)
+from .router import Router
+from .schemas import PredictRequest, PredictResponse
 from .settings import Settings
+from .streaming import NDJSONResponse, notify_end, stream_predictions
 
 args = Settings()
 
@@ -8,9 +34,449 @@ app = FastAPI(
     description=args.API_DESCRIPTION,
     version=args.API_VERSION,
 )
+app.add_middleware(MetricsMiddleware, api_task=args.API_TASK)
+
+task_groups = args.get_task_groups()
+predictors = {}
+predictors_lock = threading.Lock()
+
+# Readiness of the instance (set by the preloading task at startup).
+readiness = {"ready": False, "error": None, "task": None}
+
+
+def get_predictor(model: str):
+    """Get the predictor of a model, loading it on first use.
+
+    Args:
+    - model: The model name (a task or "multi_task").
+
+    Returns:
+    - The predictor.
+    """
+    with predictors_lock:
+        if model not in predictors:
+            predictor = load_predictor(model, args)
+            predictor.on_stage = partial(
+                observe_stage, args.API_TASK, model, get_model_version(model)
+            )
+            predictors[model] = predictor
+        return predictors[model]
+
+
+def run_predictor(model: str, texts: List[str]):
+    """Run the predictor of a model, loading it on first use.
+
+    Args:
+    - model: The model name (a task or "multi_task").
+    - texts: The batch of texts.
+
+    Returns:
+    - The predictions of the batch.
+    """
+    return get_predictor(model)(texts)
+
+
+def preload_model(model: str):
+    """Load a model and run the warm-up batches.
+
+    Args:
+    - model: The model name (a task or "multi_task").
+    """
+    warmup_predictor(
+        get_predictor(model),
+        seq_lengths=[
+            min(x, args.API_MAX_SEQ_LENGTH)
+            for x in args.API_WARMUP_SEQ_LENGTHS
+        ],
+        batch_size=args.API_BATCH_MAX_SIZE,
+    )
+
+
+async def preload():
+    """Load and warm up the configured models, then mark the instance as ready."""
+    loop = asyncio.get_running_loop()
+    try:
+        for model in task_groups:
+            if args.get_model_path(model) is not None:
+                await loop.run_in_executor(None, preload_model, model)
+    except Exception as e:
+        readiness["error"] = f"Failed to load the models: {e}"
+        return
+    readiness["ready"] = True
+
+
+def record_batch(model: str, queue_waits: List[float]):
+    """Record the metrics of a micro-batch of a model.
+
+    Args:
+    - model: The model name (a task or "multi_task").
+    - queue_waits: The time (in seconds) each text of the batch waited in the queue.
+    """
+    observe_batch(args.API_TASK, model, get_model_version(model), queue_waits)
+
+
+batchers = {
+    model: MicroBatcher(
+        partial(run_predictor, model),
+        max_batch_size=args.API_BATCH_MAX_SIZE,
+        max_wait_ms=args.API_BATCH_TIMEOUT_MS,
+        on_batch=partial(record_batch, model),
+        max_pending=args.get_max_pending(model),
+    )
+    for model in task_groups
+}
+
+cache = (
+    PredictionCache(
+        LRUCache(max_size=args.API_CACHE_SIZE, ttl=args.API_CACHE_TTL),
+        shared=PostgresCache(
+            args.API_CACHE_POSTGRES_DSN,
+            ttl=args.API_CACHE_TTL,
+            timeout=args.API_CACHE_POSTGRES_TIMEOUT,
+        )
+        if args.API_CACHE_POSTGRES_DSN
+        else None,
+    )
+    if args.API_CACHE_SIZE > 0 or args.API_CACHE_POSTGRES_DSN
+    else None
+)
+
+audit = (
+    AuditLogger(
+        args.API_AUDIT_POSTGRES_DSN,
+        max_queue_size=args.API_AUDIT_QUEUE_SIZE,
+        batch_size=args.API_AUDIT_BATCH_SIZE,
+        flush_interval=args.API_AUDIT_FLUSH_INTERVAL,
+        spill_path=args.API_AUDIT_SPILL_PATH,
+    )
+    if args.API_AUDIT_POSTGRES_DSN
+    else None
+)
+
+router = (
+    Router(
+        args.get_route_endpoints(),
+        timeout=args.API_ROUTE_TIMEOUT,
+        max_connections=args.API_ROUTE_MAX_CONNECTIONS,
+        on_response=partial(observe_route_request, args.API_TASK),
+    )
+    if args.API_TASK == "route"
+    else None
+)
+
+registry.register(CacheCollector(args.API_TASK, lambda: cache))
+
+
+# Fingerprints of the model files, computed once per model path (a loaded
+# model doesn't change when its files do).
+model_fingerprints = {}
+
+
+def get_model_version(model: str) -> str:
+    """Get the version of a model used in the cache keys.
+
+    Args:
+    - model: The model name (a task, "multi_task" or "route").
+
+    Returns:
+    - The model version (its path, the fingerprint of its files and the settings that change its output).
+    """
+    if model == "route":
+        return f"route|{args.API_VERSION}"
+    path = args.get_model_path(model)
+    if path not in model_fingerprints:
+        model_fingerprints[path] = get_model_fingerprint(path)
+    return "|".join(
+        [
+            path,
+            model_fingerprints[path],
+            args.API_BACKEND,
+            str(args.API_THRESHOLD),
+            str(args.API_MAX_SEQ_LENGTH),
+        ]
+    )
+
+
+async def submit(model: str, text: str, priority: str = REALTIME) -> Any:
+    """Submit a text to the micro-batcher of a model, shedding the load it can't take.
+
+    Args:
+    - model: The model name (a task or "multi_task").
+    - text: The text.
+    - priority: The priority lane ("realtime" or "bulk").
+
+    Returns:
+    - The prediction of the model.
+    """
+    try:
+        return await batchers[model].submit(
+            text, priority=priority, deadline=args.get_deadline(priority)
+        )
+    except asyncio.QueueFull:
+        REJECTED.labels(args.API_TASK, model, priority, "queue_full").inc()
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many pending requests for {model}.",
+            headers={"Retry-After": "1"},
+        )
+    except asyncio.TimeoutError:
+        REJECTED.labels(args.API_TASK, model, priority, "deadline").inc()
+        raise HTTPException(
+            status_code=503,
+            detail=f"The {model} model can't answer within the deadline.",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def predict_model(
+    model: str, text: str, priority: str = REALTIME
+) -> Dict[str, Any]:
+    """Predict a single text through the cache and the micro-batcher of a model and audit it.
+
+    Args:
+    - model: The model name (a task or "multi_task").
+    - text: The text.
+    - priority: The priority lane ("realtime" or "bulk").
+
+    Returns:
+    - The prediction of each task served by the model.
+    """
+    if args.get_model_path(model) is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model {model} is not configured.",
+        )
+
+    start = time.perf_counter()
+    cached = False
+    if cache is None:
+        result = await submit(model, text, priority)
+    else:
+        # The toxic spans are offsets in the original text.
+        key = get_cache_key(
+            text,
+            model,
+            get_model_version(model),
+            normalize=model != "toxic_spans",
+        )
+        result = await cache.get(key)
+        cached = result is not None
+        if result is None:
+            result = await submit(model, text, priority)
+            await cache.set(key, result)
+
+    if model == "multi_task":
+        result = {task: result[task] for task in task_groups[model]}
+    else:
+        result = {model: result}
+
+    if audit is not None:
+        latency_ms = (time.perf_counter() - start) * 1000
+        for task, prediction in result.items():
+            audit.log(
+                text,
+                task,
+                prediction,
+                get_model_version(model),
+                latency_ms,
+                cached=cached,
+            )
+    return result
+
+
+@app.on_event("startup")
+async def startup():
+    """Open the router connection pool and start preloading the models.
+
+    The models are loaded in the background, so the healthcheck answers
+    while they are loaded and the readiness endpoint tells when the
+    instance can receive traffic.
+    """
+    readiness.update(ready=False, error=None, task=None)
+    if router is not None:
+        await router.start()
+    if cache is not None:
+        await cache.start()
+    if audit is not None:
+        await audit.start()
+
+    if args.API_PRELOAD and router is None:
+        readiness["task"] = asyncio.create_task(preload())
+    else:
+        readiness["ready"] = True
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the preloading task, the micro-batchers and close the router connection pool."""
+    if readiness["task"] is not None and not readiness["task"].done():
+        readiness["task"].cancel()
+    for batcher in batchers.values():
+        await batcher.stop()
+    if router is not None:
+        await router.close()
+    if cache is not None:
+        await cache.close()
+    if audit is not None:
+        await audit.close()
 
 
 @app.get(args.API_HEALTHCHECK_PATH)
 def health():
     """Healthcheck endpoint"""
     return {"STATUS": "OK"}
+
+
+@app.get(args.API_READINESS_PATH)
+def ready():
+    """Readiness endpoint (503 until the models are loaded and warmed up)"""
+    if not readiness["ready"]:
+        raise HTTPException(
+            status_code=503,
+            detail=readiness["error"] or "The models are not loaded yet.",
+        )
+    return {"STATUS": "READY"}
+
+
+async def route_predict(text: str) -> Dict[str, Any]:
+    """Predict a text with the task services through the cache and audit it.
+
+    Args:
+    - text: The text.
+
+    Returns:
+    - The merged toxicity report (reports with failed tasks are not cached).
+    """
+    start = time.perf_counter()
+    report = None
+    if cache is not None:
+        key = get_cache_key(
+            text, "route", get_model_version("route"), normalize=False
+        )
+        report = await cache.get(key)
+    cached = report is not None
+    if report is None:
+        report = await router.predict(text)
+        if cache is not None and "errors" not in report:
+            await cache.set(key, report)
+
+    if audit is not None:
+        latency_ms = (time.perf_counter() - start) * 1000
+        for task, prediction in report.items():
+            if task != "errors":
+                audit.log(
+                    text,
+                    task,
+                    prediction,
+                    get_model_version("route"),
+                    latency_ms,
+                    cached=cached,
+                )
+    return report
+
+
+async def predict_text(text: str, priority: str = REALTIME) -> Dict[str, Any]:
+    """Predict a text with all the tasks served by this instance.
+
+    Args:
+    - text: The text.
+    - priority: The priority lane ("realtime" or "bulk").
+
+    Returns:
+    - The toxicity report.
+    """
+    if router is not None:
+        return await route_predict(text)
+
+    results = await asyncio.gather(
+        *[predict_model(model, text, priority) for model in task_groups]
+    )
+
+    report = {}
+    for result in results:
+        report.update(result)
+    return report
+
+
+@app.get(args.API_METRICS_PATH)
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(
+        content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST
+    )
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters of the prediction cache"""
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.get_stats()}
+
+
+@app.get("/audit/stats")
+def audit_stats():
+    """Counters of the prediction audit log"""
+    if audit is None:
+        return {"enabled": False}
+    return {"enabled": True, **audit.get_stats()}
+
+
+@app.post(
+    "/predict",
+    response_model=PredictResponse,
+    response_model_exclude_none=True,
+)
+async def predict(request: PredictRequest):
+    """Predict the text with all the tasks served by this instance."""
+    return await predict_text(request.text)
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """Predict a stream of texts (NDJSON) with all the tasks served by this instance.
+
+    Each line of the request is a JSON object with the "text" (and an
+    optional "id"). The predictions are streamed back as NDJSON in the
+    same order, with an "error" field for the invalid lines. The texts
+    go through the bulk lane of the micro-batchers, so they only use the
+    capacity left by the real-time requests.
+    """
+    body_read = asyncio.Event()
+    return NDJSONResponse(
+        stream_predictions(
+            notify_end(request.stream(), body_read),
+            partial(predict_text, priority=BULK),
+            max_in_flight=args.API_STREAM_MAX_IN_FLIGHT,
+        ),
+        body_read=body_read,
+    )
+
+
+def add_task_endpoint(task: str):
+    """Add the prediction endpoint of a single task.
+
+    Args:
+    - task: The model task.
+    """
+
+    model = next(m for m, tasks in task_groups.items() if task in tasks)
+
+    async def predict_single_task(request: PredictRequest):
+        result = await predict_model(model, request.text)
+        return {task: result[task]}
+
+    predict_single_task.__doc__ = f"Predict the text with the {task} task."
+
+    app.add_api_route(
+        f"/{task}/predict",
+        predict_single_task,
+        methods=["POST"],
+        response_model=PredictResponse,
+        response_model_exclude_none=True,
+        name=f"predict_{task}",
+    )
+
+
+for task in args.get_tasks():
+    add_task_endpoint(task)
@@ -0,0 +1,228 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# The API metrics are kept in their own registry (without the default
+# process and platform collectors).
+registry = CollectorRegistry(auto_describe=True)
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+REQUESTS = Counter(
+    "api_requests",
+    "Number of HTTP requests.",
+    ["api_task", "method", "path", "status"],
+    registry=registry,
+)
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "Latency of the HTTP requests.",
+    ["api_task", "method", "path"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+QUEUE_WAIT = Histogram(
+    "api_batch_queue_wait_seconds",
+    "Time the texts wait in the micro-batcher queue.",
+    ["api_task", "model", "model_version"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+BATCH_SIZE = Histogram(
+    "api_batch_size",
+    "Number of texts of each micro-batch.",
+    ["api_task", "model", "model_version"],
+    buckets=BATCH_SIZE_BUCKETS,
+    registry=registry,
+)
+STAGE_LATENCY = Histogram(
+    "api_stage_duration_seconds",
+    "Latency of each stage of a micro-batch (tokenize, forward or postprocess).",
+    ["api_task", "model", "model_version", "stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+REJECTED = Counter(
+    "api_rejected_texts",
+    "Number of texts rejected by the admission control.",
+    ["api_task", "model", "priority", "reason"],
+    registry=registry,
+)
+ROUTE_LATENCY = Histogram(
+    "api_route_request_duration_seconds",
+    "Latency of the requests sent to each task service (route task).",
+    ["api_task", "task", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+
+
+class MetricsMiddleware(object):
+    def __init__(self, app: Callable, api_task: str):
+        """ASGI middleware that counts the requests and measures their latency.
+
+        The latency includes the whole response body (e.g. streamed
+        responses). Requests to unknown paths are labelled "other", so
+        scanners can't create new time series.
+
+        Args:
+        - app: The ASGI application.
+        - api_task: The task served by the API (API_TASK).
+        """
+        self.app = app
+        self.api_task = api_task
+        self._paths = None
+
+    def get_path(self, scope: Dict[str, Any]) -> str:
+        """Get the path label of a request.
+
+        Args:
+        - scope: The ASGI scope.
+
+        Returns:
+        - The request path if it is a route of the application, otherwise "other".
+        """
+        if self._paths is None:
+            self._paths = {
+                getattr(route, "path", None) for route in scope["app"].routes
+            }
+        return scope["path"] if scope["path"] in self._paths else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = self.get_path(scope)
+            REQUEST_LATENCY.labels(
+                self.api_task, scope["method"], path
+            ).observe(time.perf_counter() - start)
+            REQUESTS.labels(
+                self.api_task, scope["method"], path, status["code"]
+            ).inc()
+
+
+def observe_batch(
+    api_task: str, model: str, model_version: str, queue_waits: List[float]
+):
+    """Record the size and the queue wait times of a micro-batch.
+
+    Args:
+    - api_task: The task served by the API (API_TASK).
+    - model: The model name (a task or "multi_task").
+    - model_version: The model version.
+    - queue_waits: The time (in seconds) each text of the batch waited in the queue.
+    """
+    BATCH_SIZE.labels(api_task, model, model_version).observe(len(queue_waits))
+    histogram = QUEUE_WAIT.labels(api_task, model, model_version)
+    for wait in queue_waits:
+        histogram.observe(wait)
+
+
+def observe_stage(
+    api_task: str, model: str, model_version: str, stage: str, seconds: float
+):
+    """Record the latency of a stage of a micro-batch.
+
+    Args:
+    - api_task: The task served by the API (API_TASK).
+    - model: The model name (a task or "multi_task").
+    - model_version: The model version.
+    - stage: The stage ("tokenize", "forward" or "postprocess").
+    - seconds: The latency (in seconds).
+    """
+    STAGE_LATENCY.labels(api_task, model, model_version, stage).observe(
+        seconds
+    )
+
+
+def observe_route_request(
+    api_task: str, task: str, seconds: float, error: Optional[str]
+):
+    """Record the latency of a request sent to a task service.
+
+    Args:
+    - api_task: The task served by the API (API_TASK).
+    - task: The task of the service.
+    - seconds: The latency (in seconds).
+    - error: The error message (None if the request succeeded).
+    """
+    ROUTE_LATENCY.labels(
+        api_task, task, "ok" if error is None else "error"
+    ).observe(seconds)
+
+
+class CacheCollector(object):
+    def __init__(self, api_task: str, get_cache: Callable[[], Any]):
+        """Collector of the prediction cache counters (read at scrape time).
+
+        Args:
+        - api_task: The task served by the API (API_TASK).
+        - get_cache: A function that returns the prediction cache (or None if it is disabled).
+        """
+        self.api_task = api_task
+        self.get_cache = get_cache
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        cache = self.get_cache()
+        if cache is None:
+            return
+
+        stats = cache.get_stats()
+        lookups = CounterMetricFamily(
+            "api_cache_lookups",
+            "Number of prediction cache lookups.",
+            labels=["api_task", "tier", "result"],
+        )
+        for tier in ["local", "shared"]:
+            if tier in stats:
+                for result, key in [("hit", "hits"), ("miss", "misses")]:
+                    lookups.add_metric(
+                        [self.api_task, tier, result], stats[tier][key]
+                    )
+        yield lookups
+
+        hit_rate = GaugeMetricFamily(
+            "api_cache_hit_ratio",
+            "Fraction of the lookups served by any cache tier.",
+            labels=["api_task"],
+        )
+        hit_rate.add_metric([self.api_task], stats["hit_rate"])
+        yield hit_rate
+
+        size = GaugeMetricFamily(
+            "api_cache_size",
+            "Number of predictions in the in-process cache.",
+            labels=["api_task"],
+        )
+        size.add_metric([self.api_task], stats["local"]["size"])
+        yield size
@@ -0,0 +1,630 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from src.ml.inference import (
+    get_problem_type,
+    get_tasks,
+    postprocess,
+    postprocess_tasks,
+)
+from src.ml.metrics.thresholds import get_task_thresholds, get_threshold
+from .settings import Settings
+
+ONNX_FILE_NAME = "model.onnx"
+TORCHSCRIPT_FILE_NAME = "model.torchscript.pt"
+
+
+@contextmanager
+def measure_stage(predictor: Any, stage: str):
+    """Measure a stage of a batch and report it to the `on_stage` callback of the predictor.
+
+    Args:
+    - predictor: The predictor (its `on_stage` attribute receives the stage and its latency in seconds).
+    - stage: The stage ("tokenize", "forward" or "postprocess").
+    """
+    start = time.perf_counter()
+    yield
+    if predictor.on_stage is not None:
+        predictor.on_stage(stage, time.perf_counter() - start)
+
+
+def get_model_file(model_name_or_path: str, file_name: str) -> str:
+    """Get the local path of a file of a model.
+
+    Args:
+    - model_name_or_path: The model directory or Hugging Face Hub ID.
+    - file_name: The file name (e.g. "model.onnx").
+
+    Returns:
+    - The local path of the file (downloaded from the Hub if needed).
+    """
+    if os.path.isdir(model_name_or_path):
+        return os.path.join(model_name_or_path, file_name)
+
+    from huggingface_hub import hf_hub_download
+
+    return hf_hub_download(model_name_or_path, file_name)
+
+
+def get_model_fingerprint(model_name_or_path: str) -> str:
+    """Get a string that changes when the files of a model change.
+
+    Args:
+    - model_name_or_path: The model directory or Hugging Face Hub ID.
+
+    Returns:
+    - For model directories, a hash of the name, size and modification time of their files (config, weights, thresholds.json, etc.); for Hub IDs, the commit hash of the resolved snapshot (empty if it can't be resolved).
+    """
+    if os.path.isdir(model_name_or_path):
+        stats = []
+        for entry in sorted(
+            os.scandir(model_name_or_path), key=lambda x: x.name
+        ):
+            if entry.is_file():
+                stat = entry.stat()
+                stats.append(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.sha1("\n".join(stats).encode()).hexdigest()[:16]
+
+    from huggingface_hub import hf_hub_download
+
+    try:
+        path = hf_hub_download(model_name_or_path, "config.json")
+    except Exception:
+        return ""
+    # Hub files are cached in snapshots/<commit hash>/.
+    return os.path.basename(os.path.dirname(path))
+
+
+class SequenceClassificationPredictor(object):
+    # Called with the stage and the latency of each batch (see `measure_stage`).
+    on_stage: Optional[Callable[[str, float], None]] = None
+
+    def __init__(
+        self,
+        model_name_or_path: str,
+        max_seq_length: int = 512,
+        threshold: float = 0.5,
+        quantized: bool = False,
+        shared_weights: bool = False,
+        shared_weights_dir: Optional[str] = None,
+    ):
+        """Batched predictor for the fine-tuned BERT classifiers.
+
+        Args:
+        - model_name_or_path: The path or Hugging Face Hub ID of the model.
+        - max_seq_length: The maximum sequence length.
+        - threshold: The threshold to use to convert the model's output to a label.
+        - quantized: Whether to load the dynamic int8 weights (CPU only).
+        - shared_weights: Whether to memory-map the weights, so they are shared by the worker processes (CPU only).
+        - shared_weights_dir: The directory of the converted weights of models without a model.safetensors file.
+        """
+        import torch
+        from transformers import AutoTokenizer
+
+        self.max_seq_length = max_seq_length
+        self.threshold = threshold
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
+
+        if quantized:
+            from src.ml.models.quantization import (
+                QUANTIZED_FILE_NAME,
+                load_quantized_model,
+            )
+
+            self.device = torch.device("cpu")
+            self.model = load_quantized_model(
+                model_name_or_path,
+                model_class=self.get_model_class(),
+                weights_path=get_model_file(
+                    model_name_or_path, QUANTIZED_FILE_NAME
+                ),
+            )
+        elif shared_weights:
+            from src.ml.models.shared import load_shared_model
+
+            self.device = torch.device("cpu")
+            self.model = load_shared_model(
+                model_name_or_path,
+                model_class=self.get_model_class(),
+                cache_dir=shared_weights_dir,
+            )
+        else:
+            self.device = torch.device(
+                "cuda" if torch.cuda.is_available() else "cpu"
+            )
+            self.model = (
+                self.get_model_class()
+                .from_pretrained(model_name_or_path)
+                .to(self.device)
+            )
+        self.model.eval()
+        self.labels = self.model.config.id2label
+        self.problem_type = get_problem_type(
+            self.model.config.problem_type, self.model.config.num_labels
+        )
+        self.threshold = get_threshold(
+            model_name_or_path, self.labels, self.problem_type, threshold
+        )
+
+    def get_model_class(self):
+        """Get the model class (torch is only imported by the PyTorch backends)."""
+        from transformers import AutoModelForSequenceClassification
+
+        return AutoModelForSequenceClassification
+
+    def forward(self, texts: List[str]) -> Union[np.ndarray, List[np.ndarray]]:
+        """Run a single padded forward pass over a batch of texts.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - The model logits (the logits of each task for multi-task models).
+        """
+        import torch
+
+        with measure_stage(self, "tokenize"):
+            encoding = self.tokenizer(
+                texts,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="pt",
+            ).to(self.device)
+
+        # Copying the logits to the CPU waits for the GPU kernels.
+        with measure_stage(self, "forward"), torch.inference_mode():
+            logits = self.model(**encoding).logits
+            if isinstance(logits, torch.Tensor):
+                return logits.cpu().numpy()
+            return [x.cpu().numpy() for x in logits]
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Predict a batch of texts.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - A list with the labels and probabilities of each text.
+        """
+        logits = self.forward(texts)
+        with measure_stage(self, "postprocess"):
+            return postprocess(
+                logits, self.labels, self.problem_type, self.threshold
+            )
+
+
+class MultiTaskPredictor(SequenceClassificationPredictor):
+    def __init__(
+        self,
+        model_name_or_path: str,
+        max_seq_length: int = 512,
+        threshold: float = 0.5,
+        quantized: bool = False,
+        shared_weights: bool = False,
+        shared_weights_dir: Optional[str] = None,
+    ):
+        """Batched predictor for the multi-task model.
+
+        All the classification tasks are predicted from one encoder forward pass.
+
+        Args:
+        - model_name_or_path: The path or Hugging Face Hub ID of the model.
+        - max_seq_length: The maximum sequence length.
+        - threshold: The threshold to use to convert the model's output to a label.
+        - quantized: Whether to load the dynamic int8 weights (CPU only).
+        - shared_weights: Whether to memory-map the weights, so they are shared by the worker processes (CPU only).
+        - shared_weights_dir: The directory of the converted weights of models without a model.safetensors file.
+        """
+        super().__init__(
+            model_name_or_path,
+            max_seq_length,
+            threshold,
+            quantized,
+            shared_weights,
+            shared_weights_dir,
+        )
+        self.tasks = get_tasks(self.model.tasks)
+        self.threshold = get_task_thresholds(
+            model_name_or_path, self.tasks, threshold
+        )
+
+    def get_model_class(self):
+        """Get the model class (torch is only imported by the PyTorch backends)."""
+        from src.ml.models.bert import (
+            ToxicityMultiTaskForSequenceClassification,
+        )
+
+        return ToxicityMultiTaskForSequenceClassification
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Predict a batch of texts with all the tasks.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - A list with the results of each task for each text.
+        """
+        logits = self.forward(texts)
+        with measure_stage(self, "postprocess"):
+            return postprocess_tasks(logits, self.tasks, self.threshold)
+
+
+class OnnxSequenceClassificationPredictor(object):
+    # Called with the stage and the latency of each batch (see `measure_stage`).
+    on_stage: Optional[Callable[[str, float], None]] = None
+
+    def __init__(
+        self,
+        model_name_or_path: str,
+        max_seq_length: int = 512,
+        threshold: float = 0.5,
+    ):
+        """Batched ONNX Runtime predictor for the exported BERT classifiers.
+
+        It expects the `model.onnx` graph written at the end of training
+        next to the tokenizer and config files.
+
+        Args:
+        - model_name_or_path: The path or Hugging Face Hub ID of the model.
+        - max_seq_length: The maximum sequence length.
+        - threshold: The threshold to use to convert the model's output to a label.
+        """
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.max_seq_length = max_seq_length
+        self.threshold = threshold
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
+        self.config = AutoConfig.from_pretrained(model_name_or_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        self.session = ort.InferenceSession(
+            get_model_file(model_name_or_path, ONNX_FILE_NAME),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = [x.name for x in self.session.get_inputs()]
+
+        self.labels = self.config.id2label
+        self.problem_type = get_problem_type(
+            self.config.problem_type, self.config.num_labels
+        )
+        self.threshold = get_threshold(
+            model_name_or_path, self.labels, self.problem_type, threshold
+        )
+
+    def forward(self, texts: List[str]) -> List[np.ndarray]:
+        """Run a single padded forward pass over a batch of texts.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - The graph outputs (the logits of each task).
+        """
+        with measure_stage(self, "tokenize"):
+            encoding = self.tokenizer(
+                texts,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_token_type_ids=True,
+                return_tensors="np",
+            )
+            inputs = {
+                name: encoding[name].astype(np.int64)
+                for name in self.input_names
+            }
+
+        with measure_stage(self, "forward"):
+            return self.session.run(None, inputs)
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Predict a batch of texts.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - A list with the labels and probabilities of each text.
+        """
+        logits = self.forward(texts)[0]
+        with measure_stage(self, "postprocess"):
+            return postprocess(
+                logits, self.labels, self.problem_type, self.threshold
+            )
+
+
+class OnnxMultiTaskPredictor(OnnxSequenceClassificationPredictor):
+    def __init__(
+        self,
+        model_name_or_path: str,
+        max_seq_length: int = 512,
+        threshold: float = 0.5,
+    ):
+        """Batched ONNX Runtime predictor for the exported multi-task model.
+
+        Args:
+        - model_name_or_path: The path or Hugging Face Hub ID of the model.
+        - max_seq_length: The maximum sequence length.
+        - threshold: The threshold to use to convert the model's output to a label.
+        """
+        super().__init__(model_name_or_path, max_seq_length, threshold)
+        self.tasks = get_tasks(self.config.tasks)
+        self.threshold = get_task_thresholds(
+            model_name_or_path, self.tasks, threshold
+        )
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Predict a batch of texts with all the tasks.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - A list with the results of each task for each text.
+        """
+        logits = self.forward(texts)
+        with measure_stage(self, "postprocess"):
+            return postprocess_tasks(logits, self.tasks, self.threshold)
+
+
+class TorchScriptSequenceClassificationPredictor(object):
+    # Called with the stage and the latency of each batch (see `measure_stage`).
+    on_stage: Optional[Callable[[str, float], None]] = None
+
+    def __init__(
+        self,
+        model_name_or_path: str,
+        max_seq_length: int = 512,
+        threshold: float = 0.5,
+    ):
+        """Batched predictor for the TorchScript modules of the BERT classifiers.
+
+        It expects the `model.torchscript.pt` module written at the end of
+        training next to the `tokenizer.json` and config files. The module
+        is an inference-only graph and the texts are tokenized with the
+        `tokenizers` library, so `transformers` is never imported.
+
+        Args:
+        - model_name_or_path: The path or Hugging Face Hub ID of the model.
+        - max_seq_length: The maximum sequence length.
+        - threshold: The threshold to use to convert the model's output to a label.
+        """
+        import torch
+        from tokenizers import Tokenizer
+
+        with open(get_model_file(model_name_or_path, "config.json")) as f:
+            self.config = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(
+            get_model_file(model_name_or_path, "tokenizer.json")
+        )
+        self.tokenizer.enable_truncation(max_seq_length)
+        pad_id = self.config.get("pad_token_id") or 0
+        self.tokenizer.enable_padding(
+            pad_id=pad_id, pad_token=self.tokenizer.id_to_token(pad_id)
+        )
+
+        self.model = torch.jit.load(
+            get_model_file(model_name_or_path, TORCHSCRIPT_FILE_NAME),
+            map_location="cpu",
+        ).eval()
+
+        # Like `transformers`, the default labels aren't saved in the config.
+        id2label = self.config.get("id2label") or {
+            i: f"LABEL_{i}" for i in range(self.config.get("num_labels", 2))
+        }
+        self.labels = {int(k): v for k, v in id2label.items()}
+        self.problem_type = get_problem_type(
+            self.config.get("problem_type"), len(self.labels)
+        )
+        self.threshold = get_threshold(
+            model_name_or_path, self.labels, self.problem_type, threshold
+        )
+
+    def forward(self, texts: List[str]) -> List[np.ndarray]:
+        """Run a single padded forward pass over a batch of texts.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - The module outputs (the logits of each task).
+        """
+        import torch
+
+        with measure_stage(self, "tokenize"):
+            encodings = self.tokenizer.encode_batch(texts)
+            inputs = [
+                torch.from_numpy(
+                    np.array([getattr(x, name) for x in encodings], np.int64)
+                )
+                for name in ["ids", "attention_mask", "type_ids"]
+            ]
+
+        with measure_stage(self, "forward"), torch.inference_mode():
+            return [x.numpy() for x in self.model(*inputs)]
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Predict a batch of texts.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - A list with the labels and probabilities of each text.
+        """
+        logits = self.forward(texts)[0]
+        with measure_stage(self, "postprocess"):
+            return postprocess(
+                logits, self.labels, self.problem_type, self.threshold
+            )
+
+
+class TorchScriptMultiTaskPredictor(
+    TorchScriptSequenceClassificationPredictor
+):
+    def __init__(
+        self,
+        model_name_or_path: str,
+        max_seq_length: int = 512,
+        threshold: float = 0.5,
+    ):
+        """Batched predictor for the TorchScript module of the multi-task model.
+
+        Args:
+        - model_name_or_path: The path or Hugging Face Hub ID of the model.
+        - max_seq_length: The maximum sequence length.
+        - threshold: The threshold to use to convert the model's output to a label.
+        """
+        super().__init__(model_name_or_path, max_seq_length, threshold)
+        self.tasks = get_tasks(self.config["tasks"])
+        self.threshold = get_task_thresholds(
+            model_name_or_path, self.tasks, threshold
+        )
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Predict a batch of texts with all the tasks.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - A list with the results of each task for each text.
+        """
+        logits = self.forward(texts)
+        with measure_stage(self, "postprocess"):
+            return postprocess_tasks(logits, self.tasks, self.threshold)
+
+
+class ToxicSpansPredictor(object):
+    # Called with the stage and the latency of each batch (see `measure_stage`).
+    on_stage: Optional[Callable[[str, float], None]] = None
+
+    def __init__(self, model_path: str):
+        """Batched predictor for the toxic spans detection model.
+
+        Args:
+        - model_path: The path of the spaCy pipeline.
+        """
+        import spacy
+
+        self.nlp = spacy.load(model_path)
+
+    def __call__(self, texts: List[str]) -> List[List[int]]:
+        """Predict the toxic spans of a batch of texts.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - The toxic character offsets of each text.
+        """
+        # The spaCy pipeline tokenizes and predicts in one pass.
+        with measure_stage(self, "forward"):
+            docs = list(self.nlp.pipe(texts))
+
+        with measure_stage(self, "postprocess"):
+            results = []
+            for doc in docs:
+                spans = []
+                for ent in doc.ents:
+                    spans.extend(range(ent.start_char, ent.end_char))
+                results.append(spans)
+            return results
+
+
+def warmup_predictor(
+    predictor: Callable[[List[str]], List[Any]],
+    seq_lengths: Sequence[int],
+    batch_size: int = 32,
+):
+    """Run synthetic batches through a predictor.
+
+    The first batches pay for the lazy initialization of the kernels (and
+    their memory pools) of each input shape, so they are run before the
+    predictor receives traffic.
+
+    Args:
+    - predictor: The predictor.
+    - seq_lengths: The (approximate) number of tokens of the texts of each batch.
+    - batch_size: The number of texts of each batch.
+    """
+    for seq_length in seq_lengths:
+        predictor([" ".join(["a"] * seq_length)] * batch_size)
+
+
+def load_predictor(task: str, settings: Settings):
+    """Load the predictor of a task.
+
+    Args:
+    - task: The model task.
+    - settings: The API settings.
+
+    Returns:
+    - The predictor.
+    """
+    model_path = settings.get_model_path(task)
+    if model_path is None:
+        raise ValueError(f"API_{task.upper()}_MODEL must be set.")
+
+    if task == "toxic_spans":
+        return ToxicSpansPredictor(model_path)
+
+    if settings.API_BACKEND == "torchscript":
+        predictor_class = (
+            TorchScriptMultiTaskPredictor
+            if task == "multi_task"
+            else TorchScriptSequenceClassificationPredictor
+        )
+        return predictor_class(
+            model_path,
+            max_seq_length=settings.API_MAX_SEQ_LENGTH,
+            threshold=settings.API_THRESHOLD,
+        )
+
+    if settings.API_BACKEND == "onnx":
+        predictor_class = (
+            OnnxMultiTaskPredictor
+            if task == "multi_task"
+            else OnnxSequenceClassificationPredictor
+        )
+        return predictor_class(
+            model_path,
+            max_seq_length=settings.API_MAX_SEQ_LENGTH,
+            threshold=settings.API_THRESHOLD,
+        )
+
+    predictor_class = (
+        MultiTaskPredictor
+        if task == "multi_task"
+        else SequenceClassificationPredictor
+    )
+    return predictor_class(
+        model_path,
+        max_seq_length=settings.API_MAX_SEQ_LENGTH,
+        threshold=settings.API_THRESHOLD,
+        quantized=settings.API_BACKEND == "int8",
+        shared_weights=settings.API_SHARED_WEIGHTS,
+        shared_weights_dir=settings.API_SHARED_WEIGHTS_DIR,
+    )
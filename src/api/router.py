@@ -0,0 +1,124 @@
+import time
+import asyncio
+import httpx
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class Router(object):
+    def __init__(
+        self,
+        endpoints: Dict[str, str],
+        timeout: float = 5.0,
+        max_connections: int = 100,
+        on_response: Optional[
+            Callable[[str, float, Optional[str]], None]
+        ] = None,
+    ):
+        """Fan-out router for the task services.
+
+        Each request is sent concurrently to all the task endpoints through a
+        shared keep-alive connection pool, so the end-to-end latency is bounded
+        by the slowest service instead of the sum of all of them.
+
+        Args:
+        - endpoints: The endpoint of each model task.
+        - timeout: The timeout (in seconds) of each endpoint request.
+        - max_connections: The maximum number of connections in the pool.
+        - on_response: A function called after each endpoint request with the task, the latency (in seconds) and the error message (or None).
+        """
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.on_response = on_response
+        self._client = None
+
+    async def start(self):
+        """Open the HTTP connection pool."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, limits=self.limits
+            )
+
+    async def close(self):
+        """Close the HTTP connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _send(
+        self, task: str, url: str, payload: Dict[str, Any]
+    ) -> Tuple[str, Any, str]:
+        """Send the payload to a task endpoint.
+
+        Args:
+        - task: The model task.
+        - url: The endpoint URL.
+        - payload: The JSON payload.
+
+        Returns:
+        - A tuple with the task, the task result (or None) and the error message (or None).
+        """
+        try:
+            response = await self._client.post(url, json=payload)
+            response.raise_for_status()
+            body = response.json()
+            if not isinstance(body, dict):
+                return task, None, "Invalid response: not a JSON object."
+            return task, body.get(task), None
+        except httpx.TimeoutException:
+            return task, None, f"Timeout after {self.timeout} seconds."
+        except httpx.HTTPStatusError as exc:
+            return task, None, f"HTTP {exc.response.status_code}."
+        except (httpx.HTTPError, ValueError) as exc:
+            return task, None, f"{type(exc).__name__}: {exc}"
+
+    async def _request(
+        self, task: str, url: str, payload: Dict[str, Any]
+    ) -> Tuple[str, Any, str]:
+        """Send the payload to a task endpoint and report its latency.
+
+        Args:
+        - task: The model task.
+        - url: The endpoint URL.
+        - payload: The JSON payload.
+
+        Returns:
+        - A tuple with the task, the task result (or None) and the error message (or None).
+        """
+        start = time.perf_counter()
+        response = await self._send(task, url, payload)
+        if self.on_response is not None:
+            self.on_response(task, time.perf_counter() - start, response[2])
+        return response
+
+    async def predict(self, text: str) -> Dict[str, Any]:
+        """Predict the text with all the task services.
+
+        Args:
+        - text: The text.
+
+        Returns:
+        - The merged toxicity report. Failed tasks are reported in "errors".
+        """
+        await self.start()
+
+        responses = await asyncio.gather(
+            *[
+                self._request(task, url, {"text": text})
+                for task, url in self.endpoints.items()
+            ]
+        )
+
+        report, errors = {}, {}
+        for task, result, error in responses:
+            if error is not None:
+                errors[task] = error
+            else:
+                report[task] = result
+
+        if errors:
+            report["errors"] = errors
+        return report
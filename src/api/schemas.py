@@ -0,0 +1,34 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class PredictRequest(BaseModel):
+    text: str = Field(..., description="Text to be analyzed")
+
+
+class ClassificationResult(BaseModel):
+    labels: List[str] = Field(..., description="Predicted labels")
+    probabilities: Dict[str, float] = Field(
+        ..., description="Probability of each label"
+    )
+
+
+class PredictResponse(BaseModel):
+    toxicity: Optional[ClassificationResult] = Field(
+        None, description="Toxicity classification"
+    )
+    toxicity_target: Optional[ClassificationResult] = Field(
+        None, description="Toxicity target classification"
+    )
+    toxicity_target_type: Optional[ClassificationResult] = Field(
+        None, description="Toxicity target type identification"
+    )
+    toxicity_type: Optional[ClassificationResult] = Field(
+        None, description="Toxicity type detection"
+    )
+    toxic_spans: Optional[List[int]] = Field(
+        None, description="Character offsets of the toxic spans"
+    )
+    errors: Optional[Dict[str, str]] = Field(
+        None, description="Error message of each task that failed"
+    )
@@ -0,0 +1,181 @@
+import json
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+# Maximum size (in bytes) of a line of the request stream.
+MAX_LINE_SIZE = 1 << 20
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_size: int = MAX_LINE_SIZE
+) -> AsyncIterator[bytes]:
+    """Split a stream of chunks into lines.
+
+    Only the current line is kept in memory, whatever the size of the
+    stream. Empty lines are skipped.
+
+    Args:
+    - chunks: The chunks of the stream (e.g. `Request.stream()`).
+    - max_line_size: The maximum size (in bytes) of a line.
+
+    Returns:
+    - The lines (without the line break).
+    """
+    # Only the new chunk is split: the pieces of an incomplete line are
+    # joined once, when its line break arrives.
+    error = f"Line too long: more than {max_line_size} bytes."
+    pieces, size = [], 0
+    async for chunk in chunks:
+        lines = chunk.split(b"\n")
+        if len(lines) > 1:
+            lines[0] = b"".join(pieces) + lines[0]
+            for line in lines[:-1]:
+                # A whole line can arrive in a single chunk.
+                if len(line) > max_line_size:
+                    raise ValueError(error)
+                if line.strip():
+                    yield line
+            pieces, size = [], 0
+        pieces.append(lines[-1])
+        size += len(lines[-1])
+        if size > max_line_size:
+            raise ValueError(error)
+
+    line = b"".join(pieces)
+    if line.strip():
+        yield line
+
+
+async def notify_end(
+    chunks: AsyncIterator[bytes], end: asyncio.Event
+) -> AsyncIterator[bytes]:
+    """Set an event when a stream of chunks is exhausted (or fails).
+
+    Args:
+    - chunks: The chunks of the stream (e.g. `Request.stream()`).
+    - end: The event.
+
+    Returns:
+    - The chunks.
+    """
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        end.set()
+
+
+class NDJSONResponse(StreamingResponse):
+    media_type = "application/x-ndjson"
+
+    def __init__(
+        self, content: AsyncIterator[bytes], body_read: asyncio.Event
+    ):
+        """Streaming response whose content is computed while the request body is read.
+
+        `StreamingResponse` reads the ASGI `receive` channel during the whole
+        response to detect disconnections, which would take the body
+        messages that the content is still reading. This response only
+        listens for disconnections after the body was read; before that, a
+        disconnection makes `Request.stream()` fail.
+
+        Args:
+        - content: The content (it reads the request body).
+        - body_read: The event set when the request body was read (see `notify_end`).
+        """
+        super().__init__(content)
+        self.body_read = body_read
+
+    async def listen_for_disconnect(self, receive):
+        await self.body_read.wait()
+        await super().listen_for_disconnect(receive)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        except ClientDisconnect:
+            pass
+
+
+async def predict_line(
+    line: bytes, predict_fn: Callable[[str], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """Predict a line of the request stream.
+
+    Args:
+    - line: The JSON object with the "text" (and an optional "id", returned with the prediction).
+    - predict_fn: The function that predicts a text.
+
+    Returns:
+    - The prediction, or the error message of an invalid line or failed prediction.
+    """
+    try:
+        item = json.loads(line)
+        if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+            raise ValueError("Each line must be a JSON object with a text.")
+    except ValueError as e:
+        return {"error": f"Invalid line: {e}"}
+
+    result = {"id": item["id"]} if "id" in item else {}
+    try:
+        result.update(await predict_fn(item["text"]))
+    except Exception as e:
+        result["error"] = getattr(e, "detail", None) or str(e)
+    return result
+
+
+async def stream_predictions(
+    chunks: AsyncIterator[bytes],
+    predict_fn: Callable[[str], Awaitable[Dict[str, Any]]],
+    max_in_flight: int = 128,
+    max_line_size: int = MAX_LINE_SIZE,
+) -> AsyncIterator[bytes]:
+    """Predict a NDJSON stream and return the predictions as a NDJSON stream.
+
+    The texts are submitted as they are read, so they fill the
+    micro-batches while the previous predictions are serialized and sent.
+    At most `max_in_flight` predictions are pending and they are returned
+    in the input order, so the memory doesn't grow with the stream.
+
+    Args:
+    - chunks: The chunks of the request stream.
+    - predict_fn: The function that predicts a text.
+    - max_in_flight: The maximum number of pending predictions.
+    - max_line_size: The maximum size (in bytes) of a line.
+
+    Returns:
+    - The predictions (one JSON object per line).
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be greater than 0.")
+
+    pending = deque()
+    try:
+        try:
+            async for line in iter_lines(chunks, max_line_size):
+                pending.append(
+                    asyncio.ensure_future(predict_line(line, predict_fn))
+                )
+                if len(pending) >= max_in_flight:
+                    yield _dumps(await pending.popleft())
+        except ValueError as e:
+            # The status was already sent, so the error is the last line.
+            while pending:
+                yield _dumps(await pending.popleft())
+            yield _dumps({"error": str(e)})
+            return
+
+        while pending:
+            yield _dumps(await pending.popleft())
+    finally:
+        # The client is gone: drop the predictions that weren't sent.
+        for task in pending:
+            task.cancel()
+
+
+def _dumps(result: Dict[str, Any]) -> bytes:
+    """Serialize a prediction as a NDJSON line."""
+    return json.dumps(result, ensure_ascii=False).encode() + b"\n"
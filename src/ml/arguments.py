@@ -204,6 +204,78 @@ class TrainScriptArguments:
         },
     )
 
+    n_process: Optional[int] = field(
+        default=1,
+        metadata={
+            "help": (
+                "The number of processes used by spaCy to predict. "
+                "This is only used in ToxicSpansDetection model."
+            )
+        },
+    )
+
+    group_by_length: Optional[bool] = field(
+        default=False,
+        metadata={
+            "help": (
+                "Whether to group the examples of similar length in the same batch "
+                "and pad each batch to its longest example (training, evaluation and prediction). "
+                "This is only used in the BERT-based models."
+            )
+        },
+    )
+
+    preprocessing_num_workers: Optional[int] = field(
+        default=None,
+        metadata={
+            "help": "The number of processes used to compute the dataset statistics."
+        },
+    )
+
+    tokenized_cache_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": (
+                "The directory where the tokenized datasets are cached and reused across runs "
+                "(e.g. a directory synced with S3 shared by the hyperparameter tuning trials). "
+                "If not set, the cache is disabled."
+            )
+        },
+    )
+
+    export_onnx: Optional[bool] = field(
+        default=False,
+        metadata={
+            "help": (
+                "Whether to export the trained model to ONNX (model.onnx in model_dir). "
+                "This is only used in the BERT-based models."
+            )
+        },
+    )
+
+    export_torchscript: Optional[bool] = field(
+        default=False,
+        metadata={
+            "help": (
+                "Whether to export the trained model to a traced TorchScript module "
+                "(model.torchscript.pt and tokenizer.json in model_dir), served by the 'torchscript' API backend. "
+                "This is only used in the BERT-based models."
+            )
+        },
+    )
+
+    tune_thresholds: Optional[bool] = field(
+        default=False,
+        metadata={
+            "help": (
+                "Whether to tune the threshold of each label on the validation set (thresholds.json in model_dir), "
+                "whatever the eval_dataset, so the test scores are not biased. "
+                "It is skipped if the validation set is concatenated to the training set (concat_validation_set). "
+                "This is only used in the multi-label models."
+            )
+        },
+    )
+
     def __post_init__(self):
         if self.eval_dataset not in ["test", "validation"]:
             raise ValueError(
@@ -335,3 +407,184 @@ class NotebookArguments:
             os.environ["MLFLOW_TAGS"] = self.mlflow_tags
         elif self.mlflow_tags is not None:
             raise ValueError("The mlflow_tags parameter must be a dictionary.")
+
+
+@dataclass
+class QuantizeScriptArguments:
+    model_dir: Optional[str] = field(
+        default=os.environ.get("SM_MODEL_DIR", "/opt/ml/model"),
+        metadata={
+            "help": "The path of the model saved by the training script."
+        },
+    )
+
+    output_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": (
+                "The path the quantized model will be saved to. "
+                "If not set, the quantized weights are saved next to the original ones in model_dir."
+            )
+        },
+    )
+
+    data_dir: Optional[str] = field(
+        default=os.environ.get("SM_CHANNEL_TRAINING"),
+        metadata={
+            "help": (
+                "The path to the data directory used to compare the models. "
+                "If not set, the model is only quantized."
+            )
+        },
+    )
+
+    eval_dataset: Optional[str] = field(
+        default="test",
+        metadata={"help": "The dataset split used to compare the models."},
+    )
+
+    max_eval_samples: Optional[int] = field(
+        default=None,
+        metadata={
+            "help": "For debugging purposes or quicker evaluation, truncate the number of evaluation examples to this value if set."
+        },
+    )
+
+    max_seq_length: Optional[int] = field(
+        default=512,
+        metadata={"help": "The maximum sequence length."},
+    )
+
+    batch_size: Optional[int] = field(
+        default=32,
+        metadata={"help": "The batch size used to compare the models."},
+    )
+
+    threshold: Optional[float] = field(
+        default=0.5,
+        metadata={
+            "help": "The threshold to use to convert the model's output to a label."
+        },
+    )
+
+
+@dataclass
+class ScoreScriptArguments:
+    model_dir: Optional[str] = field(
+        default=os.environ.get("SM_MODEL_DIR", "/opt/ml/model"),
+        metadata={
+            "help": "The path or Hugging Face Hub ID of the trained model."
+        },
+    )
+
+    input_path: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": (
+                "The texts to score: a dataset saved with `save_to_disk` or a JSONL file "
+                "(one JSON object per line)."
+            )
+        },
+    )
+
+    output_path: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "The path of the predictions. The format is inferred from the extension (.parquet or .jsonl)."
+        },
+    )
+
+    split: Optional[str] = field(
+        default="test",
+        metadata={
+            "help": "The split to score when input_path is a DatasetDict."
+        },
+    )
+
+    text_column: Optional[str] = field(
+        default="text",
+        metadata={"help": "The name of the column with the texts."},
+    )
+
+    chunk_size: Optional[int] = field(
+        default=10000,
+        metadata={
+            "help": "The number of rows read, scored and written at a time (it bounds the memory usage)."
+        },
+    )
+
+    batch_size: Optional[int] = field(
+        default=64,
+        metadata={"help": "The batch size of the forward passes."},
+    )
+
+    max_seq_length: Optional[int] = field(
+        default=512,
+        metadata={"help": "The maximum sequence length."},
+    )
+
+    threshold: Optional[float] = field(
+        default=0.5,
+        metadata={
+            "help": "The threshold to use to convert the model's output to a label."
+        },
+    )
+
+    def __post_init__(self):
+        if self.output_path is not None and not self.output_path.endswith(
+            (".parquet", ".jsonl")
+        ):
+            raise ValueError(
+                f"Invalid value for output_path: {self.output_path}. "
+                "It must end with '.parquet' or '.jsonl'."
+            )
+
+
+@dataclass
+class ThresholdsScriptArguments:
+    model_dir: Optional[str] = field(
+        default=os.environ.get("SM_MODEL_DIR", "/opt/ml/model"),
+        metadata={
+            "help": "The path of the multi-label model saved by the training script."
+        },
+    )
+
+    predictions_path: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": (
+                "The validation predictions saved by the training script "
+                "(a .npz file with the 'logits' and 'label_ids' arrays)."
+            )
+        },
+    )
+
+    output_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "The path the thresholds will be saved to. If not set, they are saved in model_dir."
+        },
+    )
+
+    num_thresholds: Optional[int] = field(
+        default=199,
+        metadata={
+            "help": "The number of candidate thresholds evaluated for each label."
+        },
+    )
+
+    metric: Optional[str] = field(
+        default="f1",
+        metadata={
+            "help": "The metric to maximize ('f1', 'precision' or 'recall')."
+        },
+    )
+
+    def __post_init__(self):
+        if self.predictions_path is None:
+            raise ValueError("The predictions_path parameter must be set.")
+        if self.metric not in ["f1", "precision", "recall"]:
+            raise ValueError(
+                f"Invalid value for metric: {self.metric}. "
+                "It must be one of 'f1', 'precision' or 'recall'."
+            )
@@ -0,0 +1,111 @@
+import torch
+import datasets
+import numpy as np
+from typing import Any, List, Sequence, Union
+from transformers import Trainer
+from transformers.trainer_utils import EvalLoopOutput
+
+
+def add_length_column(
+    dataset: Union[datasets.Dataset, datasets.DatasetDict],
+    column_name: str = "length",
+) -> Union[datasets.Dataset, datasets.DatasetDict]:
+    """Add the number of tokens of each example to a tokenized dataset.
+
+    The column is used by `LengthGroupedSampler` to build the training
+    buckets without decoding every example at the start of each epoch.
+
+    Args:
+    - dataset: The tokenized dataset.
+    - column_name: The name of the length column.
+
+    Returns:
+    - The dataset with the length column.
+    """
+    return dataset.map(
+        lambda examples: {
+            column_name: [len(x) for x in examples["input_ids"]]
+        },
+        batched=True,
+    )
+
+
+class LengthSortedSampler(torch.utils.data.Sampler):
+    def __init__(self, lengths: Sequence[int]):
+        """Sequential sampler that yields the examples sorted by length.
+
+        Args:
+        - lengths: The length of each example.
+        """
+        self.indices = np.argsort(lengths, kind="stable")
+
+    def __iter__(self):
+        return iter(self.indices.tolist())
+
+    def __len__(self):
+        return len(self.indices)
+
+
+def reorder(data: Any, order: np.ndarray) -> Any:
+    """Reorder the first axis of (nested tuples or lists of) arrays.
+
+    Args:
+    - data: The arrays (e.g. the predictions of each task).
+    - order: The new order of the examples.
+
+    Returns:
+    - The reordered arrays.
+    """
+    if data is None:
+        return None
+    if isinstance(data, (tuple, list)):
+        return type(data)(reorder(x, order) for x in data)
+    return data[order]
+
+
+class LengthGroupedTrainer(Trainer):
+    """Trainer that groups the examples in length buckets.
+
+    When `group_by_length` is enabled, the training batches come from
+    `LengthGroupedSampler` and the evaluation/prediction batches are
+    sorted by length. The data collator pads each batch to its own longest
+    example, so short comments are no longer padded to `max_seq_length`.
+    The evaluation outputs are returned in the original dataset order.
+    """
+
+    def _get_eval_sampler(
+        self, eval_dataset: datasets.Dataset
+    ) -> torch.utils.data.Sampler:
+        if (
+            not self.args.group_by_length
+            or self.args.use_legacy_prediction_loop
+            or self.args.world_size > 1
+        ):
+            return super()._get_eval_sampler(eval_dataset)
+
+        return LengthSortedSampler(self.get_lengths(eval_dataset))
+
+    def get_lengths(self, dataset: datasets.Dataset) -> List[int]:
+        """Get the number of tokens of each example.
+
+        Args:
+        - dataset: The tokenized dataset.
+
+        Returns:
+        - The length of each example.
+        """
+        if self.args.length_column_name in dataset.column_names:
+            return dataset[self.args.length_column_name]
+        return [len(x) for x in dataset["input_ids"]]
+
+    def evaluation_loop(self, dataloader, *args, **kwargs) -> EvalLoopOutput:
+        output = super().evaluation_loop(dataloader, *args, **kwargs)
+
+        if not isinstance(dataloader.sampler, LengthSortedSampler):
+            return output
+
+        order = np.argsort(dataloader.sampler.indices)
+        return output._replace(
+            predictions=reorder(output.predictions, order),
+            label_ids=reorder(output.label_ids, order),
+        )
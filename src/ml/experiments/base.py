@@ -1,29 +1,40 @@
 import os
 import time
 import json
+import shutil
+import tempfile
+import inspect
+import hashlib
+import transformers
 import torch
 import mlflow
 import datasets
 import numpy as np
 import matplotlib.pyplot as plt
 from collections import OrderedDict
-from typing import Union, Dict, List, Tuple
+from typing import Any, Callable, Union, Dict, List, Optional, Tuple
 from huggingface_hub.repository import Repository
-from transformers.trainer_utils import get_last_checkpoint
+from transformers.trainer_utils import PredictionOutput, get_last_checkpoint
 from transformers import (
     AutoTokenizer,
     EarlyStoppingCallback,
     PreTrainedModel,
-    Trainer,
+    PreTrainedTokenizerBase,
     TrainingArguments,
     set_seed,
 )
 
 # Custom code
 from arguments import TrainScriptArguments
+from bucketing import LengthGroupedTrainer, add_length_column
 from environments import EnvironmentVariables
-from logger import setup_logger
+from inference import predict
+from logger import lazy, setup_logger, summarize
+from metrics.thresholds import save_thresholds, tune_thresholds
 from metrics.utils import compute_metrics
+from models.onnx import export_onnx
+from models.torchscript import export_torchscript
+from stats import compute_stats, compute_token_histogram
 from utils import flatten_dict
 
 _logger = setup_logger(__name__)
@@ -58,11 +69,10 @@ class Experiment(object):
         self.prep_output_dir(self.args.output_dir)
 
         _logger.debug(
-            {
-                "args": self.args,
-                "device": self.device,
-                "job_name": self.job_name,
-            }
+            "Args: %s, device: %s, job name: %s.",
+            self.args,
+            self.device,
+            self.job_name,
         )
 
         _logger.info(f"Experiment {self.name} initialized.")
@@ -87,12 +97,12 @@ class Experiment(object):
             self.env.MLFLOW_RUN_ID
             and not self.resume_mlflow_checkpoint(self.args.output_dir)
         )
-        _logger.debug(f"Nested run: {self.nested_run}")
+        _logger.debug("Nested run: %s", self.nested_run)
 
         if self.env.MLFLOW_RUN_ID and self.nested_run:
             mlflow.start_run()
             _logger.debug(
-                f"Starting mlflow run: {mlflow.active_run().info.run_id}"
+                "Starting mlflow run: %s", mlflow.active_run().info.run_id
             )
 
     def init_model(self, pretrained_model_name_or_path: str):
@@ -201,40 +211,161 @@ class Experiment(object):
         _logger.info(f"Dataset: {dataset}")
         return dataset
 
+    def get_cache_key(
+        self,
+        dataset: Union[datasets.Dataset, datasets.DatasetDict],
+        function: Callable,
+        fn_kwargs: Dict[str, Any],
+        **kwargs,
+    ) -> str:
+        """Get the cache key of a preprocessed dataset.
+
+        The key covers the dataset fingerprint, the preprocessing function
+        (name and source code), the tokenizer (class, name, vocabulary and
+        transformers version) and the remaining arguments (e.g. max_seq_length
+        and the labels).
+
+        Args:
+        - dataset: The dataset.
+        - function: The preprocessing function.
+        - fn_kwargs: The keyword arguments of the preprocessing function.
+        - kwargs: The keyword arguments of `dataset.map`.
+
+        Returns:
+        - The cache key.
+        """
+        if isinstance(dataset, datasets.DatasetDict):
+            fingerprint = {k: v._fingerprint for k, v in dataset.items()}
+        else:
+            fingerprint = dataset._fingerprint
+
+        key = {
+            "dataset": fingerprint,
+            "function": f"{function.__module__}.{function.__qualname__}",
+            "source": hashlib.sha256(
+                inspect.getsource(function).encode()
+            ).hexdigest(),
+            "kwargs": {k: v for k, v in fn_kwargs.items() if k != "tokenizer"},
+            "map_kwargs": kwargs,
+            "transformers": transformers.__version__,
+        }
+
+        tokenizer = fn_kwargs.get("tokenizer")
+        if tokenizer is not None:
+            key["tokenizer"] = {
+                "class": type(tokenizer).__name__,
+                "name": tokenizer.name_or_path,
+                "vocab": hashlib.sha256(
+                    json.dumps(tokenizer.get_vocab(), sort_keys=True).encode()
+                ).hexdigest(),
+            }
+
+        return hashlib.sha256(
+            json.dumps(key, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def map_dataset(
+        self,
+        dataset: Union[datasets.Dataset, datasets.DatasetDict],
+        function: Callable,
+        fn_kwargs: Dict[str, Any],
+        **kwargs,
+    ) -> Union[datasets.Dataset, datasets.DatasetDict]:
+        """Apply a preprocessing function to the dataset, reusing the cached result if it exists.
+
+        The preprocessed dataset is stored as Arrow files in
+        `tokenized_cache_dir`/{cache_key}, so runs with the same data,
+        tokenizer and preprocessing arguments skip the tokenization.
+
+        Args:
+        - dataset: The dataset.
+        - function: The preprocessing function.
+        - fn_kwargs: The keyword arguments of the preprocessing function.
+        - kwargs: The keyword arguments of `dataset.map` (e.g. batched, remove_columns).
+
+        Returns:
+        - The preprocessed dataset.
+        """
+        cache_dir = self.args.tokenized_cache_dir
+        if cache_dir is None:
+            return dataset.map(function, fn_kwargs=fn_kwargs, **kwargs)
+
+        key = self.get_cache_key(dataset, function, fn_kwargs, **kwargs)
+        path = os.path.join(cache_dir, key)
+
+        if os.path.isdir(path):
+            _logger.info(f"Loading tokenized dataset from cache: {path}.")
+            return datasets.load_from_disk(path)
+
+        dataset = dataset.map(function, fn_kwargs=fn_kwargs, **kwargs)
+
+        # Save to a temporary directory first, so concurrent runs never
+        # read a partially written cache.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        dataset.save_to_disk(tmp_path)
+        try:
+            os.rename(tmp_path, path)
+            _logger.info(f"Saved tokenized dataset to cache: {path}.")
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        return dataset
+
     def get_dataset_stats(
-        self, dataset: Union[datasets.Dataset, datasets.DatasetDict]
+        self,
+        dataset: Union[datasets.Dataset, datasets.DatasetDict],
+        tokenizer: PreTrainedTokenizerBase = None,
     ):
         """Get the dataset statistics (e.g. length, average qty words, etc.).
 
+        The lengths of each split are computed in one batched pass and
+        memoized by the split fingerprint, so repeated calls are free.
+
         Args:
         - dataset: The dataset.
+        - tokenizer: The tokenizer used to compute the token statistics (optional).
 
         Returns:
         - The dataset statistics as a dictionary.
         """
         _logger.info("Getting dataset statistics.")
 
-        def compute_stats(examples):
-            return {
-                "min_length": min([len(x) for x in examples["text"]]),
-                "max_length": max([len(x) for x in examples["text"]]),
-                "avg_length": round(
-                    np.mean([len(x) for x in examples["text"]]), 2
-                ),
-                "min_words": min([len(x.split()) for x in examples["text"]]),
-                "max_words": max([len(x.split()) for x in examples["text"]]),
-                "avg_words": round(
-                    np.mean([len(x.split()) for x in examples["text"]]), 2
-                ),
-            }
-
         dataset_stats = {
-            split: compute_stats(dataset[split]) for split in dataset.keys()
+            split: compute_stats(
+                dataset[split],
+                tokenizer=tokenizer,
+                num_proc=self.args.preprocessing_num_workers,
+            )
+            for split in dataset.keys()
         }
 
         _logger.info(f"Dataset statistics: {dataset_stats}")
         return dataset_stats
 
+    def get_token_histogram(
+        self,
+        dataset: Union[datasets.Dataset, datasets.DatasetDict],
+        bins: int = 20,
+    ) -> Dict[str, Dict[str, list]]:
+        """Get the histogram of the number of tokens of each split.
+
+        Args:
+        - dataset: The dataset.
+        - bins: The number of bins.
+
+        Returns:
+        - The histogram (counts and bin edges) of each split.
+        """
+        return {
+            split: compute_token_histogram(
+                dataset[split],
+                self.tokenizer,
+                bins=bins,
+                num_proc=self.args.preprocessing_num_workers,
+            )
+            for split in dataset.keys()
+        }
+
     def prep_output_dir(self, output_dir: str) -> bool:
         """Prepare the output directory.
 
@@ -321,12 +452,11 @@ class Experiment(object):
         - The plot.
         """
         _logger.debug(
-            {
-                "log_history": log_history,
-                "metrics": metrics,
-                "xtitle": xtitle,
-                "ytitle": ytitle,
-            }
+            "Plotting %s (log history: %s, xtitle: %s, ytitle: %s).",
+            metrics,
+            lazy(summarize, log_history),
+            xtitle,
+            ytitle,
         )
 
         # Prepare the metrics
@@ -374,7 +504,9 @@ class Experiment(object):
         - repo: The Model Repository.
         """
         _logger.debug(
-            f"Adding SageMaker Checkpointing patterns to {repo.local_dir}/{gitignore_path}."
+            "Adding SageMaker Checkpointing patterns to %s/%s.",
+            repo.local_dir,
+            gitignore_path,
         )
 
         # Check if .gitignore exists
@@ -389,7 +521,10 @@ class Experiment(object):
         for pattern in patterns:
             if pattern not in content:
                 _logger.debug(
-                    f"Adding {pattern} to {repo.local_dir}/{gitignore_path}."
+                    "Adding %s to %s/%s.",
+                    pattern,
+                    repo.local_dir,
+                    gitignore_path,
                 )
                 if content.endswith("\n"):
                     content += pattern
@@ -397,7 +532,7 @@ class Experiment(object):
                     content += f"\n{pattern}"
 
         with open(os.path.join(repo.local_dir, gitignore_path), "w") as f:
-            _logger.debug(f"Writing .gitignore file. Content: {content}")
+            _logger.debug("Writing .gitignore file. Content: %s", content)
             f.write(content)
 
         repo.git_add(gitignore_path)
@@ -409,6 +544,107 @@ class Experiment(object):
             repo.git_commit(f"Add *.sagemaker patterns to {gitignore_path}.")
             repo.git_push()
 
+    def export_onnx(
+        self, model: PreTrainedModel, output_dir: str
+    ) -> Optional[str]:
+        """Export the trained model to ONNX and log it to MLflow.
+
+        A failed export is logged and doesn't stop the run, so the trained
+        model is still saved and pushed to the Hub.
+
+        Args:
+        - model: The trained model.
+        - output_dir: The directory where the ONNX graph will be saved.
+
+        Returns:
+        - The path of the ONNX graph (None if the export failed).
+        """
+        try:
+            path = export_onnx(model, self.tokenizer, output_dir)
+        except Exception as exc:
+            _logger.error(f"Failed to export the model to ONNX: {exc}")
+            return None
+        if mlflow.active_run():
+            mlflow.log_artifact(path)
+        _logger.info(f"Model exported to ONNX: {path}.")
+        return path
+
+    def export_torchscript(
+        self, model: PreTrainedModel, output_dir: str
+    ) -> Optional[str]:
+        """Export the trained model to a TorchScript module and log it to MLflow.
+
+        A failed export is logged and doesn't stop the run (see `export_onnx`).
+
+        Args:
+        - model: The trained model.
+        - output_dir: The directory where the module will be saved.
+
+        Returns:
+        - The path of the TorchScript module (None if the export failed).
+        """
+        try:
+            path = export_torchscript(model, self.tokenizer, output_dir)
+        except Exception as exc:
+            _logger.error(f"Failed to export the model to TorchScript: {exc}")
+            return None
+        if mlflow.active_run():
+            mlflow.log_artifact(path)
+        _logger.info(f"Model exported to TorchScript: {path}.")
+        return path
+
+    def tune_thresholds(
+        self,
+        predictions: PredictionOutput,
+        labels: List[str],
+        output_dir: str,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Tune the threshold of each label of a multi-label model.
+
+        The thresholds are saved with the model artifacts (thresholds.json)
+        and the evaluation predictions are logged to MLflow, so they can be
+        tuned again with `tune_thresholds.py` without running the model.
+
+        Args:
+        - predictions: The predictions of the model on the validation set (never the test set).
+        - labels: The label names.
+        - output_dir: The model directory.
+
+        Returns:
+        - The thresholds report (see `metrics.thresholds.tune_thresholds`).
+        """
+        id2label = dict(enumerate(labels))
+        probs = predict(
+            predictions, return_proba=True, problem_type="multi-label"
+        )
+        report = tune_thresholds(
+            predictions.label_ids,
+            probs,
+            id2label,
+            default_threshold=self.args.threshold,
+        )
+        path = save_thresholds(
+            [report[label]["threshold"] for label in labels],
+            id2label,
+            output_dir,
+        )
+        _logger.info(f"Thresholds saved to {path}: {report}")
+
+        if mlflow.active_run():
+            mlflow.log_artifact(path)
+            mlflow.log_dict(report, "thresholds_report.json")
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                predictions_path = os.path.join(
+                    tmp_dir, "validation_predictions.npz"
+                )
+                np.savez_compressed(
+                    predictions_path,
+                    logits=predictions.predictions,
+                    label_ids=predictions.label_ids,
+                )
+                mlflow.log_artifact(predictions_path)
+        return report
+
     def run(self):
         """Run the training."""
         self.init_experiment()
@@ -431,6 +667,9 @@ class Experiment(object):
 
             self.init_model(self.args.model_name)
 
+            if self.args.group_by_length:
+                self.dataset = add_length_column(self.dataset)
+
             self.dataset.set_format("torch")
 
             trainer_args = TrainingArguments(
@@ -457,10 +696,11 @@ class Experiment(object):
                 per_device_eval_batch_size=self.args.batch_size,
                 num_train_epochs=self.args.num_train_epochs,
                 report_to=["mlflow"],
+                group_by_length=self.args.group_by_length,
                 seed=self.args.seed,
             )
 
-            trainer = Trainer(
+            trainer = LengthGroupedTrainer(
                 model=self.model,
                 args=trainer_args,
                 train_dataset=self.dataset["train"],
@@ -527,6 +767,12 @@ class Experiment(object):
 
             trainer.save_model(self.args.model_dir)
 
+            if self.args.export_onnx:
+                self.export_onnx(trainer.model, self.args.model_dir)
+
+            if self.args.export_torchscript:
+                self.export_torchscript(trainer.model, self.args.model_dir)
+
             if self.args.push_to_hub:
                 _logger.info("Pushing model to Hugging Face Hub.")
                 trainer.push_to_hub(
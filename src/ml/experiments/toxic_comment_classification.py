@@ -6,10 +6,11 @@ from typing import Union
 from sklearn.metrics import classification_report
 from sklearn.utils.class_weight import compute_class_weight
 from transformers.trainer_utils import get_last_checkpoint
-from transformers import Trainer, TrainingArguments, EarlyStoppingCallback
+from transformers import TrainingArguments, EarlyStoppingCallback
 
 # Custom code
 from .base import Experiment
+from bucketing import LengthGroupedTrainer, add_length_column
 from arguments import TrainScriptArguments
 from inference import predict
 from models.bert import ToxicityTypeForSequenceClassification
@@ -49,7 +50,7 @@ class ToxicCommentClassification(Experiment):
         - args: The arguments of the experiment.
         """
         super().__init__(args)
-        _logger.debug(f"Labels: {self.labels}")
+        _logger.debug("Labels: %s", self.labels)
 
     def init_model(self, pretrained_model_name_or_path: str):
         """Initialize the model.
@@ -96,11 +97,18 @@ class ToxicCommentClassification(Experiment):
         """
         super().prepare_dataset(dataset)
 
-        dataset_stats = self.get_dataset_stats(self.dataset)
+        dataset_stats = self.get_dataset_stats(
+            self.dataset, tokenizer=self.tokenizer
+        )
         if mlflow.active_run():
             mlflow.log_params(flatten_dict(dataset_stats))
+            mlflow.log_dict(
+                self.get_token_histogram(self.dataset),
+                "token_histogram.json",
+            )
 
-        dataset = dataset.map(
+        dataset = self.map_dataset(
+            dataset,
             preprocess_data,
             remove_columns=["text"],
             batched=True,
@@ -130,6 +138,9 @@ class ToxicCommentClassification(Experiment):
 
             self.init_model(self.args.model_name)
 
+            if self.args.group_by_length:
+                self.dataset = add_length_column(self.dataset)
+
             self.dataset.set_format("torch")
 
             trainer_args = TrainingArguments(
@@ -156,10 +167,11 @@ class ToxicCommentClassification(Experiment):
                 per_device_train_batch_size=self.args.batch_size,
                 per_device_eval_batch_size=self.args.batch_size,
                 num_train_epochs=self.args.num_train_epochs,
+                group_by_length=self.args.group_by_length,
                 seed=self.args.seed,
             )
 
-            trainer = Trainer(
+            trainer = LengthGroupedTrainer(
                 model=self.model,
                 args=trainer_args,
                 train_dataset=self.dataset["train"],
@@ -237,6 +249,12 @@ class ToxicCommentClassification(Experiment):
 
             trainer.save_model(self.args.model_dir)
 
+            if self.args.export_onnx:
+                self.export_onnx(trainer.model, self.args.model_dir)
+
+            if self.args.export_torchscript:
+                self.export_torchscript(trainer.model, self.args.model_dir)
+
             if self.args.push_to_hub:
                 _logger.info("Pushing model to Hugging Face Hub.")
                 trainer.push_to_hub(
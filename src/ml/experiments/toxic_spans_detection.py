@@ -7,11 +7,7 @@ from logger import setup_logger
 from arguments import TrainScriptArguments
 from models.spacy import ToxicSpansDetectionModel
 from utils import flatten_dict
-from metrics.spans import (
-    precision_score,
-    recall_score,
-    f1_score,
-)
+from metrics.spans import span_scores
 
 _logger = setup_logger(__name__)
 
@@ -36,7 +32,9 @@ class ToxicSpansDetection(Experiment):
         self, pretrained_model_name_or_path: str = "pt_core_news_lg"
     ) -> ToxicSpansDetectionModel:
         self.model = ToxicSpansDetectionModel(
-            spacy_model=pretrained_model_name_or_path, toxic_label="TOXIC"
+            spacy_model=pretrained_model_name_or_path,
+            toxic_label="TOXIC",
+            n_process=self.args.n_process,
         )
         return self.model
 
@@ -77,6 +75,7 @@ class ToxicSpansDetection(Experiment):
                 weight_decay=self.args.weight_decay,
                 checkpoint_dir=self.args.checkpoint_dir,
                 load_best_model_at_end=True,
+                cache_dir=f"{self.args.output_dir}/docs_cache",
             )
 
             mlflow.log_params(
@@ -102,18 +101,11 @@ class ToxicSpansDetection(Experiment):
             )
 
             scores = {
-                "eval_f1": f1_score(
+                f"eval_{key}": value
+                for key, value in span_scores(
                     y_true=self.dataset[self.args.eval_dataset]["toxic_spans"],
                     y_pred=preds,
-                ),
-                "eval_precision": precision_score(
-                    y_true=self.dataset[self.args.eval_dataset]["toxic_spans"],
-                    y_pred=preds,
-                ),
-                "eval_recall": recall_score(
-                    y_true=self.dataset[self.args.eval_dataset]["toxic_spans"],
-                    y_pred=preds,
-                ),
+                ).items()
             }
 
             _logger.info(f"Scores ({self.args.eval_dataset} set): {scores}")
@@ -0,0 +1,364 @@
+import torch
+import mlflow
+import datasets
+import numpy as np
+from typing import Union
+from sklearn.metrics import classification_report
+from sklearn.utils.class_weight import compute_class_weight
+from transformers.trainer_utils import get_last_checkpoint
+from transformers import TrainingArguments, EarlyStoppingCallback
+
+# Custom code
+from .base import Experiment
+from bucketing import LengthGroupedTrainer, add_length_column
+from inference import predict
+from models.bert import ToxicityMultiTaskForSequenceClassification
+from logger import setup_logger
+from metrics.utils import compute_multi_task_metrics
+from utils import compute_pos_weight, flatten_dict
+
+_logger = setup_logger(__name__)
+
+TOXICITY_TYPES = [
+    "health",
+    "ideology",
+    "insult",
+    "lgbtqphobia",
+    "other_lifestyle",
+    "physical_aspects",
+    "profanity_obscene",
+    "racism",
+    "sexism",
+    "xenophobia",
+]
+
+TASKS = {
+    "toxicity": {
+        "labels": ["NOT-OFFENSIVE", "OFFENSIVE"],
+        "problem_type": "single_label_classification",
+    },
+    "toxicity_target": {
+        "labels": ["UNTARGETED", "TARGETED INSULT"],
+        "problem_type": "single_label_classification",
+    },
+    "toxicity_target_type": {
+        "labels": ["INDIVIDUAL", "GROUP", "OTHER"],
+        "problem_type": "single_label_classification",
+    },
+    "toxicity_type": {
+        "labels": TOXICITY_TYPES,
+        "problem_type": "multi_label_classification",
+    },
+}
+
+TARGET_TYPES = {"IND": 0, "GRP": 1, "OTH": 2}
+
+
+def preprocess_data(examples, tokenizer, max_seq_length):
+    """Preprocess the data.
+
+    Labels of the tasks that don't apply to a comment (e.g. the target of a
+    non-offensive comment) are set to -100, so they are ignored by the loss.
+
+    Args:
+    - examples: The examples to preprocess (OLID-BR columns).
+    - tokenizer: The tokenizer to use.
+    - max_seq_length: The maximum sequence length.
+
+    Returns:
+    - The preprocessed examples.
+    """
+    encoding = tokenizer(
+        examples["text"], truncation=True, max_length=max_seq_length
+    )
+
+    offensive = [x == "OFF" for x in examples["is_offensive"]]
+    targeted = [
+        off and x == "TIN"
+        for off, x in zip(offensive, examples["is_targeted"])
+    ]
+
+    encoding["toxicity_labels"] = [int(off) for off in offensive]
+    encoding["toxicity_target_labels"] = [
+        int(tin) if off else -100 for off, tin in zip(offensive, targeted)
+    ]
+    encoding["toxicity_target_type_labels"] = [
+        TARGET_TYPES[x] if tin and x in TARGET_TYPES else -100
+        for tin, x in zip(targeted, examples["targeted_type"])
+    ]
+
+    types = np.array(
+        [examples[label] for label in TOXICITY_TYPES], dtype=float
+    ).T
+    types[~(np.array(offensive) & types.any(axis=1))] = -100
+    encoding["toxicity_type_labels"] = types.tolist()
+
+    return encoding
+
+
+def get_task_mask(labels: np.ndarray, task: str) -> np.ndarray:
+    """Get the mask of the samples that apply to a task.
+
+    Args:
+    - labels: The labels of the task.
+    - task: The task name.
+
+    Returns:
+    - A boolean mask.
+    """
+    if TASKS[task]["problem_type"] == "multi_label_classification":
+        return labels[:, 0] != -100
+    return labels != -100
+
+
+class ToxicityMultiTask(Experiment):
+    name = "toxicity-multi-task"
+
+    tasks = TASKS
+
+    def init_model(self, pretrained_model_name_or_path: str):
+        """Initialize the model.
+
+        Args:
+        - pretrained_model_name_or_path: The name or path of the pretrained model.
+
+        Returns:
+        - The initialized model.
+        """
+        weight, pos_weight = {}, {}
+        for task, params in self.tasks.items():
+            labels = np.array(self.dataset["train"][f"{task}_labels"])
+            labels = labels[get_task_mask(labels, task)]
+
+            if params["problem_type"] == "multi_label_classification":
+                pos_weight[task] = compute_pos_weight(labels)
+            else:
+                weight[task] = compute_class_weight(
+                    class_weight="balanced",
+                    classes=list(range(len(params["labels"]))),
+                    y=labels,
+                ).tolist()
+
+        mlflow.log_param("class_weights", weight)
+        mlflow.log_param("pos_weight", pos_weight)
+
+        _logger.info(
+            f"Initializing model from {pretrained_model_name_or_path}."
+        )
+        self.model = (
+            ToxicityMultiTaskForSequenceClassification.from_pretrained(
+                pretrained_model_name_or_path,
+                tasks=self.tasks,
+                weight={k: torch.Tensor(v) for k, v in weight.items()},
+                pos_weight={k: torch.Tensor(v) for k, v in pos_weight.items()},
+            ).to(self.device)
+        )
+        mlflow.log_text(str(self.model), "model_summary.txt")
+        return self.model
+
+    def prepare_dataset(
+        self, dataset: Union[datasets.Dataset, datasets.DatasetDict]
+    ) -> Union[datasets.Dataset, datasets.DatasetDict]:
+        """Prepare the dataset.
+
+        Args:
+        - dataset: The dataset to prepare (OLID-BR columns).
+
+        Returns:
+        - The prepared dataset.
+        """
+        super().prepare_dataset(dataset)
+
+        dataset_stats = self.get_dataset_stats(
+            self.dataset, tokenizer=self.tokenizer
+        )
+        if mlflow.active_run():
+            mlflow.log_params(flatten_dict(dataset_stats))
+            mlflow.log_dict(
+                self.get_token_histogram(self.dataset),
+                "token_histogram.json",
+            )
+
+        dataset = self.map_dataset(
+            dataset,
+            preprocess_data,
+            batched=True,
+            remove_columns=dataset["train"].column_names,
+            fn_kwargs={
+                "tokenizer": self.tokenizer,
+                "max_seq_length": self.args.max_seq_length,
+            },
+        )
+        _logger.info("Dataset preparation finished.")
+        return dataset
+
+    def run(self):
+        """Run the experiment."""
+        self.init_experiment()
+        with mlflow.start_run(nested=self.nested_run):
+            # Save MLflow run ID to checkpointing directory.
+            self.save_mlflow_checkpoint(
+                mlflow_run_id=mlflow.active_run().info.run_id,
+                output_dir=self.args.output_dir,
+            )
+
+            self.init_tokenizer(self.args.model_name)
+
+            self.dataset = self.load_dataset()
+            self.dataset = self.slice_dataset(self.dataset)
+            self.dataset = self.prepare_dataset(self.dataset)
+
+            self.init_model(self.args.model_name)
+
+            if self.args.group_by_length:
+                self.dataset = add_length_column(self.dataset)
+
+            self.dataset.set_format("torch")
+
+            trainer_args = TrainingArguments(
+                output_dir=self.model_output_dir,
+                overwrite_output_dir=True
+                if get_last_checkpoint(self.model_output_dir) is not None
+                else False,
+                evaluation_strategy="epoch",
+                save_strategy="epoch",
+                save_total_limit=self.args.early_stopping_patience + 1,
+                load_best_model_at_end=True,
+                push_to_hub=self.args.push_to_hub,
+                hub_token=self.env.HUGGINGFACE_HUB_TOKEN,
+                hub_model_id=self.args.hub_model_id,
+                metric_for_best_model="f1",
+                label_names=[f"{task}_labels" for task in self.tasks],
+                learning_rate=self.args.learning_rate,
+                weight_decay=self.args.weight_decay,
+                adam_beta1=self.args.adam_beta1,
+                adam_beta2=self.args.adam_beta2,
+                adam_epsilon=self.args.adam_epsilon,
+                optim=self.args.optim,
+                per_device_train_batch_size=self.args.batch_size,
+                per_device_eval_batch_size=self.args.batch_size,
+                num_train_epochs=self.args.num_train_epochs,
+                group_by_length=self.args.group_by_length,
+                seed=self.args.seed,
+            )
+
+            trainer = LengthGroupedTrainer(
+                model=self.model,
+                args=trainer_args,
+                train_dataset=self.dataset["train"],
+                eval_dataset=self.dataset[self.args.eval_dataset],
+                tokenizer=self.tokenizer,
+                compute_metrics=lambda p: compute_multi_task_metrics(
+                    p, tasks=self.tasks, threshold=self.args.threshold
+                ),
+                callbacks=[
+                    EarlyStoppingCallback(
+                        early_stopping_patience=self.args.early_stopping_patience
+                    )
+                ]
+                if self.args.early_stopping_patience is not None
+                else None,
+            )
+
+            # Add *.sagemaker-uploading and *.sagemaker-uploaded patterns to .gitignore.
+            self.add_sm_patterns_to_gitignore(trainer.repo)
+
+            # check if checkpoint existing if so continue training
+            last_checkpoint = get_last_checkpoint(self.model_output_dir)
+            if last_checkpoint is not None:
+                _logger.info(
+                    f"Resuming training from checkpoint: {last_checkpoint}"
+                )
+
+            trainer.train(resume_from_checkpoint=last_checkpoint)
+
+            # Evaluate model
+            mlflow.log_param("eval_dataset", self.args.eval_dataset)
+            scores = trainer.evaluate()
+            _logger.info(f"Scores ({self.args.eval_dataset} set): {scores}")
+            _logger.info(f"eval_f1_weighted: {scores['eval_f1']}")
+
+            # Classification Report (one per task)
+            _logger.info("Computing classification reports.")
+            preds = trainer.predict(self.dataset[self.args.eval_dataset])
+            for idx, (task, params) in enumerate(self.tasks.items()):
+                labels = preds.label_ids[idx]
+                mask = get_task_mask(labels, task)
+                if params["problem_type"] == "multi_label_classification":
+                    problem_type = "multi-label"
+                elif len(params["labels"]) == 2:
+                    problem_type = "binary"
+                else:
+                    problem_type = "multi-class"
+
+                report = classification_report(
+                    y_true=labels[mask],
+                    y_pred=predict(
+                        preds.predictions[idx][mask],
+                        threshold=self.args.threshold,
+                        problem_type=problem_type,
+                    ),
+                    labels=list(range(len(params["labels"])))
+                    if problem_type != "multi-label"
+                    else None,
+                    target_names=params["labels"],
+                    digits=4,
+                    zero_division=0,
+                )
+                mlflow.log_text(report, f"classification_report_{task}.txt")
+
+            # Plot metrics
+            _logger.info("Plotting scores.")
+            mlflow.log_figure(
+                figure=self.plot_hf_metrics(
+                    log_history=trainer.state.log_history
+                ),
+                artifact_file="scores.png",
+            )
+
+            # Plot loss
+            _logger.info("Plotting losses.")
+            mlflow.log_figure(
+                figure=self.plot_hf_metrics(
+                    log_history=trainer.state.log_history,
+                    metrics={"eval_loss": "Loss"},
+                    xtitle="Epoch",
+                    ytitle="Loss",
+                    ylim=None,
+                ),
+                artifact_file="losses.png",
+            )
+
+            mlflow.log_dict(
+                dictionary=trainer.state.log_history,
+                artifact_file="log_history.json",
+            )
+
+            trainer.save_model(self.args.model_dir)
+
+            if self.args.export_onnx:
+                self.export_onnx(trainer.model, self.args.model_dir)
+
+            if self.args.export_torchscript:
+                self.export_torchscript(trainer.model, self.args.model_dir)
+
+            if self.args.push_to_hub:
+                _logger.info("Pushing model to Hugging Face Hub.")
+                trainer.push_to_hub(
+                    blocking=True,
+                    language="pt",
+                    license="apache-2.0",
+                    tags=[
+                        "toxicity",
+                        "portuguese",
+                        "hate speech",
+                        "offensive language",
+                    ],
+                    model_name=self.args.hub_model_id,
+                    finetuned_from=self.args.model_name,
+                    tasks="text-classification",
+                    dataset="OLID-BR",
+                )
+                _logger.info("Model pushed to Hugging Face Hub.")
+
+        _logger.info("Experiment completed.")
@@ -6,10 +6,11 @@ import numpy as np
 from typing import Union
 from sklearn.metrics import classification_report
 from transformers.trainer_utils import get_last_checkpoint
-from transformers import Trainer, TrainingArguments, EarlyStoppingCallback
+from transformers import TrainingArguments, EarlyStoppingCallback
 
 # Custom code
 from .base import Experiment
+from bucketing import LengthGroupedTrainer, add_length_column
 from inference import predict
 from models.bert import ToxicityTypeForSequenceClassification
 from logger import setup_logger
@@ -33,9 +34,8 @@ def preprocess_data(examples, tokenizer, max_seq_length, labels):
     text = examples["text"]
 
     # encode them
-    encoding = tokenizer(
-        text, padding="max_length", truncation=True, max_length=max_seq_length
-    )
+    # padding is done per batch by the data collator
+    encoding = tokenizer(text, truncation=True, max_length=max_seq_length)
 
     # add labels
     labels_batch = {k: examples[k] for k in examples.keys() if k in labels}
@@ -95,9 +95,15 @@ class ToxicityTypeDetection(Experiment):
         """
         super().prepare_dataset(dataset)
 
-        dataset_stats = self.get_dataset_stats(self.dataset)
+        dataset_stats = self.get_dataset_stats(
+            self.dataset, tokenizer=self.tokenizer
+        )
         if mlflow.active_run():
             mlflow.log_params(flatten_dict(dataset_stats))
+            mlflow.log_dict(
+                self.get_token_histogram(self.dataset),
+                "token_histogram.json",
+            )
 
         self.labels = [
             label
@@ -105,7 +111,8 @@ class ToxicityTypeDetection(Experiment):
             if label not in ["text"]
         ]
 
-        dataset = dataset.map(
+        dataset = self.map_dataset(
+            dataset,
             preprocess_data,
             batched=True,
             remove_columns=dataset["train"].column_names,
@@ -136,6 +143,9 @@ class ToxicityTypeDetection(Experiment):
 
             self.init_model(self.args.model_name)
 
+            if self.args.group_by_length:
+                self.dataset = add_length_column(self.dataset)
+
             self.dataset.set_format("torch")
 
             trainer_args = TrainingArguments(
@@ -161,10 +171,11 @@ class ToxicityTypeDetection(Experiment):
                 per_device_train_batch_size=self.args.batch_size,
                 per_device_eval_batch_size=self.args.batch_size,
                 num_train_epochs=self.args.num_train_epochs,
+                group_by_length=self.args.group_by_length,
                 seed=self.args.seed,
             )
 
-            trainer = Trainer(
+            trainer = LengthGroupedTrainer(
                 model=self.model,
                 args=trainer_args,
                 train_dataset=self.dataset["train"],
@@ -248,6 +259,36 @@ class ToxicityTypeDetection(Experiment):
 
             trainer.save_model(self.args.model_dir)
 
+            if self.args.export_onnx:
+                self.export_onnx(trainer.model, self.args.model_dir)
+
+            if self.args.export_torchscript:
+                self.export_torchscript(trainer.model, self.args.model_dir)
+
+            if self.args.tune_thresholds:
+                # The thresholds are tuned on the validation set, so the
+                # scores on the test set stay unbiased.
+                if "validation" not in self.dataset or (
+                    self.args.concat_validation_set
+                    and self.args.eval_dataset != "validation"
+                ):
+                    _logger.warning(
+                        "Skipping threshold tuning: there is no validation "
+                        "set held out from training."
+                    )
+                else:
+                    _logger.info(
+                        "Tuning the threshold of each label on the "
+                        "validation set."
+                    )
+                    self.tune_thresholds(
+                        preds
+                        if self.args.eval_dataset == "validation"
+                        else trainer.predict(self.dataset["validation"]),
+                        self.labels,
+                        self.args.model_dir,
+                    )
+
             if self.args.push_to_hub:
                 _logger.info("Pushing model to Hugging Face Hub.")
                 trainer.push_to_hub(
@@ -1,53 +1,238 @@
-import torch
 import numpy as np
-from typing import Union
-from transformers import EvalPrediction
-from transformers.trainer_utils import PredictionOutput
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+if TYPE_CHECKING:
+    from transformers import EvalPrediction
+    from transformers.trainer_utils import PredictionOutput
+
+PROBLEM_TYPES = [None, "binary", "multi-class", "multi-label"]
+
+
+def get_problem_type(problem_type: str, num_labels: int) -> str:
+    """Get the problem type as expected by `predict` from a model config.
+
+    Args:
+    - problem_type: The Hugging Face problem type (e.g. "multi_label_classification").
+    - num_labels: The number of labels.
+
+    Returns:
+    - The problem type ("binary", "multi-class" or "multi-label").
+    """
+    if problem_type == "multi_label_classification":
+        return "multi-label"
+    if num_labels == 2:
+        return "binary"
+    return "multi-class"
+
+
+def softmax(logits: np.ndarray, out: Optional[np.ndarray] = None):
+    """Numerically stable softmax over the last axis.
+
+    Args:
+    - logits: The logits with shape (batch_size, num_labels).
+    - out: The output buffer (it can be `logits` itself).
+
+    Returns:
+    - The probabilities.
+    """
+    out = np.subtract(logits, logits.max(axis=-1, keepdims=True), out=out)
+    np.exp(out, out=out)
+    out /= out.sum(axis=-1, keepdims=True)
+    return out
+
+
+def sigmoid(logits: np.ndarray, out: Optional[np.ndarray] = None):
+    """Numerically stable sigmoid.
+
+    Args:
+    - logits: The logits.
+    - out: The output buffer (it can be `logits` itself).
+
+    Returns:
+    - The probabilities.
+    """
+    out = np.negative(logits, out=out)
+    # exp(-x) overflows to inf for very negative logits, which gives 0.
+    with np.errstate(over="ignore"):
+        np.exp(out, out=out)
+    out += 1
+    return np.reciprocal(out, out=out)
+
+
+def proba_to_labels(
+    probs: np.ndarray,
+    threshold: Union[float, np.ndarray] = 0.5,
+    problem_type: str = None,
+) -> np.ndarray:
+    """Convert probabilities to labels.
+
+    Args:
+    - probs: The probabilities with shape (batch_size, num_labels).
+    - threshold: The threshold to be used to convert the probabilities to labels (or an array with the threshold of each label for multi-label problems).
+    - problem_type: The type of the problem. Can be "binary", "multi-class" or "multi-label".
+
+    Returns:
+    - The predicted labels.
+    """
+    if problem_type == "multi-label":
+        return (probs >= threshold).astype(int)
+    if probs.shape[1] == 2:
+        return (probs[:, 1] > threshold).astype(int)
+    return np.argmax(probs, axis=1)
 
 
 def predict(
-    predictions: Union[EvalPrediction, PredictionOutput, np.ndarray],
+    predictions: Union["EvalPrediction", "PredictionOutput", np.ndarray],
     return_proba: bool = False,
-    threshold: float = 0.5,
+    threshold: Union[float, np.ndarray] = 0.5,
     problem_type: str = None,
+    out: Optional[np.ndarray] = None,
 ):
     """Predict the labels of a batch of samples.
 
+    The activations are computed with NumPy in float32, so it works with
+    the outputs of any backend (PyTorch, ONNX Runtime, etc.).
+
     Args:
-    - predictions: The predictions of the model.
+    - predictions: The predictions of the model (logits as a NumPy array, a torch.Tensor or a Trainer output).
     - return_proba: Whether to return the probability of each label.
-    - threshold: The threshold to be used to convert the logits to labels.
+    - threshold: The threshold to be used to convert the logits to labels (or an array with the threshold of each label for multi-label problems).
     - problem_type: The type of the problem. Can be "binary", "multi-class" or "multi-label".
+    - out: A float32 buffer with the same shape as the logits, reused to store the probabilities.
 
     Returns:
-    - The predicted labels.
+    - The predicted labels (or the probabilities if return_proba is True).
     """
-    if problem_type not in [None, "binary", "multi-class", "multi-label"]:
+    if problem_type not in PROBLEM_TYPES:
         raise ValueError(
             f"Invalid problem type: {problem_type}. "
             "It must be one of 'binary', 'multi-class' or 'multi-label'."
         )
 
-    if isinstance(predictions, (EvalPrediction, PredictionOutput)):
+    # EvalPrediction or PredictionOutput
+    if hasattr(predictions, "predictions"):
         if isinstance(predictions.predictions, tuple):
             predictions = predictions.predictions[0]
         else:
             predictions = predictions.predictions
 
+    # torch.Tensor
+    if hasattr(predictions, "detach"):
+        predictions = predictions.detach().cpu().numpy()
+
+    logits = np.asarray(predictions, dtype=np.float32)
+
+    if out is not None and (
+        out.shape != logits.shape or out.dtype != np.float32
+    ):
+        raise ValueError(
+            f"Invalid out buffer: {out.dtype} {out.shape}. "
+            f"It must be a float32 array with shape {logits.shape}."
+        )
+
     if problem_type == "multi-label":
-        act_fn = torch.nn.Sigmoid()
+        probs = sigmoid(logits, out=out)
     else:  # binary or multi-class
-        act_fn = torch.nn.Softmax(dim=1)
-
-    probs: np.ndarray = act_fn(torch.Tensor(predictions))
+        probs = softmax(logits, out=out)
 
     if return_proba:
         return probs
-    else:
+    return proba_to_labels(probs, threshold, problem_type)
+
+
+def postprocess(
+    logits: np.ndarray,
+    labels: Dict[int, str],
+    problem_type: str,
+    threshold: Union[float, np.ndarray] = 0.5,
+) -> List[Dict[str, Any]]:
+    """Convert the logits of a batch to labels and probabilities.
+
+    Args:
+    - logits: The logits with shape (batch_size, num_labels).
+    - labels: The label names (id2label).
+    - problem_type: The type of the problem ("binary", "multi-class" or "multi-label").
+    - threshold: The threshold (or the threshold of each label) to use to convert the model's output to a label.
+
+    Returns:
+    - A list with the labels and probabilities of each text.
+    """
+    probs = predict(logits, return_proba=True, problem_type=problem_type)
+    preds = proba_to_labels(probs, threshold, problem_type)
+
+    results = []
+    for prob, pred in zip(probs, preds):
         if problem_type == "multi-label":
-            return np.array(probs >= threshold, dtype=int)
+            names = [labels[i] for i in np.flatnonzero(pred)]
         else:
-            if predictions.shape[1] == 2:
-                return np.array(probs[:, 1] > threshold, dtype=int)
-            else:
-                return np.argmax(probs, axis=1)
+            names = [labels[int(pred)]]
+        results.append(
+            {
+                "labels": names,
+                "probabilities": {
+                    labels[i]: float(p) for i, p in enumerate(prob)
+                },
+            }
+        )
+    return results
+
+
+def get_tasks(
+    tasks: Dict[str, Dict[str, Any]]
+) -> Dict[str, Tuple[Dict[int, str], str]]:
+    """Get the labels and problem type of each task of a multi-task model.
+
+    Args:
+    - tasks: The tasks stored in the model config (`config.tasks`).
+
+    Returns:
+    - A dictionary with the labels (id2label) and the problem type of each task.
+    """
+    return {
+        task: (
+            dict(enumerate(params["labels"])),
+            get_problem_type(params["problem_type"], len(params["labels"])),
+        )
+        for task, params in tasks.items()
+    }
+
+
+def postprocess_tasks(
+    logits: Sequence[np.ndarray],
+    tasks: Dict[str, Tuple[Dict[int, str], str]],
+    threshold: Union[float, Dict[str, Union[float, np.ndarray]]] = 0.5,
+) -> List[Dict[str, Any]]:
+    """Convert the logits of each task of a batch to labels and probabilities.
+
+    Args:
+    - logits: The logits of each task, in the same order as `tasks`.
+    - tasks: The labels and problem type of each task (see `get_tasks`).
+    - threshold: The threshold to use to convert the model's output to a label, or the threshold of each task (see `metrics.thresholds.get_task_thresholds`).
+
+    Returns:
+    - A list with the results of each task for each text.
+    """
+    results = None
+    for (task, (labels, problem_type)), task_logits in zip(
+        tasks.items(), logits
+    ):
+        task_results = postprocess(
+            task_logits,
+            labels,
+            problem_type,
+            threshold[task] if isinstance(threshold, dict) else threshold,
+        )
+        if results is None:
+            results = [{} for _ in task_results]
+        for result, task_result in zip(results, task_results):
+            result[task] = task_result
+    return results or []
@@ -1,38 +1,150 @@
 import os
 import sys
+import queue
+import atexit
 import logging
+import logging.handlers
+from typing import Any, Callable, Optional, Union
+
+FORMAT = (
+    "%(asctime)s :: %(levelname)s :: %(module)s :: %(funcName)s :: %(message)s"
+)
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# All the loggers share one queue, drained by a single listener thread that
+# writes the records to stdout, so logging never blocks on I/O.
+_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _Lazy(object):
+    def __init__(self, func: Callable[..., Any], *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args, **self.kwargs))
+
+    def __repr__(self) -> str:
+        return repr(self.func(*self.args, **self.kwargs))
+
+
+def lazy(func: Callable[..., Any], *args, **kwargs) -> _Lazy:
+    """Defer an expensive computation to the formatting of a log record.
+
+    Pass it as a %-style argument: it is only called if the record is
+    emitted, e.g. `_logger.debug("y_pred: %s", lazy(summarize, y_pred))`.
+
+    Args:
+    - func: The function that computes the value to log.
+    - args: The positional arguments of the function.
+    - kwargs: The keyword arguments of the function.
+
+    Returns:
+    - An object that calls the function when it is formatted.
+    """
+    return _Lazy(func, *args, **kwargs)
+
+
+def summarize(value: Any, max_items: int = 10) -> str:
+    """Summarize a (possibly large) value to be logged.
+
+    Arrays are summarized by their shape, dtype and first items instead of
+    being formatted in full.
+
+    Args:
+    - value: The value (e.g. a NumPy array, a list or a dict).
+    - max_items: The maximum number of items to include.
+
+    Returns:
+    - The summary.
+    """
+    if hasattr(value, "shape") and hasattr(value, "dtype"):
+        head = value.ravel()[:max_items].tolist()
+        return f"<{type(value).__name__} shape={tuple(value.shape)} dtype={value.dtype} head={head}>"
+    if isinstance(value, (list, tuple)) and len(value) > max_items:
+        return f"<{type(value).__name__} len={len(value)} head={list(value[:max_items])}>"
+    if isinstance(value, dict) and len(value) > max_items:
+        return f"<dict len={len(value)} keys={list(value)[:max_items]}>"
+    return repr(value)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, handler: logging.Handler):
+        """Queue handler that writes directly to `handler` in forked processes.
+
+        The listener thread only runs in the process that created it, so
+        records of worker processes (e.g. `datasets.map` with `num_proc`)
+        would otherwise stay in their copy of the queue.
+
+        Args:
+        - handler: The handler of the listener.
+        """
+        super().__init__(_queue)
+        self.handler = handler
+        self.pid = os.getpid()
+
+    def emit(self, record: logging.LogRecord):
+        if os.getpid() != self.pid:
+            self.handler.handle(record)
+        else:
+            super().emit(record)
+
+
+def _get_stream_handler() -> logging.Handler:
+    """Get the handler of the listener thread (started on first use)."""
+    global _listener
+    if _listener is None:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(
+            logging.Formatter(fmt=FORMAT, datefmt=DATE_FORMAT)
+        )
+        _listener = logging.handlers.QueueListener(
+            _queue, handler, respect_handler_level=True
+        )
+        _listener.start()
+        # Flush the pending records at exit.
+        atexit.register(_listener.stop)
+    return _listener.handlers[0]
+
+
+def get_log_level() -> Union[int, str]:
+    """Get the log level from the SM_LOG_LEVEL environment variable.
+
+    Returns:
+    - The log level (INFO by default).
+    """
+    log_level = os.environ.get("SM_LOG_LEVEL", logging.INFO)
+    if isinstance(log_level, str) and log_level.isdigit():
+        log_level = int(log_level)
+    return log_level
 
 
 def setup_logger(name: str = __name__) -> logging.Logger:
     """Setup logger.
 
+    The records are put in a queue and written to stdout by a background
+    thread. Use %-style arguments (or `lazy`) instead of f-strings in the
+    calls, so nothing is formatted when the level is disabled.
+
     Args:
     - name: The name of the logger.
 
     Returns:
     - logger: The logger.
     """
-    log_level = os.environ.get("SM_LOG_LEVEL", logging.INFO)
-    if isinstance(log_level, str) and log_level.isdigit():
-        log_level = int(log_level)
+    log_level = get_log_level()
 
     logger = logging.getLogger(name)
     logger.setLevel(log_level)
 
-    # Check if the logger already has a StreamHandler
-    if len(logger.handlers) > 0:
-        for handler in logger.handlers:
-            if isinstance(handler, logging.StreamHandler):
-                return logger
+    # Check if the logger already has a QueueHandler
+    for handler in logger.handlers:
+        if isinstance(handler, logging.handlers.QueueHandler):
+            return logger
 
-    handler = logging.StreamHandler(sys.stdout)
+    handler = _QueueHandler(_get_stream_handler())
     handler.setLevel(log_level)
-
-    formatter = logging.Formatter(
-        fmt="%(asctime)s :: %(levelname)s :: %(module)s :: %(funcName)s :: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-
-    handler.setFormatter(formatter)
     logger.addHandler(handler)
     return logger
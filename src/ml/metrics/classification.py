@@ -0,0 +1,178 @@
+import numpy as np
+from typing import Dict, Optional, Union
+
+AVERAGES = [None, "binary", "micro", "macro", "weighted"]
+
+
+def confusion_matrix(
+    y_true: np.ndarray, y_pred: np.ndarray, num_labels: Optional[int] = None
+) -> np.ndarray:
+    """Compute the confusion matrix of a single-label problem.
+
+    Args:
+    - y_true: The labels with shape (num_samples,).
+    - y_pred: The predicted labels with shape (num_samples,).
+    - num_labels: The number of labels (inferred from the data if not set).
+
+    Returns:
+    - The confusion matrix with shape (num_labels, num_labels) (rows are the true labels).
+    """
+    y_true = np.asarray(y_true, dtype=np.int64).ravel()
+    y_pred = np.asarray(y_pred, dtype=np.int64).ravel()
+    max_label = int(max(y_true.max(initial=-1), y_pred.max(initial=-1)))
+    if num_labels is None:
+        num_labels = max_label + 1
+    elif max_label >= num_labels:
+        raise ValueError(
+            f"Invalid label: {max_label}. "
+            f"The labels must be lower than num_labels ({num_labels})."
+        )
+    return np.bincount(
+        y_true * num_labels + y_pred, minlength=num_labels * num_labels
+    ).reshape(num_labels, num_labels)
+
+
+def multilabel_confusion_matrix(
+    y_true: np.ndarray, y_pred: np.ndarray
+) -> np.ndarray:
+    """Compute the confusion matrix of each label of a multi-label problem.
+
+    Args:
+    - y_true: The binary labels with shape (num_samples, num_labels).
+    - y_pred: The binary predicted labels with shape (num_samples, num_labels).
+
+    Returns:
+    - The confusion matrices with shape (num_labels, 2, 2) ([[tn, fp], [fn, tp]] for each label).
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_pred = np.asarray(y_pred, dtype=np.int64)
+    num_labels = y_true.shape[1]
+    # One bincount over (label, true, pred) keys for all the labels.
+    keys = np.arange(num_labels) * 4 + y_true * 2 + y_pred
+    return np.bincount(keys.ravel(), minlength=num_labels * 4).reshape(
+        num_labels, 2, 2
+    )
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Divide two arrays, returning 0 where the denominator is 0."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(np.broadcast(numerator, denominator).shape),
+        where=denominator != 0,
+    )
+
+
+def scores_from_confusion_matrix(
+    tp: np.ndarray,
+    fp: np.ndarray,
+    fn: np.ndarray,
+    average: Optional[str] = "weighted",
+    mask: Optional[np.ndarray] = None,
+) -> Dict[str, Union[float, np.ndarray]]:
+    """Compute the precision, recall and F1 scores from the counts of each label.
+
+    Undefined scores (e.g. the precision of a label that is never
+    predicted) are set to 0, as with `zero_division=0` in scikit-learn.
+
+    Args:
+    - tp: The true positives of each label.
+    - fp: The false positives of each label.
+    - fn: The false negatives of each label.
+    - average: The average method ("micro", "macro", "weighted", "binary" for the positive label or None for the scores of each label).
+    - mask: The labels included in the averages (all of them if not set).
+
+    Returns:
+    - A dictionary with the "precision", "recall" and "f1" scores.
+    """
+    if average not in AVERAGES:
+        raise ValueError(
+            f"Invalid average: {average}. "
+            "It must be one of None, 'binary', 'micro', 'macro' or 'weighted'."
+        )
+
+    if mask is not None and average in ["micro", "macro", "weighted"]:
+        tp, fp, fn = tp[mask], fp[mask], fn[mask]
+    if average == "micro":
+        tp, fp, fn = tp.sum(), fp.sum(), fn.sum()
+    elif average == "binary":
+        tp, fp, fn = tp[1], fp[1], fn[1]
+
+    scores = {
+        "precision": _divide(tp, tp + fp),
+        "recall": _divide(tp, tp + fn),
+        "f1": _divide(2 * tp, 2 * tp + fp + fn),
+    }
+
+    if average == "macro":
+        scores = {k: v.mean() if v.size else 0.0 for k, v in scores.items()}
+    elif average == "weighted":
+        support = tp + fn
+        scores = {
+            k: _divide((v * support).sum(), support.sum())
+            for k, v in scores.items()
+        }
+
+    if average is None:
+        return scores
+    return {k: float(v) for k, v in scores.items()}
+
+
+def classification_scores(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    average: Optional[str] = "weighted",
+    num_labels: Optional[int] = None,
+) -> Dict[str, Union[float, np.ndarray]]:
+    """Compute the accuracy, precision, recall and F1 scores from one confusion matrix.
+
+    1D arrays are handled as single-label (binary or multi-class) problems
+    and 2D arrays as multi-label problems. The scores match scikit-learn
+    with `zero_division=0`: the accuracy of multi-label problems is the
+    subset accuracy and the single-label averages only include the labels
+    that are in `y_true` or `y_pred`.
+
+    Args:
+    - y_true: The labels.
+    - y_pred: The predicted labels.
+    - average: The average method ("micro", "macro", "weighted", "binary" or None for the scores of each label).
+    - num_labels: The number of labels of single-label problems (inferred from the data if not set).
+
+    Returns:
+    - A dictionary with the "accuracy", "precision", "recall" and "f1" scores.
+    """
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    if y_true.shape != y_pred.shape:
+        raise ValueError(
+            f"Invalid shapes: {y_true.shape} (labels) and {y_pred.shape} (predictions). "
+            "They must be equal."
+        )
+
+    if y_true.ndim == 2 and average == "binary":
+        raise ValueError(
+            "The 'binary' average is not supported in multi-label problems."
+        )
+    if average == "binary" and num_labels is None:
+        num_labels = 2
+
+    if y_true.ndim == 2:
+        matrix = multilabel_confusion_matrix(y_true, y_pred)
+        tp, fp, fn = matrix[:, 1, 1], matrix[:, 0, 1], matrix[:, 1, 0]
+        mask = None
+        correct = (y_true.astype(np.int64) == y_pred).all(axis=1).sum()
+    else:
+        matrix = confusion_matrix(y_true, y_pred, num_labels=num_labels)
+        tp = np.diag(matrix)
+        fp = matrix.sum(axis=0) - tp
+        fn = matrix.sum(axis=1) - tp
+        mask = (tp + fp + fn) > 0
+        correct = tp.sum()
+
+    return {
+        "accuracy": float(_divide(correct, len(y_true))),
+        **scores_from_confusion_matrix(tp, fp, fn, average=average, mask=mask),
+    }
@@ -1,5 +1,76 @@
+import itertools
 import numpy as np
-from typing import List
+from typing import Dict, List
+
+# Offsets are packed with the document index into a single int64 key:
+# (doc_idx << _OFFSET_BITS) | offset.
+_OFFSET_BITS = 32
+
+
+def _pack_offsets(y: List[List[int]]) -> np.ndarray:
+    """Pack the offsets of all documents into sorted unique int64 keys.
+
+    Args:
+    - y: a list of offsets per document
+
+    Returns:
+    - keys: the sorted unique (document, offset) keys
+    """
+    lengths = np.fromiter((len(x) for x in y), dtype=np.int64, count=len(y))
+    offsets = np.fromiter(
+        itertools.chain.from_iterable(y),
+        dtype=np.int64,
+        count=int(lengths.sum()),
+    )
+    doc_idx = np.repeat(np.arange(len(y), dtype=np.int64), lengths)
+
+    keys = np.sort((doc_idx << _OFFSET_BITS) | offsets)
+    if len(keys) > 1:
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return keys
+
+
+def span_scores(
+    y_true: List[List[int]], y_pred: List[List[int]]
+) -> Dict[str, float]:
+    """
+    Compute the precision, recall and F1 scores operating on two lists of offsets (e.g., character).
+    All documents are processed in a single vectorized pass.
+    >>> assert span_scores([[0, 1, 4, 5]], [[0, 1, 6]])["recall"] == 0.5
+
+    Args:
+    - y_true: a list of offsets serving as the ground truth
+    - y_pred: a list of predicted offsets
+
+    Returns:
+    - scores: a dictionary with the precision, recall and f1 scores
+    """
+    n_docs = min(len(y_true), len(y_pred))
+    true_keys = _pack_offsets(y_true[:n_docs])
+    pred_keys = _pack_offsets(y_pred[:n_docs])
+    common_keys = np.intersect1d(true_keys, pred_keys, assume_unique=True)
+
+    n_true = np.bincount(true_keys >> _OFFSET_BITS, minlength=n_docs)
+    n_pred = np.bincount(pred_keys >> _OFFSET_BITS, minlength=n_docs)
+    n_common = np.bincount(common_keys >> _OFFSET_BITS, minlength=n_docs)
+
+    both_empty = (n_true == 0) & (n_pred == 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(
+            both_empty, 1.0, np.where(n_pred > 0, n_common / n_pred, 0.0)
+        )
+        recall = np.where(
+            both_empty, 1.0, np.where(n_true > 0, n_common / n_true, 0.0)
+        )
+
+    precision = np.mean(precision)
+    recall = np.mean(recall)
+    if precision + recall == 0:
+        f1 = 0.0
+    else:
+        f1 = 2 * (precision * recall) / (precision + recall)
+
+    return {"precision": precision, "recall": recall, "f1": f1}
 
 
 def precision_score(y_true: List[int], y_pred: List[int]):
@@ -14,20 +85,7 @@ def precision_score(y_true: List[int], y_pred: List[int]):
     Returns:
     - precision: the precision score
     """
-    scores = []
-    for pred, true in zip(y_pred, y_true):
-        if len(true) == 0 and len(pred) == 0:
-            scores.append(1)
-        elif len(true) == 0 and len(pred) != 0:
-            scores.append(0)
-        elif len(true) != 0 and len(pred) == 0:
-            scores.append(0)
-        else:
-            pred_set = set(pred)
-            true_set = set(true)
-            scores.append(len(pred_set.intersection(true_set)) / len(pred_set))
-
-    return np.mean(scores)
+    return span_scores(y_true, y_pred)["precision"]
 
 
 def recall_score(y_true: List[int], y_pred: List[int]):
@@ -42,19 +100,7 @@ def recall_score(y_true: List[int], y_pred: List[int]):
     Returns:
     - recall: the recall score
     """
-    scores = []
-    for pred, true in zip(y_pred, y_true):
-        if len(true) == 0 and len(pred) == 0:
-            scores.append(1)
-        elif len(true) == 0 and len(pred) != 0:
-            scores.append(0)
-        elif len(true) != 0 and len(pred) == 0:
-            scores.append(0)
-        else:
-            pred_set = set(pred)
-            true_set = set(true)
-            scores.append(len(pred_set.intersection(true_set)) / len(true_set))
-    return np.mean(scores)
+    return span_scores(y_true, y_pred)["recall"]
 
 
 def f1_score(y_true: List[int], y_pred: List[int]):
@@ -69,8 +115,4 @@ def f1_score(y_true: List[int], y_pred: List[int]):
     Returns:
     - f1: the F1 score
     """
-    precision = precision_score(y_true, y_pred)
-    recall = recall_score(y_true, y_pred)
-    if precision + recall == 0:
-        return 0.0
-    return 2 * (precision * recall) / (precision + recall)
+    return span_scores(y_true, y_pred)["f1"]
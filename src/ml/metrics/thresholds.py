@@ -0,0 +1,264 @@
+import os
+import json
+import numpy as np
+from typing import Any, Dict, Optional, Tuple, Union
+
+THRESHOLDS_FILE_NAME = "thresholds.json"
+
+
+def get_candidate_thresholds(num_thresholds: int = 199) -> np.ndarray:
+    """Get evenly spaced candidate thresholds in the open interval (0, 1).
+
+    Args:
+    - num_thresholds: The number of thresholds (199 gives a 0.005 step).
+
+    Returns:
+    - The candidate thresholds.
+    """
+    return np.linspace(0, 1, num_thresholds + 2)[1:-1]
+
+
+def sweep_thresholds(
+    y_true: np.ndarray, probs: np.ndarray, thresholds: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Compute the scores of each label for every candidate threshold.
+
+    Each label is sorted by probability once. The number of predicted
+    positives at a threshold is then a binary search in the sorted scores
+    and the true positives a lookup in their cumulative sum, so the whole
+    sweep costs O(n log n) per label instead of one metric call per
+    threshold. A sample is predicted positive if its probability is
+    greater than or equal to the threshold (as in `inference.predict`).
+
+    Args:
+    - y_true: The binary labels with shape (num_samples, num_labels).
+    - probs: The probabilities with shape (num_samples, num_labels).
+    - thresholds: The candidate thresholds with shape (num_thresholds,).
+
+    Returns:
+    - A dictionary with the "precision", "recall" and "f1" arrays with shape (num_thresholds, num_labels).
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    probs = np.asarray(probs)
+    thresholds = np.asarray(thresholds)
+    if y_true.shape != probs.shape or probs.ndim != 2:
+        raise ValueError(
+            f"Invalid shapes: {y_true.shape} (labels) and {probs.shape} (probabilities). "
+            "They must be equal and have two dimensions."
+        )
+
+    num_samples, num_labels = probs.shape
+    order = np.argsort(probs, axis=0, kind="stable")
+    sorted_probs = np.take_along_axis(probs, order, axis=0)
+    sorted_true = np.take_along_axis(y_true, order, axis=0)
+
+    # Number of positives among the i samples with the lowest probabilities.
+    cum_pos = np.zeros((num_samples + 1, num_labels), dtype=np.int64)
+    np.cumsum(sorted_true, axis=0, out=cum_pos[1:])
+    n_pos = cum_pos[-1]
+
+    # Number of samples below each threshold (predicted negatives).
+    n_below = np.stack(
+        [
+            np.searchsorted(sorted_probs[:, i], thresholds, side="left")
+            for i in range(num_labels)
+        ],
+        axis=1,
+    )
+
+    tp = n_pos - np.take_along_axis(cum_pos, n_below, axis=0)
+    n_pred = num_samples - n_below
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(n_pred > 0, tp / n_pred, 0.0)
+        recall = np.where(n_pos > 0, tp / n_pos, 0.0)
+        f1 = np.where(n_pred + n_pos > 0, 2 * tp / (n_pred + n_pos), 0.0)
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def find_best_thresholds(
+    y_true: np.ndarray,
+    probs: np.ndarray,
+    thresholds: Optional[np.ndarray] = None,
+    metric: str = "f1",
+) -> Dict[str, np.ndarray]:
+    """Find the threshold that maximizes a metric for each label.
+
+    Args:
+    - y_true: The binary labels with shape (num_samples, num_labels).
+    - probs: The probabilities with shape (num_samples, num_labels).
+    - thresholds: The candidate thresholds (see `get_candidate_thresholds` for the default).
+    - metric: The metric to maximize ("f1", "precision" or "recall").
+
+    Returns:
+    - A dictionary with the best "thresholds" and their "scores" (one per label).
+    """
+    if thresholds is None:
+        thresholds = get_candidate_thresholds()
+    thresholds = np.asarray(thresholds)
+
+    scores = sweep_thresholds(y_true, probs, thresholds)
+    if metric not in scores:
+        raise ValueError(
+            f"Invalid metric: {metric}. "
+            f"It must be one of {', '.join(scores)}."
+        )
+
+    # Ties are broken by the lowest threshold.
+    best = np.argmax(scores[metric], axis=0)
+    return {
+        "thresholds": thresholds[best],
+        "scores": scores[metric][best, np.arange(len(best))],
+    }
+
+
+def tune_thresholds(
+    y_true: np.ndarray,
+    probs: np.ndarray,
+    labels: Dict[int, str],
+    num_thresholds: int = 199,
+    metric: str = "f1",
+    default_threshold: float = 0.5,
+) -> Dict[str, Dict[str, Any]]:
+    """Find the best threshold of each label and compare it to a global one.
+
+    Args:
+    - y_true: The binary labels with shape (num_samples, num_labels).
+    - probs: The probabilities with shape (num_samples, num_labels).
+    - labels: The label names (id2label).
+    - num_thresholds: The number of candidate thresholds.
+    - metric: The metric to maximize ("f1", "precision" or "recall").
+    - default_threshold: The global threshold used as the baseline.
+
+    Returns:
+    - A report with the threshold, the tuned score and the baseline score of each label.
+    """
+    best = find_best_thresholds(
+        y_true,
+        probs,
+        thresholds=get_candidate_thresholds(num_thresholds),
+        metric=metric,
+    )
+    baseline = sweep_thresholds(y_true, probs, np.array([default_threshold]))[
+        metric
+    ][0]
+
+    return {
+        labels[i]: {
+            "threshold": float(best["thresholds"][i]),
+            metric: float(best["scores"][i]),
+            f"{metric}@{default_threshold}": float(baseline[i]),
+        }
+        for i in range(len(labels))
+    }
+
+
+def save_thresholds(
+    thresholds: np.ndarray, labels: Dict[int, str], output_dir: str
+) -> str:
+    """Save the per-label thresholds next to the model artifacts.
+
+    Args:
+    - thresholds: The threshold of each label.
+    - labels: The label names (id2label).
+    - output_dir: The model directory.
+
+    Returns:
+    - The path of the thresholds file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, THRESHOLDS_FILE_NAME)
+    with open(path, "w") as f:
+        json.dump(
+            {labels[i]: float(t) for i, t in enumerate(thresholds)},
+            f,
+            indent=4,
+        )
+    return path
+
+
+def load_thresholds(
+    model_name_or_path: str, labels: Dict[int, str]
+) -> Optional[np.ndarray]:
+    """Load the per-label thresholds of a model.
+
+    Args:
+    - model_name_or_path: The model directory or Hugging Face Hub ID.
+    - labels: The label names (id2label).
+
+    Returns:
+    - The threshold of each label, or None if the model has no thresholds file.
+    """
+    if os.path.isdir(model_name_or_path):
+        path = os.path.join(model_name_or_path, THRESHOLDS_FILE_NAME)
+        if not os.path.isfile(path):
+            return None
+    else:
+        from huggingface_hub import hf_hub_download
+        from huggingface_hub.utils import EntryNotFoundError
+
+        try:
+            path = hf_hub_download(model_name_or_path, THRESHOLDS_FILE_NAME)
+        except EntryNotFoundError:
+            return None
+
+    with open(path) as f:
+        thresholds = json.load(f)
+
+    missing = [x for x in labels.values() if x not in thresholds]
+    if missing:
+        raise ValueError(
+            f"Missing thresholds in {path}: {', '.join(missing)}."
+        )
+    return np.array(
+        [thresholds[labels[i]] for i in range(len(labels))],
+        dtype=np.float32,
+    )
+
+
+def get_threshold(
+    model_name_or_path: str,
+    labels: Dict[int, str],
+    problem_type: str,
+    threshold: float = 0.5,
+) -> Union[float, np.ndarray]:
+    """Get the threshold of a model.
+
+    Multi-label models use the per-label thresholds saved with the model
+    (thresholds.json) when they exist.
+
+    Args:
+    - model_name_or_path: The model directory or Hugging Face Hub ID.
+    - labels: The label names (id2label).
+    - problem_type: The type of the problem ("binary", "multi-class" or "multi-label").
+    - threshold: The default threshold.
+
+    Returns:
+    - The threshold or the threshold of each label.
+    """
+    if problem_type != "multi-label":
+        return threshold
+    thresholds = load_thresholds(model_name_or_path, labels)
+    return threshold if thresholds is None else thresholds
+
+
+def get_task_thresholds(
+    model_name_or_path: str,
+    tasks: Dict[str, Tuple[Dict[int, str], str]],
+    threshold: float = 0.5,
+) -> Dict[str, Union[float, np.ndarray]]:
+    """Get the threshold of each task of a multi-task model (see `get_threshold`).
+
+    Args:
+    - model_name_or_path: The model directory or Hugging Face Hub ID.
+    - tasks: The labels and problem type of each task (see `inference.get_tasks`).
+    - threshold: The default threshold.
+
+    Returns:
+    - The threshold (or the threshold of each label) of each task.
+    """
+    return {
+        task: get_threshold(
+            model_name_or_path, labels, problem_type, threshold
+        )
+        for task, (labels, problem_type) in tasks.items()
+    }
@@ -1,13 +1,9 @@
-from typing import Dict
+import numpy as np
+from typing import Any, Dict
 from transformers import EvalPrediction
 from inference import predict
-from logger import setup_logger
-from sklearn.metrics import (
-    f1_score,
-    accuracy_score,
-    precision_score,
-    recall_score,
-)
+from logger import lazy, setup_logger, summarize
+from metrics.classification import classification_scores
 
 _logger = setup_logger(__name__)
 
@@ -20,28 +16,89 @@ def compute_metrics(
 ) -> Dict[str, float]:
     """Compute the metrics for multi-label classification.
 
+    All the metrics are derived from a single confusion matrix (one per
+    label in multi-label problems).
+
     Args:
     - p: The predictions of the model.
     - threshold: The threshold to use to convert the model's output to a label.
-    - average: The average method to use for the metrics.
+    - average: The average method to use for the metrics ("micro", "macro" or "weighted").
     - problem_type: The type of the problem (used in the predict function).
 
     Returns:
     - A dictionary containing the metrics (accuracy, f1, precision, recall).
     """
     _logger.debug(
-        f"Computing metrics with threshold: {threshold} and average: {average}."
+        "Computing metrics with threshold: %s and average: %s.",
+        threshold,
+        average,
     )
 
     y_true = p.label_ids
     y_pred = predict(p, threshold=threshold, problem_type=problem_type)
 
-    _logger.debug(f"y_true: {y_true}")
-    _logger.debug(f"y_pred: {y_pred}")
+    _logger.debug("y_true: %s", lazy(summarize, y_true))
+    _logger.debug("y_pred: %s", lazy(summarize, y_pred))
 
+    scores = classification_scores(y_true, y_pred, average=average)
     return {
-        "accuracy": accuracy_score(y_true, y_pred),
-        "f1": f1_score(y_true, y_pred, average=average),
-        "precision": precision_score(y_true, y_pred, average=average),
-        "recall": recall_score(y_true, y_pred, average=average),
+        "accuracy": scores["accuracy"],
+        "f1": scores["f1"],
+        "precision": scores["precision"],
+        "recall": scores["recall"],
     }
+
+
+def compute_multi_task_metrics(
+    p: EvalPrediction,
+    tasks: Dict[str, Dict[str, Any]],
+    threshold: float = 0.5,
+    average: str = "weighted",
+) -> Dict[str, float]:
+    """Compute the metrics of a multi-task model.
+
+    Samples labeled with -100 are ignored in the metrics of the task.
+    The metrics of each task are prefixed with the task name and the
+    unprefixed metrics are the mean over the tasks.
+
+    Args:
+    - p: The predictions of the model (one logits/labels array per task).
+    - tasks: The tasks, in the same order as the model outputs.
+    - threshold: The threshold to use to convert the model's output to a label.
+    - average: The average method to use for the metrics.
+
+    Returns:
+    - A dictionary containing the metrics of each task and their mean.
+    """
+    metrics = {}
+    for idx, (task, params) in enumerate(tasks.items()):
+        logits = p.predictions[idx]
+        labels = p.label_ids[idx]
+
+        if params["problem_type"] == "multi_label_classification":
+            mask = labels[:, 0] != -100
+            problem_type = "multi-label"
+        else:
+            mask = labels != -100
+            problem_type = (
+                "binary" if len(params["labels"]) == 2 else "multi-class"
+            )
+
+        if not mask.any():
+            _logger.warning(f"No samples to evaluate for task {task}.")
+            continue
+
+        task_metrics = compute_metrics(
+            EvalPrediction(predictions=logits[mask], label_ids=labels[mask]),
+            threshold=threshold,
+            average=average,
+            problem_type=problem_type,
+        )
+        for key, value in task_metrics.items():
+            metrics[f"{task}_{key}"] = value
+
+    for key in ["accuracy", "f1", "precision", "recall"]:
+        values = [v for k, v in metrics.items() if k.endswith(f"_{key}")]
+        metrics[key] = float(np.mean(values)) if values else 0.0
+
+    return metrics
@@ -1,8 +1,10 @@
 import torch
 import warnings
+from dataclasses import dataclass
 from typing import Optional, Union, Tuple
 from transformers import BertForSequenceClassification
 from transformers.modeling_outputs import SequenceClassifierOutput
+from transformers.utils import ModelOutput
 from transformers.models.bert.modeling_bert import (
     BERT_INPUTS_DOCSTRING,
     _CHECKPOINT_FOR_SEQUENCE_CLASSIFICATION,
@@ -121,3 +123,139 @@ class ToxicityTypeForSequenceClassification(BertForSequenceClassification):
             hidden_states=outputs.hidden_states,
             attentions=outputs.attentions,
         )
+
+
+@dataclass
+class MultiTaskSequenceClassifierOutput(ModelOutput):
+    loss: Optional[torch.FloatTensor] = None
+    logits: Tuple[torch.FloatTensor] = None
+    hidden_states: Optional[Tuple[torch.FloatTensor]] = None
+    attentions: Optional[Tuple[torch.FloatTensor]] = None
+
+
+class ToxicityMultiTaskForSequenceClassification(
+    ToxicityTypeForSequenceClassification
+):
+    def __init__(self, config, tasks=None, pos_weight=None, weight=None):
+        """BERT encoder shared by one classification head per task.
+
+        Args:
+        - config: The model config.
+        - tasks: The tasks (e.g. {"toxicity": {"labels": [...], "problem_type": "single_label_classification"}}).
+        It's stored in `config.tasks`, so it's only needed when the model is created.
+        - pos_weight: The positive weights of the multi-label tasks (task name -> torch.Tensor).
+        - weight: The class weights of the single-label tasks (task name -> torch.Tensor).
+        """
+        if tasks is not None:
+            config.tasks = tasks
+        super().__init__(config)
+
+        self.tasks = config.tasks
+        self.classifier = torch.nn.ModuleDict(
+            {
+                task: torch.nn.Linear(
+                    config.hidden_size, len(params["labels"])
+                )
+                for task, params in self.tasks.items()
+            }
+        )
+        self.pos_weight = pos_weight or {}
+        self.weight = weight or {}
+
+        self.post_init()
+
+    def forward(
+        self,
+        input_ids: Optional[torch.Tensor] = None,
+        attention_mask: Optional[torch.Tensor] = None,
+        token_type_ids: Optional[torch.Tensor] = None,
+        position_ids: Optional[torch.Tensor] = None,
+        head_mask: Optional[torch.Tensor] = None,
+        inputs_embeds: Optional[torch.Tensor] = None,
+        output_attentions: Optional[bool] = None,
+        output_hidden_states: Optional[bool] = None,
+        return_dict: Optional[bool] = None,
+        **labels,
+    ) -> Union[Tuple[torch.Tensor], MultiTaskSequenceClassifierOutput]:
+        r"""
+        labels (`{task}_labels`, *optional*):
+            Labels of each task. Samples that don't apply to a task must be labeled with -100
+            (for multi-label tasks, the whole row must be -100).
+        """
+        return_dict = (
+            return_dict
+            if return_dict is not None
+            else self.config.use_return_dict
+        )
+
+        outputs = self.bert(
+            input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+            position_ids=position_ids,
+            head_mask=head_mask,
+            inputs_embeds=inputs_embeds,
+            output_attentions=output_attentions,
+            output_hidden_states=output_hidden_states,
+            return_dict=return_dict,
+        )
+
+        pooled_output = self.dropout(outputs[1])
+        logits = tuple(
+            self.classifier[task](pooled_output) for task in self.tasks
+        )
+
+        loss = None
+        for task, task_logits in zip(self.tasks, logits):
+            task_labels = labels.get(f"{task}_labels")
+            if task_labels is None:
+                continue
+
+            task_loss = self.compute_task_loss(task, task_logits, task_labels)
+            if task_loss is not None:
+                loss = task_loss if loss is None else loss + task_loss
+
+        if not return_dict:
+            output = (logits,) + outputs[2:]
+            return ((loss,) + output) if loss is not None else output
+
+        return MultiTaskSequenceClassifierOutput(
+            loss=loss,
+            logits=logits,
+            hidden_states=outputs.hidden_states,
+            attentions=outputs.attentions,
+        )
+
+    def compute_task_loss(
+        self, task: str, logits: torch.Tensor, labels: torch.Tensor
+    ) -> Optional[torch.Tensor]:
+        """Compute the loss of a task, ignoring the samples labeled with -100.
+
+        Args:
+        - task: The task name.
+        - logits: The logits of the task head.
+        - labels: The labels of the task.
+
+        Returns:
+        - The loss or None if no sample in the batch applies to the task.
+        """
+        if self.tasks[task]["problem_type"] == "multi_label_classification":
+            mask = labels[:, 0] != -100
+            if not mask.any():
+                return None
+            pos_weight = self.pos_weight.get(task)
+            loss_fct = torch.nn.BCEWithLogitsLoss(
+                pos_weight=pos_weight.to(self.device)
+                if pos_weight is not None
+                else None
+            )
+            return loss_fct(logits[mask], labels[mask].float())
+
+        labels = labels.view(-1).long()
+        if not (labels != -100).any():
+            return None
+        weight = self.weight.get(task)
+        loss_fct = torch.nn.CrossEntropyLoss(
+            weight=weight.to(self.device) if weight is not None else None
+        )
+        return loss_fct(logits, labels)
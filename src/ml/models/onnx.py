@@ -0,0 +1,106 @@
+import os
+import torch
+from typing import List
+from transformers import PreTrainedModel, PreTrainedTokenizerBase
+
+from logger import setup_logger
+
+_logger = setup_logger(__name__)
+
+ONNX_FILE_NAME = "model.onnx"
+
+
+class OnnxExportWrapper(torch.nn.Module):
+    def __init__(self, model: PreTrainedModel):
+        """Wrap a sequence classification model to return only the logits.
+
+        `torch.onnx.export` can't trace `ModelOutput` objects, so the wrapper
+        returns a tuple with the logits (one tensor per task for multi-task models).
+
+        Args:
+        - model: The model.
+        """
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        logits = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+            return_dict=True,
+        ).logits
+        if isinstance(logits, tuple):
+            return logits
+        return (logits,)
+
+
+def get_output_names(model: PreTrainedModel) -> List[str]:
+    """Get the names of the ONNX outputs of a model.
+
+    Args:
+    - model: The model.
+
+    Returns:
+    - ["logits"] or ["{task}_logits", ...] for multi-task models.
+    """
+    tasks = getattr(model.config, "tasks", None)
+    if tasks:
+        return [f"{task}_logits" for task in tasks]
+    return ["logits"]
+
+
+def export_onnx(
+    model: PreTrainedModel,
+    tokenizer: PreTrainedTokenizerBase,
+    output_dir: str,
+    opset_version: int = 14,
+    file_name: str = ONNX_FILE_NAME,
+) -> str:
+    """Export a sequence classification model to ONNX.
+
+    The batch size and the sequence length are dynamic axes, so the graph
+    can be used with padded batches of any shape.
+
+    Args:
+    - model: The model (e.g. `ToxicityTypeForSequenceClassification`).
+    - tokenizer: The tokenizer of the model.
+    - output_dir: The directory where the ONNX graph will be saved.
+    - opset_version: The ONNX opset version.
+    - file_name: The file name of the ONNX graph.
+
+    Returns:
+    - The path of the ONNX graph.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, file_name)
+
+    device = next(model.parameters()).device
+    dummy = tokenizer(
+        ["Exemplo de comentário.", "Outro exemplo"],
+        padding=True,
+        return_tensors="pt",
+        return_token_type_ids=True,
+    ).to(device)
+
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    output_names = get_output_names(model)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes.update({name: {0: "batch"} for name in output_names})
+
+    training = model.training
+    wrapper = OnnxExportWrapper(model).eval()
+    _logger.info(f"Exporting model to ONNX: {path}.")
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            tuple(dummy[name] for name in input_names),
+            path,
+            input_names=input_names,
+            output_names=output_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=opset_version,
+            do_constant_folding=True,
+        )
+    model.train(training)
+    return path
@@ -0,0 +1,105 @@
+import io
+import os
+import torch
+from typing import Type
+from transformers import (
+    AutoConfig,
+    AutoModelForSequenceClassification,
+    PreTrainedModel,
+    PreTrainedTokenizerBase,
+)
+from transformers.modeling_utils import no_init_weights
+
+QUANTIZED_FILE_NAME = "pytorch_model_int8.bin"
+
+
+def quantize_model(model: torch.nn.Module) -> torch.nn.Module:
+    """Apply dynamic int8 quantization to the Linear layers of a model.
+
+    The weights are stored as int8 and the activations are quantized on
+    the fly, so it only runs on CPU.
+
+    Args:
+    - model: The model.
+
+    Returns:
+    - The quantized model.
+    """
+    return torch.quantization.quantize_dynamic(
+        model.cpu().eval(), {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def get_model_size(model: torch.nn.Module) -> int:
+    """Get the size of the serialized state dict of a model.
+
+    Args:
+    - model: The model.
+
+    Returns:
+    - The size in bytes.
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+
+def save_quantized_model(
+    model: PreTrainedModel,
+    tokenizer: PreTrainedTokenizerBase,
+    output_dir: str,
+) -> str:
+    """Quantize a model and save it with its config and tokenizer.
+
+    Args:
+    - model: The model (e.g. the one saved by `trainer.save_model`).
+    - tokenizer: The tokenizer of the model.
+    - output_dir: The directory of the quantized artifact.
+
+    Returns:
+    - The path of the quantized weights.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, QUANTIZED_FILE_NAME)
+
+    model.config.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    torch.save(quantize_model(model).state_dict(), path)
+    return path
+
+
+def load_quantized_model(
+    model_dir: str,
+    model_class: Type = AutoModelForSequenceClassification,
+    weights_path: str = None,
+) -> torch.nn.Module:
+    """Load a model saved by `save_quantized_model`.
+
+    The model is built from its config without initializing its weights,
+    quantized and then filled with the int8 weights, so the float weights
+    are never loaded.
+
+    Args:
+    - model_dir: The directory (or Hugging Face Hub ID) of the quantized artifact.
+    - model_class: The model class (an Auto class or a `PreTrainedModel` subclass).
+    - weights_path: The local path of the quantized weights (default: `model_dir`/pytorch_model_int8.bin).
+
+    Returns:
+    - The quantized model in evaluation mode.
+    """
+    config = AutoConfig.from_pretrained(model_dir)
+    with no_init_weights():
+        if isinstance(model_class, type) and issubclass(
+            model_class, PreTrainedModel
+        ):
+            model = model_class(config)
+        else:
+            model = model_class.from_config(config)
+
+    model = quantize_model(model)
+    state_dict = torch.load(
+        weights_path or os.path.join(model_dir, QUANTIZED_FILE_NAME),
+        map_location="cpu",
+    )
+    model.load_state_dict(state_dict)
+    return model.eval()
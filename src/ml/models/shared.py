@@ -0,0 +1,207 @@
+import os
+import glob
+import fcntl
+import hashlib
+import tempfile
+import torch
+from typing import Dict, Optional, Type
+from safetensors import safe_open
+from safetensors.torch import save_file
+from transformers import (
+    AutoConfig,
+    AutoModelForSequenceClassification,
+    PreTrainedModel,
+)
+from transformers.modeling_utils import no_init_weights
+from transformers.utils import CONFIG_NAME, cached_file
+
+SHARED_FILE_NAME = "model.safetensors"
+
+
+def save_weights(model: torch.nn.Module, path: str) -> str:
+    """Save the weights of a model in the safetensors format.
+
+    The tensors are written after an 8-byte aligned header, by decreasing
+    item size, so every tensor can be memory-mapped without a copy.
+
+    Args:
+    - model: The model.
+    - path: The path of the weights file.
+
+    Returns:
+    - The path of the weights file.
+    """
+    save_file(
+        {
+            name: tensor.detach().cpu().contiguous()
+            for name, tensor in model.state_dict().items()
+        },
+        path,
+    )
+    return path
+
+
+def load_weights(path: str) -> Dict[str, torch.Tensor]:
+    """Memory-map the weights of a safetensors file.
+
+    The tensors are views of the file (mapped by `safe_open`), so the
+    processes that load the same file share the same physical memory (the
+    page cache).
+
+    Args:
+    - path: The path of the weights file.
+
+    Returns:
+    - The tensors (views of the file).
+    """
+    with safe_open(path, framework="pt") as f:
+        return {name: f.get_tensor(name) for name in f.keys()}
+
+
+def assign_weights(model: torch.nn.Module, tensors: Dict[str, torch.Tensor]):
+    """Replace the parameters and buffers of a model with the given tensors (no copy).
+
+    Args:
+    - model: The model.
+    - tensors: The tensors (e.g. returned by `load_weights`).
+    """
+    state_dict = model.state_dict()
+    missing = [name for name in state_dict if name not in tensors]
+    if missing:
+        raise ValueError(f"Missing weights: {', '.join(missing)}.")
+
+    for name in state_dict:
+        module_name, _, attr = name.rpartition(".")
+        module = model.get_submodule(module_name)
+        if attr in module._parameters:
+            module._parameters[attr] = torch.nn.Parameter(
+                tensors[name], requires_grad=False
+            )
+        else:
+            module._buffers[attr] = tensors[name]
+
+    # Tied weights point to the same tensor again.
+    if isinstance(model, PreTrainedModel):
+        model.tie_weights()
+
+
+def get_weights_version(model_name_or_path: str) -> str:
+    """Get a string that changes when the saved weights of a model change.
+
+    Args:
+    - model_name_or_path: The path or Hugging Face Hub ID of the model.
+
+    Returns:
+    - For model directories, the size and modification time of the config and weights files; for Hub IDs, the commit hash of the resolved snapshot.
+    """
+    if os.path.isdir(model_name_or_path):
+        files = [os.path.join(model_name_or_path, CONFIG_NAME)]
+        files += sorted(
+            glob.glob(os.path.join(model_name_or_path, "pytorch_model*"))
+        )
+        versions = []
+        for path in files:
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                versions.append(
+                    f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+                )
+        return ",".join(versions)
+
+    # Hub files are cached in snapshots/<commit hash>/.
+    config_path = cached_file(model_name_or_path, CONFIG_NAME)
+    return os.path.basename(os.path.dirname(config_path))
+
+
+def get_shared_weights_path(
+    model_name_or_path: str,
+    model_class: Type = AutoModelForSequenceClassification,
+    cache_dir: Optional[str] = None,
+) -> str:
+    """Get the safetensors file of a model, converting the weights if needed.
+
+    Model directories with a `model.safetensors` file are used as is.
+    Otherwise, the weights are converted once to `cache_dir`: the first
+    process converts them while holding a file lock and the others wait
+    for it, so only one process loads a private copy of the weights. The
+    converted file is keyed by the model, the model class and the version
+    of the weights (see `get_weights_version`), so retrained or updated
+    models are converted again.
+
+    Args:
+    - model_name_or_path: The path or Hugging Face Hub ID of the model.
+    - model_class: The model class (an Auto class or a `PreTrainedModel` subclass).
+    - cache_dir: The directory of the converted weights (default: the temporary directory).
+
+    Returns:
+    - The path of the safetensors file.
+    """
+    path = os.path.join(model_name_or_path, SHARED_FILE_NAME)
+    if os.path.isfile(path):
+        return path
+
+    cache_dir = cache_dir or os.path.join(
+        tempfile.gettempdir(), "shared-weights"
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    name = (
+        os.path.abspath(model_name_or_path)
+        if os.path.isdir(model_name_or_path)
+        else model_name_or_path
+    )
+    key = hashlib.sha1(
+        "\n".join(
+            [
+                name,
+                getattr(model_class, "__name__", str(model_class)),
+                get_weights_version(model_name_or_path),
+            ]
+        ).encode()
+    ).hexdigest()
+    path = os.path.join(cache_dir, f"{key}.safetensors")
+
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not os.path.isfile(path):
+                model = model_class.from_pretrained(model_name_or_path)
+                save_weights(model, f"{path}.tmp")
+                os.replace(f"{path}.tmp", path)
+                del model
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return path
+
+
+def load_shared_model(
+    model_name_or_path: str,
+    model_class: Type = AutoModelForSequenceClassification,
+    cache_dir: Optional[str] = None,
+) -> torch.nn.Module:
+    """Load a model whose weights are memory-mapped from a safetensors file.
+
+    The model is built from its config without initializing the weights,
+    and its parameters are replaced with read-only views of the file. Every
+    worker process that loads the model shares one copy of the weights.
+
+    Args:
+    - model_name_or_path: The path or Hugging Face Hub ID of the model.
+    - model_class: The model class (an Auto class or a `PreTrainedModel` subclass).
+    - cache_dir: The directory of the converted weights (see `get_shared_weights_path`).
+
+    Returns:
+    - The model (on CPU) in evaluation mode.
+    """
+    path = get_shared_weights_path(model_name_or_path, model_class, cache_dir)
+
+    config = AutoConfig.from_pretrained(model_name_or_path)
+    with no_init_weights():
+        if isinstance(model_class, type) and issubclass(
+            model_class, PreTrainedModel
+        ):
+            model = model_class(config)
+        else:
+            model = model_class.from_config(config)
+
+    assign_weights(model, load_weights(path))
+    return model.eval()
@@ -1,15 +1,16 @@
 import os
 import json
 import random
+import hashlib
 import numpy as np
-from typing import List, Union, Set
+from typing import Iterable, Iterator, List, Tuple, Union
 
 import spacy
 import string
-import itertools
 import warnings
 from pathlib import Path
-from spacy.tokens import Doc
+from spacy.symbols import SPACE
+from spacy.tokens import Doc, DocBin
 from spacy.training.example import Example
 from sklearn.base import BaseEstimator
 import seaborn as sns
@@ -22,36 +23,41 @@ from logger import setup_logger
 _logger = setup_logger(__name__)
 
 
-def _contiguous_ranges(span_list: List[int]):
+def _contiguous_ranges(span_list: List[int]) -> List[Tuple[int, int]]:
     """Extracts continguous runs [1, 2, 3, 5, 6, 7] -> [(1,3), (5,7)].
 
     Args:
-    - span_list: a list of span indicies
+    - span_list: a sorted list of span indicies
 
     Returns:
-    - A list of tuples containing the start and end of each continguous run.
+    - A list of tuples containing the start and end (inclusive) of each continguous run.
     """
     output = []
-    for _, span in itertools.groupby(
-        enumerate(span_list), lambda p: p[1] - p[0]
-    ):
-        span = list(span)
-        output.append((span[0][1], span[-1][1]))
+    if len(span_list) == 0:
+        return output
+
+    begin = prev = span_list[0]
+    for idx in span_list[1:]:
+        if idx != prev + 1:
+            output.append((begin, prev))
+            begin = idx
+        prev = idx
+    output.append((begin, prev))
     return output
 
 
-def fix_spans(
+def fix_ranges(
     spans: List[int], text: str, special_characters: str = string.whitespace
-):
-    """Applies minor edits to trim spans and remove singletons.
+) -> List[Tuple[int, int]]:
+    """Trims the contiguous ranges of the spans and removes singletons.
 
     Args:
-    - spans: a list of span indicies
+    - spans: a sorted list of span indicies
     - text: the text to which the spans apply
     - special_characters: a string containing special characters to remove from the text
 
     Returns:
-    - A list of fixed spans.
+    - A list of tuples containing the start and end (inclusive) of each fixed range.
     """
     cleaned = []
     for begin, end in _contiguous_ranges(spans):
@@ -60,30 +66,63 @@ def fix_spans(
         while text[end] in special_characters and begin < end:
             end -= 1
         if end - begin > 1:
-            cleaned.extend(range(begin, end + 1))
+            cleaned.append((begin, end))
+    return cleaned
+
+
+def fix_spans(
+    spans: List[int], text: str, special_characters: str = string.whitespace
+):
+    """Applies minor edits to trim spans and remove singletons.
+
+    Args:
+    - spans: a sorted list of span indicies
+    - text: the text to which the spans apply
+    - special_characters: a string containing special characters to remove from the text
+
+    Returns:
+    - A list of fixed spans.
+    """
+    cleaned = []
+    for begin, end in fix_ranges(spans, text, special_characters):
+        cleaned.extend(range(begin, end + 1))
     return cleaned
 
 
-def spans_to_ents(doc: Doc, spans: Set[int], label: str):
+def spans_to_ents(doc: Doc, spans: Iterable[int], label: str):
     """Converts span indicies into spacy entity labels.
 
+    The spans are merged into sorted ranges and matched against the tokens
+    (which are already sorted by offset) in a single sweep.
+
     Args:
     - doc: a spacy Doc object
-    - spans: a list of span indicies
+    - spans: the span indicies
     - label: the entity label to assign to the spans
 
     Returns:
     - A list containing start, end, and label.
     """
+    ranges = _contiguous_ranges(sorted(set(spans)))
+    n_ranges = len(ranges)
+
     started = False
     left, right, ents = 0, 0, []
+    r = 0
     for x in doc:
-        if x.pos_ == "SPACE":
+        if x.pos == SPACE:
             continue
-        if spans.intersection(set(range(x.idx, x.idx + len(x.text)))):
+        start = x.idx
+        end = start + len(x)
+
+        # Skip the ranges that end before the token.
+        while r < n_ranges and ranges[r][1] < start:
+            r += 1
+
+        if r < n_ranges and ranges[r][0] < end:
             if not started:
-                left, started = x.idx, True
-            right = x.idx + len(x.text)
+                left, started = start, True
+            right = end
         elif started:
             ents.append((left, right, label))
             started = False
@@ -94,16 +133,24 @@ def spans_to_ents(doc: Doc, spans: Set[int], label: str):
 
 class ToxicSpansDetectionModel(BaseEstimator):
     def __init__(
-        self, spacy_model: str = "pt_core_news_lg", toxic_label: str = "TOXIC"
+        self,
+        spacy_model: str = "pt_core_news_lg",
+        toxic_label: str = "TOXIC",
+        batch_size: int = 256,
+        n_process: int = 1,
     ):
         """Initializes the model.
 
         Args:
         - spacy_model: the spaCy model to use.
         - toxic_label: the label to use for toxic spans.
+        - batch_size: the number of texts per batch when predicting.
+        - n_process: the number of processes to use when predicting.
         """
         self.nlp = spacy.load(spacy_model)
         self.toxic_label = toxic_label
+        self.batch_size = batch_size
+        self.n_process = n_process
         self._model = None
         self._trained_epochs = None
 
@@ -211,7 +258,7 @@ class ToxicSpansDetectionModel(BaseEstimator):
             _logger.debug("Checkpoint directory does not exist.")
             return None
 
-        _logger.debug(f"Loading model from checkpoint: {checkpoint_dir}")
+        _logger.debug("Loading model from checkpoint: %s", checkpoint_dir)
 
         if self._model is None:
             self._model = self.init_model()
@@ -292,9 +339,85 @@ class ToxicSpansDetectionModel(BaseEstimator):
             _logger.debug("No checkpoints found.")
             return None
         latest_checkpoint = checkpoint_dir / f"model_{max(epochs)}"
-        _logger.debug(f"Latest checkpoint: {latest_checkpoint}")
+        _logger.debug("Latest checkpoint: %s", latest_checkpoint)
         return latest_checkpoint
 
+    def _cache_key(self, x: List[str], y: List[List[int]]) -> str:
+        """Computes the cache key of the annotated training docs.
+
+        The key depends on the texts, the spans, the toxic label and the spaCy
+        model used to parse the texts.
+
+        Args:
+        - x: the list of texts.
+        - y: the list of labels.
+
+        Returns:
+        - the hexadecimal SHA-256 digest.
+        """
+        key = hashlib.sha256()
+        key.update(
+            json.dumps(
+                [
+                    spacy.__version__,
+                    self.nlp.meta.get("lang"),
+                    self.nlp.meta.get("name"),
+                    self.nlp.meta.get("version"),
+                    self.toxic_label,
+                ]
+            ).encode("utf-8")
+        )
+        for text, spans in zip(x, y):
+            key.update(json.dumps([text, list(spans)]).encode("utf-8"))
+        return key.hexdigest()
+
+    def prepare_examples(
+        self, x: List[str], y: List[List[int]], cache_dir: str = None
+    ) -> List[Example]:
+        """Converts the texts and spans into training examples.
+
+        The texts are parsed once with the spaCy model and the annotated docs
+        are saved as a DocBin in `cache_dir`, keyed by a hash of the dataset
+        and the model. Later calls with the same data load the DocBin instead
+        of parsing the texts again.
+
+        Args:
+        - x: the list of texts.
+        - y: the list of labels.
+        - cache_dir: the directory to cache the annotated docs (no cache if None).
+
+        Returns:
+        - the list of training examples.
+        """
+        cache_path = None
+        if cache_dir:
+            cache_path = Path(cache_dir) / f"{self._cache_key(x, y)}.spacy"
+
+        if cache_path and cache_path.exists():
+            _logger.info(f"Loading training docs from cache: {cache_path}")
+            docs = list(
+                DocBin().from_disk(cache_path).get_docs(self.nlp.vocab)
+            )
+        else:
+            _logger.info("Parsing training docs.")
+            docs = []
+            parsed = self.nlp.pipe(
+                x, batch_size=self.batch_size, n_process=self.n_process
+            )
+            for doc, spans in zip(parsed, y):
+                ents = spans_to_ents(doc, set(spans), self.toxic_label)
+                example = Example.from_dict(
+                    self.nlp.make_doc(doc.text), {"entities": ents}
+                )
+                docs.append(example.reference)
+
+            if cache_path:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                DocBin(docs=docs).to_disk(cache_path)
+                _logger.info(f"Saved training docs to cache: {cache_path}")
+
+        return [Example(self.nlp.make_doc(doc.text), doc) for doc in docs]
+
     def fit(
         self,
         x: List[str],
@@ -313,6 +436,7 @@ class ToxicSpansDetectionModel(BaseEstimator):
         weight_decay: float = 0.0,
         checkpoint_dir: str = "checkpoints",
         load_best_model_at_end: bool = True,
+        cache_dir: str = None,
     ):
         """Fits the model.
 
@@ -333,6 +457,7 @@ class ToxicSpansDetectionModel(BaseEstimator):
         - weight_decay: the weight decay to use.
         - checkpoint_dir: the directory to save checkpoints.
         - load_best_model_at_end: whether to load the best model at the end of training.
+        - cache_dir: the directory to cache the annotated training docs (see prepare_examples).
         """
         _logger.info("Training ToxicSpansDetection model.")
 
@@ -343,11 +468,7 @@ class ToxicSpansDetectionModel(BaseEstimator):
                 "The model will be trained on all epochs. "
             )
 
-        training_data = []
-        for _, (text, spans) in enumerate(zip(x, y)):
-            doc = self.nlp(text)
-            ents = spans_to_ents(doc, set(spans), self.toxic_label)
-            training_data.append((doc.text, {"entities": ents}))
+        training_data = self.prepare_examples(x, y, cache_dir=cache_dir)
 
         self._model = self.init_model()
 
@@ -392,19 +513,13 @@ class ToxicSpansDetectionModel(BaseEstimator):
                 )
 
                 if self._trained_epochs and epoch < self._trained_epochs:
-                    _logger.debug(f"Skipping epoch {epoch+1}.")
+                    _logger.debug("Skipping epoch %d.", epoch + 1)
                     continue
-                _logger.debug(f"Training epoch {epoch+1}.")
+                _logger.debug("Training epoch %d.", epoch + 1)
 
                 for batch in batches:
-                    examples = []
-                    for text, annotations in batch:
-                        example = Example.from_dict(
-                            self.nlp.make_doc(text), annotations
-                        )
-                        examples.append(example)
                     self._model.update(
-                        examples, drop=dropout, losses=losses, sgd=optimizer
+                        batch, drop=dropout, losses=losses, sgd=optimizer
                     )
                 self.losses.append(losses["ner"])
                 _logs["loss"] = f"{losses['ner']:.2f}"
@@ -471,6 +586,20 @@ class ToxicSpansDetectionModel(BaseEstimator):
         else:
             return False
 
+    def _doc_to_spans(self, doc: Doc) -> List[int]:
+        """Converts the entities of a predicted doc into toxic spans.
+
+        Args:
+        - doc: the spaCy Doc predicted by the model.
+
+        Returns:
+        - the toxic spans as a list of integers.
+        """
+        preds = []
+        for ent in doc.ents:
+            preds.extend(range(ent.start_char, ent.end_char))
+        return preds
+
     def _predict(self, text: str) -> List[int]:
         """Predicts the toxic spans for a given text.
 
@@ -483,28 +612,60 @@ class ToxicSpansDetectionModel(BaseEstimator):
         if not self._model:
             raise ValueError("Model not trained or loaded yet.")
 
-        preds = []
-        doc = self._model(text)
-        for ent in doc.ents:
-            preds.extend(range(ent.start_char, ent.end_char))
-        return preds
+        return self._doc_to_spans(self._model(text))
+
+    def predict_stream(
+        self,
+        x: Iterable[str],
+        batch_size: int = None,
+        n_process: int = None,
+    ) -> Iterator[List[int]]:
+        """Predicts the toxic spans of a stream of texts.
+
+        The texts are processed in batches with `Language.pipe`, optionally
+        using multiple processes, and the results are yielded in input order.
+
+        Args:
+        - x: an iterable of texts.
+        - batch_size: the number of texts per batch (defaults to self.batch_size).
+        - n_process: the number of processes to use (defaults to self.n_process).
+
+        Returns:
+        - an iterator over the toxic spans of each text.
+        """
+        if not self._model:
+            raise ValueError("Model not trained or loaded yet.")
+
+        docs = self._model.pipe(
+            x,
+            batch_size=batch_size or self.batch_size,
+            n_process=n_process or self.n_process,
+        )
+        for doc in docs:
+            yield self._doc_to_spans(doc)
 
     def predict(
-        self, x: Union[List[str], str]
+        self,
+        x: Union[List[str], str],
+        batch_size: int = None,
+        n_process: int = None,
     ) -> Union[List[int], List[List[int]]]:
         """Predicts the labels.
 
         Args:
         - x: the list of texts or a single text.
+        - batch_size: the number of texts per batch (defaults to self.batch_size).
+        - n_process: the number of processes to use (defaults to self.n_process).
 
         Returns:
         - the toxic spans as a list of integers or a list of lists of integers.
         """
         if isinstance(x, (list, tuple, np.ndarray)):
-            preds = []
-            for text in x:
-                preds.append(self._predict(text))
-            return preds
+            return list(
+                self.predict_stream(
+                    x, batch_size=batch_size, n_process=n_process
+                )
+            )
         elif isinstance(x, str):
             return self._predict(x)
         else:
@@ -523,7 +684,7 @@ class ToxicSpansDetectionModel(BaseEstimator):
         _logger.debug("Scoring model.")
         y_pred = self.predict(x)
         score = f1_score(y, y_pred)
-        _logger.debug(f"F1-score: {score:.4f}")
+        _logger.debug("F1-score: %.4f", score)
         return score
 
     def plot_losses(
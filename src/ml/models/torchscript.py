@@ -0,0 +1,112 @@
+import os
+import copy
+import torch
+import warnings
+from typing import Tuple
+from transformers import PreTrainedModel, PreTrainedTokenizerBase
+
+from logger import setup_logger
+
+_logger = setup_logger(__name__)
+
+TORCHSCRIPT_FILE_NAME = "model.torchscript.pt"
+TOKENIZER_FILE_NAME = "tokenizer.json"
+
+
+class InferenceWrapper(torch.nn.Module):
+    def __init__(self, model: PreTrainedModel):
+        """Inference-only graph of a BERT sequence classification model.
+
+        It calls the encoder and the classification heads directly, so the
+        traced graph has no loss branches, no `problem_type` checks and no
+        `ModelOutput`: it always returns a tuple with the logits (one
+        tensor per task for multi-task models). The dropout is left out, as
+        it is a no-op at inference.
+
+        Args:
+        - model: The model (e.g. `ToxicityTypeForSequenceClassification`).
+        """
+        super().__init__()
+        self.bert = model.bert
+        self.classifier = model.classifier
+        self.tasks = list(getattr(model.config, "tasks", None) or [])
+
+    def forward(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor,
+        token_type_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, ...]:
+        pooled_output = self.bert(
+            input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+            return_dict=False,
+        )[1]
+        if self.tasks:
+            return tuple(
+                self.classifier[task](pooled_output) for task in self.tasks
+            )
+        return (self.classifier(pooled_output),)
+
+
+def export_torchscript(
+    model: PreTrainedModel,
+    tokenizer: PreTrainedTokenizerBase,
+    output_dir: str,
+    file_name: str = TORCHSCRIPT_FILE_NAME,
+) -> str:
+    """Export a sequence classification model to a traced and frozen TorchScript module.
+
+    The model is traced on CPU (the trace records the device of the
+    tensors it creates) and frozen, so the weights are constants of the
+    graph and it can be optimized for inference when it is loaded. The
+    batch size and the sequence length stay dynamic. The tokenizer is
+    saved as `tokenizer.json`, so the module can be served with the
+    `tokenizers` library only.
+
+    Args:
+    - model: The model (e.g. `ToxicityTypeForSequenceClassification`).
+    - tokenizer: The (fast) tokenizer of the model.
+    - output_dir: The directory where the module will be saved.
+    - file_name: The file name of the module.
+
+    Returns:
+    - The path of the TorchScript module.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, file_name)
+
+    if not tokenizer.is_fast:
+        raise ValueError("The TorchScript export requires a fast tokenizer.")
+    tokenizer_path = os.path.join(output_dir, TOKENIZER_FILE_NAME)
+    if not os.path.isfile(tokenizer_path):
+        tokenizer.backend_tokenizer.save(tokenizer_path)
+
+    if next(model.parameters()).device.type != "cpu":
+        model = copy.deepcopy(model).cpu()
+
+    dummy = tokenizer(
+        ["Exemplo de comentário.", "Outro exemplo"],
+        padding=True,
+        return_tensors="pt",
+        return_token_type_ids=True,
+    )
+    inputs = (
+        dummy["input_ids"],
+        dummy["attention_mask"],
+        dummy["token_type_ids"],
+    )
+
+    training = model.training
+    wrapper = InferenceWrapper(model).eval()
+    _logger.info(f"Exporting model to TorchScript: {path}.")
+    with torch.no_grad(), warnings.catch_warnings():
+        # The shapes are dynamic (checked in the tests), but the
+        # transformers code triggers tracer warnings about them.
+        warnings.filterwarnings("ignore", category=torch.jit.TracerWarning)
+        traced = torch.jit.trace(wrapper, inputs)
+        module = torch.jit.freeze(traced)
+    torch.jit.save(module, path)
+    model.train(training)
+    return path
@@ -0,0 +1,213 @@
+import os
+import json
+import torch
+import datasets
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from transformers import (
+    AutoConfig,
+    AutoModelForSequenceClassification,
+    AutoTokenizer,
+    EvalPrediction,
+    HfArgumentParser,
+    PretrainedConfig,
+)
+
+from arguments import QuantizeScriptArguments
+from logger import setup_logger
+from inference import get_problem_type
+from metrics.utils import compute_metrics, compute_multi_task_metrics
+from models.bert import ToxicityMultiTaskForSequenceClassification
+from models.quantization import (
+    get_model_size,
+    load_quantized_model,
+    save_quantized_model,
+)
+from score import forward
+
+_logger = setup_logger(__name__)
+
+
+def get_model_class(config: PretrainedConfig) -> Type:
+    """Get the class of a model saved by the training scripts.
+
+    Args:
+    - config: The model config.
+
+    Returns:
+    - `ToxicityMultiTaskForSequenceClassification` for multi-task models (`config.tasks`), otherwise `AutoModelForSequenceClassification`.
+    """
+    if getattr(config, "tasks", None):
+        return ToxicityMultiTaskForSequenceClassification
+    return AutoModelForSequenceClassification
+
+
+def load_eval_data(
+    dataset: datasets.Dataset, config: PretrainedConfig
+) -> Tuple[List[str], Union[np.ndarray, List[np.ndarray]]]:
+    """Get the texts and labels of an evaluation set.
+
+    Args:
+    - dataset: The dataset (a "text" column and either a "label" column, one column per label or, for multi-task models, one "<task>_labels" column per task).
+    - config: The model config (id2label is used for multi-label datasets and tasks for multi-task models).
+
+    Returns:
+    - The texts and the labels (one array per task for multi-task models).
+    """
+    if getattr(config, "tasks", None):
+        labels = [np.array(dataset[f"{task}_labels"]) for task in config.tasks]
+    elif "label" in dataset.column_names:
+        labels = np.array(dataset["label"])
+    else:
+        labels = np.stack(
+            [dataset[label] for label in config.id2label.values()], axis=1
+        )
+    return dataset["text"], labels
+
+
+def evaluate_model(
+    model: torch.nn.Module,
+    tokenizer,
+    texts: List[str],
+    labels: Union[np.ndarray, List[np.ndarray]],
+    problem_type: str,
+    batch_size: int = 32,
+    max_seq_length: int = 512,
+    threshold: float = 0.5,
+    tasks: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, float]:
+    """Evaluate a model on CPU.
+
+    Args:
+    - model: The model.
+    - tokenizer: The tokenizer.
+    - texts: The texts.
+    - labels: The labels (one array per task for multi-task models).
+    - problem_type: The type of the problem ("binary", "multi-class" or "multi-label"), ignored for multi-task models.
+    - batch_size: The batch size.
+    - max_seq_length: The maximum sequence length.
+    - threshold: The threshold to use to convert the model's output to a label.
+    - tasks: The tasks of a multi-task model (`config.tasks`).
+
+    Returns:
+    - The metrics, the mean latency per batch (ms) and the model size (MB).
+    """
+    model.eval()
+    latency = []
+    logits = forward(
+        model,
+        tokenizer,
+        texts,
+        batch_size=batch_size,
+        max_seq_length=max_seq_length,
+        on_batch=latency.append,
+    )
+    if tasks:
+        metrics = compute_multi_task_metrics(
+            EvalPrediction(predictions=logits, label_ids=labels),
+            tasks,
+            threshold=threshold,
+        )
+    else:
+        metrics = compute_metrics(
+            EvalPrediction(predictions=logits[0], label_ids=labels),
+            threshold=threshold,
+            problem_type=problem_type,
+        )
+    metrics["latency_ms"] = float(np.mean(latency) * 1000)
+    metrics["size_mb"] = get_model_size(model) / 2**20
+    return metrics
+
+
+def evaluate_quantization(
+    model_dir: str,
+    dataset: datasets.Dataset,
+    output_dir: str = None,
+    batch_size: int = 32,
+    max_seq_length: int = 512,
+    threshold: float = 0.5,
+) -> Dict[str, Dict[str, Any]]:
+    """Quantize a model and compare it with the original one.
+
+    Args:
+    - model_dir: The path of the model saved by the training script.
+    - dataset: The evaluation set.
+    - output_dir: The path the quantized model will be saved to (default: model_dir).
+    - batch_size: The batch size.
+    - max_seq_length: The maximum sequence length.
+    - threshold: The threshold to use to convert the model's output to a label.
+
+    Returns:
+    - The metrics of both models and the deltas (int8 - float).
+    """
+    output_dir = output_dir or model_dir
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model_class = get_model_class(AutoConfig.from_pretrained(model_dir))
+    model = model_class.from_pretrained(model_dir)
+
+    save_quantized_model(model, tokenizer, output_dir)
+    quantized_model = load_quantized_model(output_dir, model_class)
+
+    problem_type = get_problem_type(
+        model.config.problem_type, model.config.num_labels
+    )
+    texts, labels = load_eval_data(dataset, model.config)
+    kwargs = {
+        "texts": texts,
+        "labels": labels,
+        "problem_type": problem_type,
+        "batch_size": batch_size,
+        "max_seq_length": max_seq_length,
+        "threshold": threshold,
+        "tasks": getattr(model.config, "tasks", None),
+    }
+
+    report = {
+        "float": evaluate_model(model.cpu(), tokenizer, **kwargs),
+        "int8": evaluate_model(quantized_model, tokenizer, **kwargs),
+    }
+    report["delta"] = {
+        key: report["int8"][key] - report["float"][key]
+        for key in report["float"]
+    }
+    return report
+
+
+if __name__ == "__main__":
+    _logger.info("Starting quantization script.")
+
+    parser = HfArgumentParser((QuantizeScriptArguments))
+    (args,) = parser.parse_args_into_dataclasses()
+    _logger.info(f"Arguments: {args}")
+
+    output_dir = args.output_dir or args.model_dir
+
+    if args.data_dir is None:
+        model_class = get_model_class(
+            AutoConfig.from_pretrained(args.model_dir)
+        )
+        save_quantized_model(
+            model_class.from_pretrained(args.model_dir),
+            AutoTokenizer.from_pretrained(args.model_dir),
+            output_dir,
+        )
+        _logger.info(f"Quantized model saved to {output_dir}.")
+    else:
+        dataset = datasets.load_from_disk(args.data_dir)[args.eval_dataset]
+        if args.max_eval_samples is not None:
+            dataset = dataset.select(range(args.max_eval_samples))
+
+        report = evaluate_quantization(
+            args.model_dir,
+            dataset,
+            output_dir=output_dir,
+            batch_size=args.batch_size,
+            max_seq_length=args.max_seq_length,
+            threshold=args.threshold,
+        )
+        _logger.info(f"Quantization report: {report}")
+
+        path = os.path.join(output_dir, "quantization_report.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+        _logger.info(f"Quantization report saved to {path}.")
@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import torch
+import datasets
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from transformers import (
+    AutoConfig,
+    AutoModelForSequenceClassification,
+    AutoTokenizer,
+    HfArgumentParser,
+)
+
+from arguments import ScoreScriptArguments
+from inference import get_problem_type, get_tasks, postprocess_tasks
+from logger import setup_logger
+from metrics.thresholds import get_task_thresholds
+from models.bert import ToxicityMultiTaskForSequenceClassification
+
+_logger = setup_logger(__name__)
+
+
+def iter_chunks(
+    input_path: str, split: str = "test", chunk_size: int = 10000
+) -> Iterator[List[Dict[str, Any]]]:
+    """Read the rows of a dataset or JSONL file in chunks.
+
+    Datasets saved with `save_to_disk` are memory-mapped and JSONL files
+    are read line by line, so only one chunk is in memory at a time.
+
+    Args:
+    - input_path: A dataset saved with `save_to_disk` or a JSONL file.
+    - split: The split to read when the dataset is a DatasetDict.
+    - chunk_size: The number of rows of each chunk.
+
+    Returns:
+    - An iterator over the chunks (lists of rows).
+    """
+    if os.path.isdir(input_path):
+        dataset = datasets.load_from_disk(input_path)
+        if isinstance(dataset, datasets.DatasetDict):
+            dataset = dataset[split]
+
+        for batch in dataset.iter(batch_size=chunk_size):
+            columns = list(batch)
+            yield [
+                dict(zip(columns, values)) for values in zip(*batch.values())
+            ]
+        return
+
+    chunk = []
+    with open(input_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            chunk.append(json.loads(line))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def forward(
+    model: torch.nn.Module,
+    tokenizer,
+    texts: List[str],
+    batch_size: int = 64,
+    max_seq_length: int = 512,
+    device: Optional[torch.device] = None,
+    on_batch: Optional[Callable[[float], None]] = None,
+) -> List[np.ndarray]:
+    """Compute the logits of texts in batches.
+
+    The texts are sorted by length before batching, so each batch is
+    padded to a similar length, and the logits are returned in the
+    original order.
+
+    Args:
+    - model: The model (in eval mode).
+    - tokenizer: The tokenizer.
+    - texts: The texts.
+    - batch_size: The batch size of the forward passes.
+    - max_seq_length: The maximum sequence length.
+    - device: The device of the model (CPU if not set).
+    - on_batch: A function called with the time (in seconds) of each forward pass (e.g. to measure the latency).
+
+    Returns:
+    - The logits of each task.
+    """
+    order = np.argsort([len(x) for x in texts], kind="stable")
+    logits = []
+    for idx in range(0, len(texts), batch_size):
+        encoding = tokenizer(
+            [texts[i] for i in order[idx : idx + batch_size]],
+            padding=True,
+            truncation=True,
+            max_length=max_seq_length,
+            return_tensors="pt",
+        ).to(device or "cpu")
+        start = time.perf_counter()
+        with torch.inference_mode():
+            output = model(**encoding).logits
+        if on_batch is not None:
+            on_batch(time.perf_counter() - start)
+        if not isinstance(output, tuple):
+            output = (output,)
+        logits.append([x.float().cpu().numpy() for x in output])
+
+    inverse = np.argsort(order)
+    return [
+        np.concatenate([batch[i] for batch in logits])[inverse]
+        for i in range(len(logits[0]))
+    ]
+
+
+class Scorer(object):
+    def __init__(
+        self,
+        model_name_or_path: str,
+        batch_size: int = 64,
+        max_seq_length: int = 512,
+        threshold: float = 0.5,
+    ):
+        """Score texts with a fine-tuned classifier (single or multi-task).
+
+        Args:
+        - model_name_or_path: The path or Hugging Face Hub ID of the model.
+        - batch_size: The batch size of the forward passes.
+        - max_seq_length: The maximum sequence length.
+        - threshold: The threshold to use to convert the model's output to a label (multi-label models and tasks use their per-label thresholds if they were saved).
+        """
+        self.device = torch.device(
+            "cuda" if torch.cuda.is_available() else "cpu"
+        )
+        self.batch_size = batch_size
+        self.max_seq_length = max_seq_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
+
+        config = AutoConfig.from_pretrained(model_name_or_path)
+        if getattr(config, "tasks", None):
+            model_class = ToxicityMultiTaskForSequenceClassification
+            self.tasks = get_tasks(config.tasks)
+        else:
+            model_class = AutoModelForSequenceClassification
+            self.tasks = {
+                "": (
+                    config.id2label,
+                    get_problem_type(config.problem_type, config.num_labels),
+                )
+            }
+        # Per-label thresholds saved with multi-label models.
+        self.thresholds = get_task_thresholds(
+            model_name_or_path, self.tasks, threshold
+        )
+
+        self.model = model_class.from_pretrained(model_name_or_path)
+        self.model.to(self.device).eval()
+
+    def forward(self, texts: List[str]) -> List[np.ndarray]:
+        """Compute the logits of a chunk of texts (see `forward`).
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - The logits of each task.
+        """
+        return forward(
+            self.model,
+            self.tokenizer,
+            texts,
+            batch_size=self.batch_size,
+            max_seq_length=self.max_seq_length,
+            device=self.device,
+        )
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Score a chunk of texts.
+
+        Args:
+        - texts: The texts.
+
+        Returns:
+        - The labels and probabilities of each text (prefixed with the task name for multi-task models).
+        """
+        results = postprocess_tasks(
+            self.forward(texts), self.tasks, self.thresholds
+        )
+        # The columns of multi-task models are prefixed with the task name.
+        return [
+            {
+                f"{task}_{key}" if task else key: value
+                for task, task_result in result.items()
+                for key, value in task_result.items()
+            }
+            for result in results
+        ]
+
+
+def _promote_null(data_type: pa.DataType) -> pa.DataType:
+    """Replace the null types (also inside lists and structs) with strings."""
+    if pa.types.is_null(data_type):
+        return pa.string()
+    if pa.types.is_list(data_type):
+        return pa.list_(_promote_null(data_type.value_type))
+    if pa.types.is_struct(data_type):
+        return pa.struct(
+            [
+                data_type.field(i).with_type(
+                    _promote_null(data_type.field(i).type)
+                )
+                for i in range(data_type.num_fields)
+            ]
+        )
+    return data_type
+
+
+class PredictionWriter(object):
+    def __init__(self, path: str):
+        """Append predictions to a Parquet or JSONL file.
+
+        Args:
+        - path: The output path (.parquet or .jsonl).
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._file = None if self.parquet else open(path, "w")
+
+    def write(self, rows: List[Dict[str, Any]]):
+        """Write a chunk of rows.
+
+        Args:
+        - rows: The rows.
+        """
+        if not self.parquet:
+            for row in rows:
+                self._file.write(
+                    json.dumps(row, ensure_ascii=False, default=str) + "\n"
+                )
+            return
+
+        if self._writer is None:
+            # The schema is inferred from the first chunk. The values
+            # without a type yet (e.g. all null or empty lists) are
+            # written as strings.
+            schema = pa.Table.from_pylist(rows).schema
+            schema = pa.schema(
+                [x.with_type(_promote_null(x.type)) for x in schema]
+            )
+            self._writer = pq.ParquetWriter(self.path, schema)
+
+        # Each column is inferred from its values and cast to the schema,
+        # so a chunk doesn't need the types (or the columns) of the first.
+        schema = self._writer.schema
+        columns = [
+            pa.array([row.get(x.name) for row in rows]).cast(x.type)
+            for x in schema
+        ]
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+    def close(self):
+        """Close the file."""
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def score(
+    scorer: Scorer,
+    input_path: str,
+    output_path: str,
+    split: str = "test",
+    text_column: str = "text",
+    chunk_size: int = 10000,
+) -> int:
+    """Stream the rows of a dataset or JSONL file through a model.
+
+    Each chunk is read, scored and written before the next one is read,
+    so the memory usage depends on `chunk_size`, not on the input size.
+
+    Args:
+    - scorer: The scorer.
+    - input_path: A dataset saved with `save_to_disk` or a JSONL file.
+    - output_path: The path of the predictions (.parquet or .jsonl).
+    - split: The split to score when the dataset is a DatasetDict.
+    - text_column: The name of the column with the texts.
+    - chunk_size: The number of rows read, scored and written at a time.
+
+    Returns:
+    - The number of scored rows.
+    """
+    total = 0
+    with PredictionWriter(output_path) as writer:
+        for rows in iter_chunks(input_path, split, chunk_size):
+            predictions = scorer([row[text_column] for row in rows])
+            writer.write(
+                [{**row, **pred} for row, pred in zip(rows, predictions)]
+            )
+            total += len(rows)
+            _logger.info(f"Scored {total} rows.")
+    return total
+
+
+if __name__ == "__main__":
+    _logger.info("Starting scoring script.")
+
+    parser = HfArgumentParser((ScoreScriptArguments))
+    (args,) = parser.parse_args_into_dataclasses()
+    _logger.info(f"Arguments: {args}")
+
+    scorer = Scorer(
+        args.model_dir,
+        batch_size=args.batch_size,
+        max_seq_length=args.max_seq_length,
+        threshold=args.threshold,
+    )
+    total = score(
+        scorer,
+        args.input_path,
+        args.output_path,
+        split=args.split,
+        text_column=args.text_column,
+        chunk_size=args.chunk_size,
+    )
+    _logger.info(f"Predictions of {total} rows saved to {args.output_path}.")
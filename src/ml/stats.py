@@ -0,0 +1,118 @@
+import datasets
+import numpy as np
+from typing import Dict, Optional, Tuple
+from transformers import PreTrainedTokenizerBase
+
+from logger import setup_logger
+
+_logger = setup_logger(__name__)
+
+# Length columns of each split (key: split fingerprint and tokenizer).
+_LENGTHS_CACHE: Dict[Tuple, Dict[str, np.ndarray]] = {}
+
+
+def _compute_lengths(examples, tokenizer=None):
+    """Compute the number of characters, words and tokens of a batch."""
+    texts = examples["text"]
+    lengths = {
+        "length": [len(x) for x in texts],
+        "words": [len(x.split()) for x in texts],
+    }
+    if tokenizer is not None:
+        lengths["tokens"] = [len(x) for x in tokenizer(texts)["input_ids"]]
+    return lengths
+
+
+def _tokenizer_key(tokenizer: Optional[PreTrainedTokenizerBase]) -> Tuple:
+    if tokenizer is None:
+        return ()
+    return (type(tokenizer).__name__, tokenizer.name_or_path, len(tokenizer))
+
+
+def get_lengths(
+    dataset: datasets.Dataset,
+    tokenizer: Optional[PreTrainedTokenizerBase] = None,
+    num_proc: Optional[int] = None,
+    batch_size: int = 1000,
+) -> Dict[str, np.ndarray]:
+    """Get the number of characters, words and tokens of each text of a split.
+
+    All the lengths are computed in a single batched `map` pass, kept in
+    memory (nothing is written next to the dataset files) and memoized by
+    the split fingerprint.
+
+    Args:
+    - dataset: The split (with a "text" column).
+    - tokenizer: The tokenizer used to count the tokens (optional).
+    - num_proc: The number of processes used by `map`.
+    - batch_size: The batch size used by `map`.
+
+    Returns:
+    - A dictionary with the "length", "words" and "tokens" (if tokenizer is set) arrays.
+    """
+    key = (dataset._fingerprint,) + _tokenizer_key(tokenizer)
+    if key in _LENGTHS_CACHE:
+        return _LENGTHS_CACHE[key]
+
+    lengths = dataset.map(
+        _compute_lengths,
+        batched=True,
+        batch_size=batch_size,
+        num_proc=num_proc,
+        keep_in_memory=True,
+        remove_columns=dataset.column_names,
+        fn_kwargs={"tokenizer": tokenizer},
+        desc="Computing lengths",
+    ).with_format("numpy")
+
+    _LENGTHS_CACHE[key] = {
+        column: lengths[column] for column in lengths.column_names
+    }
+    return _LENGTHS_CACHE[key]
+
+
+def compute_stats(
+    dataset: datasets.Dataset,
+    tokenizer: Optional[PreTrainedTokenizerBase] = None,
+    num_proc: Optional[int] = None,
+) -> Dict[str, float]:
+    """Compute the length statistics of a split.
+
+    Args:
+    - dataset: The split (with a "text" column).
+    - tokenizer: The tokenizer used to count the tokens (optional).
+    - num_proc: The number of processes used to compute the lengths.
+
+    Returns:
+    - The min, max and average number of characters, words and tokens (if tokenizer is set).
+    """
+    lengths = get_lengths(dataset, tokenizer=tokenizer, num_proc=num_proc)
+
+    stats = {}
+    for column, values in lengths.items():
+        stats[f"min_{column}"] = int(values.min())
+        stats[f"max_{column}"] = int(values.max())
+        stats[f"avg_{column}"] = round(float(values.mean()), 2)
+    return stats
+
+
+def compute_token_histogram(
+    dataset: datasets.Dataset,
+    tokenizer: PreTrainedTokenizerBase,
+    bins: int = 20,
+    num_proc: Optional[int] = None,
+) -> Dict[str, list]:
+    """Compute the histogram of the number of tokens of a split.
+
+    Args:
+    - dataset: The split (with a "text" column).
+    - tokenizer: The tokenizer used to count the tokens.
+    - bins: The number of bins.
+    - num_proc: The number of processes used to compute the lengths.
+
+    Returns:
+    - A dictionary with the histogram "counts" and "bin_edges".
+    """
+    lengths = get_lengths(dataset, tokenizer=tokenizer, num_proc=num_proc)
+    counts, bin_edges = np.histogram(lengths["tokens"], bins=bins)
+    return {"counts": counts.tolist(), "bin_edges": bin_edges.tolist()}
@@ -59,6 +59,12 @@ if __name__ == "__main__":
 
         experiment = ToxicityTargetTypeIdentification(args)
         experiment.run()
+    elif experiment_name == "toxicity-multi-task":
+        _logger.info(f"Running {experiment_name} experiment.")
+        from experiments.toxicity_multi_task import ToxicityMultiTask
+
+        experiment = ToxicityMultiTask(args)
+        experiment.run()
     elif experiment_name == "toxic-spans-detection":
         _logger.info(f"Running {experiment_name} experiment.")
         from experiments.toxic_spans_detection import ToxicSpansDetection
@@ -0,0 +1,45 @@
+import os
+import json
+import numpy as np
+from transformers import AutoConfig, HfArgumentParser
+
+from arguments import ThresholdsScriptArguments
+from logger import setup_logger
+from inference import predict
+from metrics.thresholds import save_thresholds, tune_thresholds
+
+_logger = setup_logger(__name__)
+
+
+if __name__ == "__main__":
+    _logger.info("Starting thresholds script.")
+
+    parser = HfArgumentParser((ThresholdsScriptArguments))
+    (args,) = parser.parse_args_into_dataclasses()
+    _logger.info(f"Arguments: {args}")
+
+    config = AutoConfig.from_pretrained(args.model_dir)
+    predictions = np.load(args.predictions_path)
+
+    probs = predict(
+        predictions["logits"], return_proba=True, problem_type="multi-label"
+    )
+    report = tune_thresholds(
+        predictions["label_ids"],
+        probs,
+        config.id2label,
+        num_thresholds=args.num_thresholds,
+        metric=args.metric,
+    )
+    _logger.info(f"Thresholds report: {report}")
+
+    output_dir = args.output_dir or args.model_dir
+    path = save_thresholds(
+        [report[label]["threshold"] for label in config.id2label.values()],
+        config.id2label,
+        output_dir,
+    )
+    _logger.info(f"Thresholds saved to {path}.")
+
+    with open(os.path.join(output_dir, "thresholds_report.json"), "w") as f:
+        json.dump(report, f, indent=4)
@@ -1,3 +1,78 @@
 import sys
+import copy
+import pytest
+from transformers import BertConfig, BertTokenizerFast
 
 sys.path.append("src/ml")
+
+TASKS = {
+    "toxicity": {
+        "labels": ["NOT-OFFENSIVE", "OFFENSIVE"],
+        "problem_type": "single_label_classification",
+    },
+    "toxicity_type": {
+        "labels": ["insult", "racism", "sexism"],
+        "problem_type": "multi_label_classification",
+    },
+}
+
+TEXTS = [
+    "você é um idiota",
+    "bom dia",
+    "que comentário mais longo do que os outros",
+    "oi",
+    "um texto médio",
+]
+
+
+@pytest.fixture
+def tasks():
+    """The tasks of the multi-task models."""
+    return copy.deepcopy(TASKS)
+
+
+@pytest.fixture
+def texts():
+    """Texts covered by the vocabulary of the `tokenizer` fixture."""
+    return list(TEXTS)
+
+
+@pytest.fixture
+def tokenizer(tmp_path):
+    """A character-level BERT tokenizer of the `texts`."""
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += sorted(set("".join(TEXTS).replace(" ", "")))
+    path = tmp_path / "vocab.txt"
+    path.write_text("\n".join(vocab))
+    return BertTokenizerFast(str(path))
+
+
+@pytest.fixture
+def get_config():
+    """Factory of tiny BERT configs (the keyword arguments override the defaults)."""
+
+    def get_config(**kwargs):
+        params = {
+            "vocab_size": 40,
+            "hidden_size": 32,
+            "num_hidden_layers": 1,
+            "num_attention_heads": 2,
+            "intermediate_size": 37,
+        }
+        params.update(kwargs)
+        return BertConfig(**params)
+
+    return get_config
+
+
+@pytest.fixture
+def save_model(tokenizer):
+    """Factory that saves a model with the `tokenizer` and returns its path."""
+
+    def save_model(model, path):
+        path.mkdir(parents=True)
+        tokenizer.save_pretrained(path)
+        model.eval().save_pretrained(path)
+        return str(path)
+
+    return save_model
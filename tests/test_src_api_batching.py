@@ -0,0 +1,176 @@
+import time
+import asyncio
+import threading
+import pytest
+from src.api.batching import BULK, MicroBatcher
+
+
+def test_micro_batcher():
+    batches = []
+
+    def predict_fn(items):
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(10)])
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(main())
+    assert results == [i * 2 for i in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def test_micro_batcher_exception():
+    def predict_fn(items):
+        raise RuntimeError("model error")
+
+    async def main():
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=1)
+        try:
+            await batcher.submit("text")
+        finally:
+            await batcher.stop()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+
+
+def test_micro_batcher_on_batch():
+    waits = []
+
+    async def main():
+        batcher = MicroBatcher(
+            lambda items: items,
+            max_batch_size=4,
+            max_wait_ms=20,
+            on_batch=waits.append,
+        )
+        await asyncio.gather(*[batcher.submit(i) for i in range(6)])
+        await batcher.stop()
+
+    asyncio.run(main())
+    assert [len(x) for x in waits] == [4, 2]
+    # The second batch waited for the timeout.
+    assert all(0 <= wait < 1 for x in waits for wait in x)
+    assert min(waits[1]) >= 0.015
+
+
+def test_micro_batcher_priorities():
+    batches = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def predict_fn(items):
+        batches.append(items)
+        started.set()
+        release.wait(5)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(
+            predict_fn,
+            max_batch_size=2,
+            max_wait_ms=1,
+            max_pending={"realtime": 2, "bulk": 1},
+        )
+        # The first batch keeps the model busy while the others are queued.
+        first = asyncio.ensure_future(batcher.submit("first"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+
+        bulk = [
+            asyncio.ensure_future(batcher.submit(f"bulk {i}", BULK))
+            for i in range(2)
+        ]
+        realtime = [
+            asyncio.ensure_future(batcher.submit(f"realtime {i}"))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        # The realtime lane is full and the second bulk item is waiting.
+        assert isinstance(realtime[2].exception(), asyncio.QueueFull)
+        assert not bulk[1].done()
+
+        release.set()
+        await asyncio.gather(first, *bulk, *realtime[:2])
+        await batcher.stop()
+
+    asyncio.run(main())
+    assert batches == [
+        ["first"],
+        ["realtime 0", "realtime 1"],
+        ["bulk 0", "bulk 1"],
+    ]
+
+
+def test_micro_batcher_deadline():
+    def predict_fn(items):
+        time.sleep(0.05)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(predict_fn, max_batch_size=1, max_wait_ms=1)
+        assert await batcher.submit("a", deadline=1) == "a"
+        assert batcher.batch_time >= 0.05
+
+        # Two batches are ahead of the last text.
+        texts = [batcher.submit(x, deadline=0.08) for x in "bcd"]
+        results = await asyncio.gather(*texts, return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(main())
+    assert results[0] == "b"
+    assert all(isinstance(x, asyncio.TimeoutError) for x in results[1:])
+
+
+def test_micro_batcher_invalid_priority():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda x: x, max_pending={"low": 1})
+
+
+def test_micro_batcher_missing_results():
+    async def main():
+        batcher = MicroBatcher(
+            lambda items: items[:1], max_batch_size=4, max_wait_ms=20
+        )
+        results = await asyncio.gather(
+            *[batcher.submit(i) for i in range(3)], return_exceptions=True
+        )
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(x, RuntimeError) for x in results)
+
+
+def test_micro_batcher_restart():
+    def on_batch(waits):
+        raise RuntimeError("metrics error")
+
+    async def main():
+        batcher = MicroBatcher(
+            lambda items: items,
+            max_batch_size=1,
+            max_wait_ms=1,
+            on_batch=on_batch,
+        )
+        # The worker crashes on the first batch and the others stay queued.
+        first = [asyncio.ensure_future(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert batcher._worker.done()
+
+        batcher.on_batch = None
+        result = await batcher.submit("again")
+        await batcher.stop()
+        results = await asyncio.gather(*first, return_exceptions=True)
+        return result, results
+
+    result, results = asyncio.run(main())
+    assert result == "again"
+    assert str(results[0]) == "metrics error"
+    assert all(
+        str(x) == "The batching worker was restarted." for x in results[1:]
+    )
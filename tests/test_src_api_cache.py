@@ -0,0 +1,96 @@
+import asyncio
+from src.api import cache as cache_module
+from src.api.cache import (
+    LRUCache,
+    PredictionCache,
+    get_cache_key,
+    normalize_text,
+)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class DictCache(object):
+    """In-memory shared tier with the interface of PostgresCache."""
+
+    def __init__(self):
+        self.data = {}
+        self._pool = object()
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def get(self, key):
+        if key in self.data:
+            self.stats["hits"] += 1
+            return self.data[key]
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key, value):
+        self.data[key] = value
+
+
+def test_get_cache_key():
+    assert normalize_text("  você é\n um   idiota ") == "você é um idiota"
+
+    key = get_cache_key("você é um idiota", "toxicity", "v1")
+    assert key == get_cache_key(" você é  um idiota", "toxicity", "v1")
+    assert key != get_cache_key("Você é um idiota", "toxicity", "v1")
+    assert key != get_cache_key("você é um idiota", "toxicity_type", "v1")
+    assert key != get_cache_key("você é um idiota", "toxicity", "v2")
+    assert get_cache_key(" a", "toxic_spans", "v1", normalize=False) != (
+        get_cache_key("a", "toxic_spans", "v1", normalize=False)
+    )
+
+
+def test_lru_cache(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+
+    lru = LRUCache(max_size=2, ttl=10)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)  # "b" is the least recently used entry
+    assert lru.get("b") is None
+    assert lru.get("c") == 3
+
+    clock.now = 11
+    assert lru.get("a") is None
+    assert len(lru) == 1
+    assert lru.stats == {"hits": 2, "misses": 2, "evictions": 1, "expired": 1}
+
+
+def test_prediction_cache():
+    async def run():
+        shared = DictCache()
+        cache = PredictionCache(LRUCache(max_size=10), shared=shared)
+        await cache.start()
+
+        assert await cache.get("a") is None
+        await cache.set("a", {"labels": ["OFFENSIVE"]})
+        await cache.close()
+        assert shared.data == {"a": {"labels": ["OFFENSIVE"]}}
+
+        # A new instance gets the prediction from the shared tier.
+        other = PredictionCache(LRUCache(max_size=10), shared=shared)
+        assert await other.get("a") == {"labels": ["OFFENSIVE"]}
+        assert await other.get("a") == {"labels": ["OFFENSIVE"]}
+        return other.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["hits"] == 2
+    assert stats["misses"] == 0
+    assert stats["local"]["hits"] == 1
+    assert stats["shared"]["hits"] == 1
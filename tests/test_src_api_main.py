@@ -1,5 +1,16 @@
+import json
+import asyncio
+import threading
+import time
+from functools import partial
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from src.api import main
+from src.api.audit import COLUMNS
+from src.api.batching import MicroBatcher
+from src.api.cache import LRUCache, PredictionCache
 from src.api.main import app
+from tests.test_src_api_audit import FakePool, get_audit_logger
 
 client = TestClient(app)
 
@@ -8,3 +19,272 @@ def test_health():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"STATUS": "OK"}
+
+
+def test_predict(monkeypatch):
+    def predict_fn(texts):
+        return [
+            {
+                "labels": ["OFFENSIVE"],
+                "probabilities": {"NOT-OFFENSIVE": 0.1, "OFFENSIVE": 0.9},
+            }
+            for _ in texts
+        ]
+
+    monkeypatch.setattr(main, "task_groups", {"toxicity": ["toxicity"]})
+    monkeypatch.setattr(main.args, "API_TOXICITY_MODEL", "fake-model")
+    monkeypatch.setattr(main.args, "API_PRELOAD", False)
+    monkeypatch.setitem(main.batchers, "toxicity", MicroBatcher(predict_fn))
+
+    with TestClient(app) as test_client:
+        response = test_client.post("/predict", json={"text": "some text"})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "toxicity": {
+            "labels": ["OFFENSIVE"],
+            "probabilities": {"NOT-OFFENSIVE": 0.1, "OFFENSIVE": 0.9},
+        }
+    }
+
+
+def test_predict_not_configured():
+    response = client.post("/toxicity/predict", json={"text": "some text"})
+    assert response.status_code == 503
+
+
+def wait_ready(test_client, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    response = test_client.get("/ready")
+    while response.status_code != 200 and time.monotonic() < deadline:
+        time.sleep(0.01)
+        response = test_client.get("/ready")
+    return response
+
+
+def test_ready(monkeypatch):
+    batches = []
+
+    def load_predictor(model, settings):
+        time.sleep(0.1)
+        return lambda texts: batches.append((model, texts))
+
+    monkeypatch.setattr(main, "task_groups", {"toxicity": ["toxicity"]})
+    monkeypatch.setattr(main, "predictors", {})
+    monkeypatch.setattr(main, "load_predictor", load_predictor)
+    monkeypatch.setattr(main.args, "API_TOXICITY_MODEL", "fake-model")
+    monkeypatch.setattr(main.args, "API_MAX_SEQ_LENGTH", 64)
+    monkeypatch.setattr(main.args, "API_WARMUP_SEQ_LENGTHS", [8, 128])
+    monkeypatch.setattr(main.args, "API_BATCH_MAX_SIZE", 4)
+
+    with TestClient(app) as test_client:
+        assert test_client.get("/health").status_code == 200
+        assert test_client.get("/ready").status_code == 503
+
+        response = wait_ready(test_client)
+        assert response.status_code == 200
+        assert response.json() == {"STATUS": "READY"}
+
+    assert [(model, len(texts)) for model, texts in batches] == [
+        ("toxicity", 4),
+        ("toxicity", 4),
+    ]
+    assert [len(texts[0].split()) for _, texts in batches] == [8, 64]
+
+
+def test_ready_error(monkeypatch):
+    def load_predictor(model, settings):
+        raise OSError("model not found")
+
+    monkeypatch.setattr(main, "task_groups", {"toxicity": ["toxicity"]})
+    monkeypatch.setattr(main, "predictors", {})
+    monkeypatch.setattr(main, "load_predictor", load_predictor)
+    monkeypatch.setattr(main.args, "API_TOXICITY_MODEL", "fake-model")
+
+    with TestClient(app) as test_client:
+        response = wait_ready(test_client, timeout=0.5)
+
+    assert response.status_code == 503
+    assert "model not found" in response.json()["detail"]
+
+
+def test_predict_cache(monkeypatch):
+    batches = []
+
+    def predict_fn(texts):
+        batches.append(texts)
+        return [
+            {"labels": ["OFFENSIVE"], "probabilities": {"OFFENSIVE": 0.9}}
+            for _ in texts
+        ]
+
+    monkeypatch.setattr(main, "task_groups", {"toxicity": ["toxicity"]})
+    monkeypatch.setattr(main.args, "API_TOXICITY_MODEL", "fake-model")
+    monkeypatch.setattr(main.args, "API_PRELOAD", False)
+    monkeypatch.setattr(main, "cache", PredictionCache(LRUCache(max_size=10)))
+    monkeypatch.setitem(main.batchers, "toxicity", MicroBatcher(predict_fn))
+
+    with TestClient(app) as test_client:
+        for text in ["seu idiota", " seu  idiota ", "seu idiota"]:
+            response = test_client.post("/predict", json={"text": text})
+            assert response.status_code == 200
+        stats = test_client.get("/cache/stats").json()
+
+    assert batches == [["seu idiota"]]
+    assert stats["enabled"]
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_predict_audit(monkeypatch):
+    pool = FakePool()
+
+    def predict_fn(texts):
+        return [
+            {"labels": ["OFFENSIVE"], "probabilities": {"OFFENSIVE": 0.9}}
+            for _ in texts
+        ]
+
+    monkeypatch.setattr(main, "task_groups", {"toxicity": ["toxicity"]})
+    monkeypatch.setattr(main.args, "API_TOXICITY_MODEL", "fake-model")
+    monkeypatch.setattr(main.args, "API_PRELOAD", False)
+    monkeypatch.setattr(main, "cache", PredictionCache(LRUCache(max_size=10)))
+    monkeypatch.setattr(main, "audit", get_audit_logger(pool))
+    monkeypatch.setitem(main.batchers, "toxicity", MicroBatcher(predict_fn))
+
+    with TestClient(app) as test_client:
+        for _ in range(2):
+            response = test_client.post("/predict", json={"text": "idiota"})
+            assert response.status_code == 200
+        assert test_client.get("/audit/stats").json()["enabled"]
+
+    records = [dict(zip(COLUMNS, r)) for batch in pool.batches for r in batch]
+    assert [r["cached"] for r in records] == [False, True]
+    assert all(r["task"] == "toxicity" for r in records)
+    assert all(r["model_version"].startswith("fake-model|") for r in records)
+
+
+def test_metrics(monkeypatch):
+    def predict_fn(texts):
+        return [
+            {"labels": ["OFFENSIVE"], "probabilities": {"OFFENSIVE": 0.9}}
+            for _ in texts
+        ]
+
+    monkeypatch.setattr(main, "task_groups", {"toxicity": ["toxicity"]})
+    monkeypatch.setattr(main.args, "API_TOXICITY_MODEL", "fake-model")
+    monkeypatch.setattr(main.args, "API_PRELOAD", False)
+    monkeypatch.setattr(main, "cache", PredictionCache(LRUCache(max_size=10)))
+    monkeypatch.setitem(
+        main.batchers,
+        "toxicity",
+        MicroBatcher(
+            predict_fn, on_batch=partial(main.record_batch, "toxicity")
+        ),
+    )
+
+    with TestClient(app) as test_client:
+        test_client.post("/predict", json={"text": "seu idiota"})
+        response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'api_requests_total{api_task="all",method="POST",path="/predict",status="200"}'
+        in response.text
+    )
+    assert "api_batch_size_count" in response.text
+    assert (
+        'api_cache_lookups_total{api_task="all",result="miss",tier="local"} 1.0'
+        in response.text
+    )
+
+
+def test_predict_stream(monkeypatch):
+    def predict_fn(texts):
+        return [
+            {"labels": [text.upper()], "probabilities": {text.upper(): 1.0}}
+            for text in texts
+        ]
+
+    monkeypatch.setattr(main, "task_groups", {"toxicity": ["toxicity"]})
+    monkeypatch.setattr(main.args, "API_TOXICITY_MODEL", "fake-model")
+    monkeypatch.setattr(main.args, "API_PRELOAD", False)
+    monkeypatch.setattr(main.args, "API_STREAM_MAX_IN_FLIGHT", 4)
+    monkeypatch.setitem(
+        main.batchers, "toxicity", MicroBatcher(predict_fn, max_batch_size=4)
+    )
+
+    texts = [f"text {i}" for i in range(10)]
+    body = "".join(
+        json.dumps({"id": i, "text": text}) + "\n"
+        for i, text in enumerate(texts)
+    )
+    with TestClient(app) as test_client:
+        response = test_client.post(
+            "/predict/stream", content=body + "not json\n"
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = [json.loads(x) for x in response.text.splitlines()]
+    assert [x["toxicity"]["labels"] for x in results[:-1]] == [
+        [text.upper()] for text in texts
+    ]
+    assert [x["id"] for x in results[:-1]] == list(range(10))
+    assert "error" in results[-1]
+
+
+def test_load_shedding(monkeypatch):
+    release = threading.Event()
+
+    def predict_fn(texts):
+        release.wait(5)
+        return texts
+
+    monkeypatch.setattr(main.args, "API_REALTIME_DEADLINE", 0.0)
+    monkeypatch.setitem(
+        main.batchers,
+        "toxicity",
+        MicroBatcher(predict_fn, max_wait_ms=1, max_pending={"realtime": 1}),
+    )
+
+    async def run():
+        first = asyncio.ensure_future(main.submit("toxicity", "a"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(main.submit("toxicity", "b"))
+        await asyncio.sleep(0.01)
+        try:
+            await main.submit("toxicity", "c")
+        except HTTPException as e:
+            error = e
+        release.set()
+        await asyncio.gather(first, second)
+        await main.batchers["toxicity"].stop()
+        return error
+
+    error = asyncio.run(run())
+    assert error.status_code == 429
+    assert error.headers == {"Retry-After": "1"}
+
+
+def test_deadline(monkeypatch):
+    def predict_fn(texts):
+        time.sleep(0.05)
+        return texts
+
+    monkeypatch.setattr(main.args, "API_REALTIME_DEADLINE", 0.01)
+    monkeypatch.setitem(
+        main.batchers, "toxicity", MicroBatcher(predict_fn, max_wait_ms=1)
+    )
+
+    async def run():
+        await main.submit("toxicity", "a")
+        try:
+            await main.submit("toxicity", "b")
+        except HTTPException as e:
+            return e
+        finally:
+            await main.batchers["toxicity"].stop()
+
+    assert asyncio.run(run()).status_code == 503
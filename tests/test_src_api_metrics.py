@@ -0,0 +1,107 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry
+from src.api.cache import LRUCache, PredictionCache
+from src.api.metrics import (
+    CacheCollector,
+    MetricsMiddleware,
+    observe_batch,
+    observe_stage,
+    registry,
+)
+
+
+def test_metrics_middleware():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, api_task="test")
+
+    @app.get("/ping")
+    def ping():
+        return {"ping": "pong"}
+
+    client = TestClient(app)
+    for path in ["/ping", "/ping", "/unknown"]:
+        client.get(path)
+
+    assert (
+        registry.get_sample_value(
+            "api_requests_total",
+            {
+                "api_task": "test",
+                "method": "GET",
+                "path": "/ping",
+                "status": "200",
+            },
+        )
+        == 2
+    )
+    assert (
+        registry.get_sample_value(
+            "api_requests_total",
+            {
+                "api_task": "test",
+                "method": "GET",
+                "path": "other",
+                "status": "404",
+            },
+        )
+        == 1
+    )
+    assert (
+        registry.get_sample_value(
+            "api_request_duration_seconds_count",
+            {"api_task": "test", "method": "GET", "path": "/ping"},
+        )
+        == 2
+    )
+
+
+def test_observe_batch():
+    labels = {"api_task": "test", "model": "toxicity", "model_version": "v1"}
+    observe_batch("test", "toxicity", "v1", [0.001, 0.002, 0.003])
+    observe_stage("test", "toxicity", "v1", "forward", 0.05)
+
+    assert registry.get_sample_value("api_batch_size_sum", labels) == 3
+    assert registry.get_sample_value(
+        "api_batch_queue_wait_seconds_sum", labels
+    ) == sum([0.001, 0.002, 0.003])
+    assert (
+        registry.get_sample_value(
+            "api_stage_duration_seconds_count", {**labels, "stage": "forward"}
+        )
+        == 1
+    )
+
+
+def test_cache_collector():
+    cache = PredictionCache(LRUCache(max_size=10))
+    cache.local.set("a", 1)
+    cache.local.get("a")
+    cache.local.get("b")
+
+    test_registry = CollectorRegistry()
+    test_registry.register(CacheCollector("test", lambda: cache))
+    labels = {"api_task": "test", "tier": "local"}
+    assert (
+        test_registry.get_sample_value(
+            "api_cache_lookups_total", {**labels, "result": "hit"}
+        )
+        == 1
+    )
+    assert (
+        test_registry.get_sample_value(
+            "api_cache_lookups_total", {**labels, "result": "miss"}
+        )
+        == 1
+    )
+    assert (
+        test_registry.get_sample_value(
+            "api_cache_hit_ratio", {"api_task": "test"}
+        )
+        == 0.5
+    )
+
+    # Nothing is collected when the cache is disabled.
+    test_registry = CollectorRegistry()
+    test_registry.register(CacheCollector("test", lambda: None))
+    assert list(test_registry.collect()) == []
@@ -0,0 +1,217 @@
+import sys
+import pytest
+import subprocess
+import numpy as np
+from src.api.predictors import (
+    MultiTaskPredictor,
+    OnnxMultiTaskPredictor,
+    OnnxSequenceClassificationPredictor,
+    SequenceClassificationPredictor,
+    TorchScriptMultiTaskPredictor,
+    TorchScriptSequenceClassificationPredictor,
+    get_model_fingerprint,
+    load_predictor,
+    warmup_predictor,
+)
+from src.api.settings import Settings
+from src.ml.metrics.thresholds import save_thresholds
+from src.ml.models.bert import (
+    ToxicityMultiTaskForSequenceClassification,
+    ToxicityTypeForSequenceClassification,
+)
+from src.ml.models.onnx import export_onnx
+from src.ml.models.quantization import save_quantized_model
+from src.ml.models.torchscript import export_torchscript
+
+
+@pytest.fixture
+def save_model(save_model, tokenizer):
+    def save_model_artifacts(model, path):
+        path = save_model(model, path)
+        export_onnx(model, tokenizer, path)
+        export_torchscript(model, tokenizer, path)
+        return path
+
+    return save_model_artifacts
+
+
+def assert_same_results(results, expected):
+    assert len(results) == len(expected)
+    for result, exp in zip(results, expected):
+        assert result["labels"] == exp["labels"]
+        assert result["probabilities"] == pytest.approx(
+            exp["probabilities"], abs=1e-5
+        )
+
+
+def test_onnx_predictor(tmp_path, get_config, save_model, texts):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3, problem_type="multi_label_classification")
+    )
+    path = save_model(model, tmp_path / "model")
+
+    predictor = OnnxSequenceClassificationPredictor(path)
+    assert_same_results(
+        predictor(texts), SequenceClassificationPredictor(path)(texts)
+    )
+
+
+def test_onnx_multi_task_predictor(
+    tmp_path, get_config, save_model, tasks, texts
+):
+    model = ToxicityMultiTaskForSequenceClassification(
+        get_config(), tasks=tasks
+    )
+    path = save_model(model, tmp_path / "model")
+
+    settings = Settings(API_BACKEND="onnx", API_MULTI_TASK_MODEL=path)
+    predictor = load_predictor("multi_task", settings)
+    assert isinstance(predictor, OnnxMultiTaskPredictor)
+
+    results = predictor(texts)
+    expected = MultiTaskPredictor(path)(texts)
+    for task in tasks:
+        assert_same_results(
+            [x[task] for x in results], [x[task] for x in expected]
+        )
+
+
+def test_torchscript_predictor(tmp_path, get_config, save_model, texts):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3, problem_type="multi_label_classification")
+    )
+    path = save_model(model, tmp_path / "model")
+
+    settings = Settings(API_BACKEND="torchscript", API_TOXICITY_MODEL=path)
+    predictor = load_predictor("toxicity", settings)
+    assert isinstance(predictor, TorchScriptSequenceClassificationPredictor)
+    assert_same_results(
+        predictor(texts), SequenceClassificationPredictor(path)(texts)
+    )
+
+
+def test_torchscript_multi_task_predictor(
+    tmp_path, get_config, save_model, tasks, texts
+):
+    model = ToxicityMultiTaskForSequenceClassification(
+        get_config(), tasks=tasks
+    )
+    path = save_model(model, tmp_path / "model")
+
+    settings = Settings(API_BACKEND="torchscript", API_MULTI_TASK_MODEL=path)
+    predictor = load_predictor("multi_task", settings)
+    assert isinstance(predictor, TorchScriptMultiTaskPredictor)
+
+    results = predictor(texts)
+    expected = MultiTaskPredictor(path)(texts)
+    for task in tasks:
+        assert_same_results(
+            [x[task] for x in results], [x[task] for x in expected]
+        )
+
+
+def test_torchscript_predictor_without_transformers(
+    tmp_path, get_config, save_model, texts
+):
+    model = ToxicityTypeForSequenceClassification(get_config(num_labels=2))
+    path = save_model(model, tmp_path / "model")
+
+    code = (
+        "import sys\n"
+        "from src.api.predictors import "
+        "TorchScriptSequenceClassificationPredictor\n"
+        f"predictor = TorchScriptSequenceClassificationPredictor({path!r})\n"
+        f"assert len(predictor({texts!r})) == {len(texts)}\n"
+        "assert 'transformers' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_quantized_predictor(
+    tmp_path, get_config, save_model, tokenizer, texts
+):
+    model = ToxicityTypeForSequenceClassification(get_config(num_labels=2))
+    path = save_model(model, tmp_path / "model")
+    save_quantized_model(model, tokenizer, path)
+
+    settings = Settings(API_BACKEND="int8", API_TOXICITY_MODEL=path)
+    predictor = load_predictor("toxicity", settings)
+
+    results = predictor(texts)
+    assert len(results) == len(texts)
+    assert set(results[0]["probabilities"]) == {"LABEL_0", "LABEL_1"}
+
+
+def test_per_label_thresholds(tmp_path, get_config, save_model, texts):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3, problem_type="multi_label_classification")
+    )
+    path = save_model(model, tmp_path / "model")
+    save_thresholds(np.array([0.0, 1.0, 0.0]), model.config.id2label, path)
+
+    for predictor_class in [
+        SequenceClassificationPredictor,
+        OnnxSequenceClassificationPredictor,
+    ]:
+        results = predictor_class(path)(texts)
+        assert all(x["labels"] == ["LABEL_0", "LABEL_2"] for x in results)
+
+
+def test_get_model_fingerprint(tmp_path, get_config, save_model):
+    model = ToxicityTypeForSequenceClassification(get_config(num_labels=3))
+    path = save_model(model, tmp_path / "model")
+    fingerprint = get_model_fingerprint(path)
+    assert get_model_fingerprint(path) == fingerprint
+
+    # Tuned thresholds change the predictions of the same weights.
+    save_thresholds(np.array([0.3, 0.5, 0.7]), model.config.id2label, path)
+    assert get_model_fingerprint(path) != fingerprint
+
+
+def test_warmup_predictor(tmp_path, get_config, save_model):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3, problem_type="multi_label_classification")
+    )
+    predictor = SequenceClassificationPredictor(
+        save_model(model, tmp_path / "model"), max_seq_length=16
+    )
+
+    batches = []
+    warmup_predictor(
+        lambda texts: batches.append(predictor(texts)), [4, 32], batch_size=2
+    )
+    assert [len(x) for x in batches] == [2, 2]
+
+
+def test_shared_weights_predictor(tmp_path, get_config, save_model, texts):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3, problem_type="multi_label_classification")
+    )
+    path = save_model(model, tmp_path / "model")
+
+    settings = Settings(
+        API_SHARED_WEIGHTS=True,
+        API_SHARED_WEIGHTS_DIR=str(tmp_path / "cache"),
+        API_TOXICITY_TYPE_MODEL=path,
+    )
+    predictor = load_predictor("toxicity_type", settings)
+    assert_same_results(
+        predictor(texts), SequenceClassificationPredictor(path)(texts)
+    )
+
+
+def test_stage_timings(tmp_path, get_config, save_model, texts):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3, problem_type="multi_label_classification")
+    )
+    path = save_model(model, tmp_path / "model")
+
+    for predictor_class in [
+        SequenceClassificationPredictor,
+        OnnxSequenceClassificationPredictor,
+    ]:
+        stages = []
+        predictor = predictor_class(path)
+        predictor.on_stage = lambda stage, seconds: stages.append(stage)
+        predictor(texts)
+        assert stages == ["tokenize", "forward", "postprocess"]
@@ -0,0 +1,84 @@
+import asyncio
+import httpx
+from src.api.router import Router
+
+ENDPOINTS = {
+    "toxicity": "http://toxicity/predict",
+    "toxic_spans": "http://toxic-spans/predict",
+}
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "toxicity":
+        return httpx.Response(
+            200,
+            json={
+                "toxicity": {
+                    "labels": ["OFFENSIVE"],
+                    "probabilities": {"NOT-OFFENSIVE": 0.1, "OFFENSIVE": 0.9},
+                }
+            },
+        )
+    return httpx.Response(500)
+
+
+def test_router_predict():
+    async def main():
+        router = Router(ENDPOINTS)
+        router._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        try:
+            return await router.predict("some text")
+        finally:
+            await router.close()
+
+    report = asyncio.run(main())
+    assert report == {
+        "toxicity": {
+            "labels": ["OFFENSIVE"],
+            "probabilities": {"NOT-OFFENSIVE": 0.1, "OFFENSIVE": 0.9},
+        },
+        "errors": {"toxic_spans": "HTTP 500."},
+    }
+
+
+def test_router_on_response():
+    responses = []
+
+    async def main():
+        router = Router(
+            ENDPOINTS,
+            on_response=lambda *args: responses.append(args),
+        )
+        router._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        try:
+            await router.predict("some text")
+        finally:
+            await router.close()
+
+    asyncio.run(main())
+    errors = {task: error for task, _, error in sorted(responses)}
+    assert errors == {"toxic_spans": "HTTP 500.", "toxicity": None}
+    assert all(seconds >= 0 for _, seconds, _ in responses)
+
+
+def test_router_invalid_response():
+    async def main():
+        router = Router({"toxicity": "http://toxicity/predict"})
+        router._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, json=["OFFENSIVE"])
+            )
+        )
+        try:
+            return await router.predict("some text")
+        finally:
+            await router.close()
+
+    report = asyncio.run(main())
+    assert report == {
+        "errors": {"toxicity": "Invalid response: not a JSON object."}
+    }
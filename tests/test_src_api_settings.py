@@ -1,6 +1,56 @@
+import pytest
+from pydantic import ValidationError
 from src.api.settings import Settings
 
 
 def test_settings():
     settings = Settings()
     assert type(settings) == Settings
+
+
+def test_settings_route():
+    with pytest.raises(ValidationError):
+        Settings(API_TASK="route")
+
+    endpoints = {
+        "API_ROUTE_TOXIC_SPANS_ENDPOINT": "http://localhost:8001/predict",
+        "API_ROUTE_TOXICITY_ENDPOINT": "http://localhost:8002/predict",
+        "API_ROUTE_TOXICITY_TYPE_ENDPOINT": "http://localhost:8003/predict",
+        "API_ROUTE_TOXICITY_TARGET_ENDPOINT": "http://localhost:8004/predict",
+        "API_ROUTE_TOXICITY_TARGET_TYPE_ENDPOINT": "http://localhost:8005/predict",
+    }
+    settings = Settings(API_TASK="route", **endpoints)
+    assert settings.get_tasks() == []
+    assert (
+        settings.get_route_endpoints()["toxicity"]
+        == endpoints["API_ROUTE_TOXICITY_ENDPOINT"]
+    )
+
+
+def test_settings_backend():
+    assert Settings(API_BACKEND="onnx").API_BACKEND == "onnx"
+    assert Settings(API_BACKEND="torchscript").API_BACKEND == "torchscript"
+    with pytest.raises(ValidationError):
+        Settings(API_BACKEND="tensorrt")
+
+
+def test_settings_shared_weights():
+    assert Settings(API_SHARED_WEIGHTS=True).API_SHARED_WEIGHTS
+    with pytest.raises(ValidationError):
+        Settings(API_SHARED_WEIGHTS=True, API_BACKEND="onnx")
+
+
+def test_settings_admission():
+    settings = Settings(
+        API_MAX_PENDING=100, API_MAX_PENDING_PER_MODEL={"toxic_spans": 10}
+    )
+    assert settings.get_max_pending("toxicity") == {
+        "realtime": 100,
+        "bulk": 1024,
+    }
+    assert settings.get_max_pending("toxic_spans")["realtime"] == 10
+    assert settings.get_deadline("realtime") == 2.0
+    assert settings.get_deadline("bulk") is None
+
+    with pytest.raises(ValidationError):
+        Settings(API_MAX_PENDING_PER_MODEL={"unknown": 10})
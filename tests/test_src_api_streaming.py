@@ -0,0 +1,153 @@
+import json
+import random
+import asyncio
+import pytest
+from fastapi import FastAPI, Request
+from src.api.streaming import (
+    NDJSONResponse,
+    iter_lines,
+    notify_end,
+    stream_predictions,
+)
+
+
+async def to_stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(stream):
+    return [x async for x in stream]
+
+
+def test_iter_lines():
+    chunks = [b'{"text": "a"}\n{"te', b'xt": "b"}\n\n', b'{"text": "c"}']
+    lines = asyncio.run(collect(iter_lines(to_stream(chunks))))
+    assert lines == [b'{"text": "a"}', b'{"text": "b"}', b'{"text": "c"}']
+
+    # A long line sent in many small chunks.
+    line = b'{"text": "' + b"a" * 10000 + b'"}'
+    chunks = [line[i : i + 7] for i in range(0, len(line), 7)]
+    lines = asyncio.run(collect(iter_lines(to_stream(chunks))))
+    assert lines == [line]
+
+
+def test_iter_lines_too_long():
+    # Whole lines in one chunk, followed by a line break or not.
+    for chunks in [[b"x" * 2048 + b"\n"], [b"a\n" + b"x" * 2048]]:
+        lines = iter_lines(to_stream(chunks), max_line_size=1024)
+        with pytest.raises(ValueError, match="Line too long"):
+            asyncio.run(collect(lines))
+
+
+def test_stream_predictions():
+    max_pending = 0
+    pending = 0
+
+    async def predict_fn(text):
+        nonlocal max_pending, pending
+        pending += 1
+        max_pending = max(max_pending, pending)
+        # The predictions finish out of order.
+        await asyncio.sleep(random.random() / 100)
+        pending -= 1
+        if text == "fail":
+            raise RuntimeError("model error")
+        return {"text": text}
+
+    lines = [json.dumps({"id": i, "text": str(i)}) for i in range(50)]
+    lines += ['{"text": "fail"}', "not json", '{"id": 1}']
+    chunks = [(line + "\n").encode() for line in lines]
+
+    results = asyncio.run(
+        collect(stream_predictions(to_stream(chunks), predict_fn, 8))
+    )
+    results = [json.loads(x) for x in results]
+    assert results[:50] == [{"id": i, "text": str(i)} for i in range(50)]
+    assert results[50] == {"error": "model error"}
+    assert results[51]["error"].startswith("Invalid line")
+    assert results[52]["error"].startswith("Invalid line")
+    assert max_pending <= 8
+
+
+def test_stream_predictions_line_too_long():
+    async def predict_fn(text):
+        return {"text": text}
+
+    chunks = [b'{"text": "a"}\n', b"x" * 2048]
+    stream = stream_predictions(
+        to_stream(chunks), predict_fn, max_line_size=1024
+    )
+    results = [json.loads(x) for x in asyncio.run(collect(stream))]
+    assert results[0] == {"text": "a"}
+    assert results[1]["error"].startswith("Line too long")
+
+
+def test_ndjson_response():
+    app = FastAPI()
+
+    async def predict_fn(text):
+        return {"text": text}
+
+    @app.post("/stream")
+    async def stream(request: Request):
+        body_read = asyncio.Event()
+        return NDJSONResponse(
+            stream_predictions(
+                notify_end(request.stream(), body_read), predict_fn
+            ),
+            body_read=body_read,
+        )
+
+    body = b"".join(
+        json.dumps({"text": str(i)}).encode() + b"\n" for i in range(100)
+    )
+
+    async def run():
+        # The body arrives in chunks that split the lines, as with uvicorn.
+        messages = [
+            {
+                "type": "http.request",
+                "body": body[i : i + 5],
+                "more_body": True,
+            }
+            for i in range(0, len(body), 5)
+        ]
+        messages.append({"type": "http.request", "body": b""})
+        sent = []
+        done = asyncio.Event()
+
+        async def receive():
+            if messages:
+                await asyncio.sleep(0)
+                return messages.pop(0)
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if not message.get("more_body", True):
+                done.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/stream",
+            "raw_path": b"/stream",
+            "query_string": b"",
+            "headers": [(b"content-type", b"application/x-ndjson")],
+            "server": ("testserver", 80),
+            "client": ("testclient", 50000),
+        }
+        await asyncio.wait_for(app(scope, receive, send), 5)
+        return sent
+
+    sent = asyncio.run(run())
+    assert sent[0]["status"] == 200
+    results = b"".join(x.get("body", b"") for x in sent[1:]).splitlines()
+    assert [json.loads(x) for x in results] == [
+        {"text": str(i)} for i in range(100)
+    ]
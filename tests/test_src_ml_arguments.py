@@ -1,11 +1,24 @@
-from src.ml.arguments import TrainScriptArguments, NotebookArguments
+from src.ml.arguments import (
+    NotebookArguments,
+    QuantizeScriptArguments,
+    TrainScriptArguments,
+)
 
 
 def test_training_arguments():
     args = TrainScriptArguments()
     assert type(args) == TrainScriptArguments
+    assert not args.export_onnx
+    assert not args.group_by_length
+    assert not args.tune_thresholds
 
 
 def test_notebook_arguments():
     args = NotebookArguments()
     assert type(args) == NotebookArguments
+
+
+def test_quantize_arguments():
+    args = QuantizeScriptArguments()
+    assert args.output_dir is None
+    assert args.eval_dataset == "test"
@@ -0,0 +1,66 @@
+import datasets
+import numpy as np
+import pytest
+import torch
+from transformers import TrainingArguments
+from src.ml.bucketing import (
+    LengthGroupedTrainer,
+    LengthSortedSampler,
+    add_length_column,
+)
+from src.ml.models.bert import ToxicityTypeForSequenceClassification
+
+
+@pytest.fixture
+def trainer(tmp_path, tokenizer, get_config):
+    config = get_config(
+        hidden_dropout_prob=0.0, attention_probs_dropout_prob=0.0
+    )
+    model = ToxicityTypeForSequenceClassification(
+        config, weight=torch.ones(2)
+    ).eval()
+
+    args = TrainingArguments(
+        output_dir=str(tmp_path / "output"),
+        per_device_eval_batch_size=2,
+        group_by_length=True,
+        report_to=[],
+        no_cuda=True,
+    )
+    return LengthGroupedTrainer(model=model, args=args, tokenizer=tokenizer)
+
+
+@pytest.fixture
+def dataset(tokenizer, texts):
+    dataset = datasets.Dataset.from_dict(
+        {"text": texts, "label": [1, 0, 1, 0, 0]}
+    )
+    dataset = dataset.map(
+        lambda x: tokenizer(x["text"]), batched=True, remove_columns=["text"]
+    )
+    dataset = add_length_column(dataset)
+    dataset.set_format("torch")
+    return dataset
+
+
+def test_length_sorted_sampler():
+    sampler = LengthSortedSampler([5, 2, 9, 2])
+    assert list(sampler) == [1, 3, 0, 2]
+    assert len(sampler) == 4
+
+
+def test_add_length_column(dataset):
+    assert dataset["length"].tolist() == [len(x) for x in dataset["input_ids"]]
+
+
+def test_length_grouped_trainer(trainer, dataset):
+    assert isinstance(trainer._get_eval_sampler(dataset), LengthSortedSampler)
+    grouped = trainer.predict(dataset)
+
+    trainer.args.group_by_length = False
+    sequential = trainer.predict(dataset)
+
+    np.testing.assert_allclose(
+        grouped.predictions, sequential.predictions, atol=1e-5
+    )
+    np.testing.assert_array_equal(grouped.label_ids, [1, 0, 1, 0, 0])
@@ -0,0 +1,85 @@
+import datasets
+from transformers import BertTokenizerFast
+from src.ml.arguments import TrainScriptArguments
+from src.ml.experiments.base import Experiment
+
+CALLS = []
+
+
+def preprocess_data(examples, tokenizer, max_seq_length):
+    CALLS.append(len(examples["text"]))
+    return tokenizer(
+        examples["text"], truncation=True, max_length=max_seq_length
+    )
+
+
+def get_experiment(tmp_path):
+    args = TrainScriptArguments(
+        output_dir=str(tmp_path / "output"),
+        tokenized_cache_dir=str(tmp_path / "cache"),
+    )
+    experiment = Experiment(args)
+    (tmp_path / "vocab.txt").write_text(
+        "\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "oi"])
+    )
+    experiment.tokenizer = BertTokenizerFast(str(tmp_path / "vocab.txt"))
+    return experiment
+
+
+def test_map_dataset(tmp_path):
+    experiment = get_experiment(tmp_path)
+    dataset = datasets.DatasetDict(
+        {"train": datasets.Dataset.from_dict({"text": ["oi", "oi oi"]})}
+    )
+
+    def map_dataset(max_seq_length):
+        return experiment.map_dataset(
+            dataset,
+            preprocess_data,
+            batched=True,
+            remove_columns=["text"],
+            fn_kwargs={
+                "tokenizer": experiment.tokenizer,
+                "max_seq_length": max_seq_length,
+            },
+        )
+
+    CALLS.clear()
+    first = map_dataset(8)
+    assert len(CALLS) == 1
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    second = map_dataset(8)
+    assert len(CALLS) == 1
+    assert second["train"]["input_ids"] == first["train"]["input_ids"]
+
+    map_dataset(3)
+    assert len(CALLS) == 2
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+
+def test_get_cache_key(tmp_path):
+    experiment = get_experiment(tmp_path)
+    dataset = datasets.Dataset.from_dict({"text": ["oi"]})
+    fn_kwargs = {"tokenizer": experiment.tokenizer, "max_seq_length": 8}
+
+    key = experiment.get_cache_key(dataset, preprocess_data, fn_kwargs)
+    assert key == experiment.get_cache_key(
+        dataset, preprocess_data, dict(fn_kwargs)
+    )
+    other = datasets.Dataset.from_dict({"text": ["oi oi"]})
+    assert key != experiment.get_cache_key(other, preprocess_data, fn_kwargs)
+    assert key != experiment.get_cache_key(
+        dataset, preprocess_data, {**fn_kwargs, "labels": ["insult"]}
+    )
+
+
+def test_export_onnx_failure(tmp_path):
+    experiment = get_experiment(tmp_path)
+    # A failed export doesn't stop the run.
+    assert experiment.export_onnx(None, str(tmp_path / "model")) is None
+
+
+def test_export_torchscript_failure(tmp_path):
+    experiment = get_experiment(tmp_path)
+    assert experiment.export_torchscript(None, str(tmp_path / "model")) is None
@@ -1,8 +1,14 @@
 import pytest
-import torch
 import numpy as np
 from transformers.trainer_utils import PredictionOutput
-from src.ml.inference import predict
+from src.ml.inference import (
+    get_problem_type,
+    get_tasks,
+    postprocess_tasks,
+    predict,
+    softmax,
+    sigmoid,
+)
 
 TESTS = [
     (
@@ -281,5 +287,51 @@ def test_predict(predictions, expected, problem_type):
                     predictions, return_proba=True, problem_type=problem_type
                 )
             )
-            == torch.Tensor
+            == np.ndarray
         ), "Predictions should be a numpy array."
+
+
+def test_get_problem_type():
+    assert get_problem_type("multi_label_classification", 10) == "multi-label"
+    assert get_problem_type("single_label_classification", 2) == "binary"
+    assert get_problem_type(None, 3) == "multi-class"
+
+
+def test_predict_out():
+    logits = np.random.randn(4, 3).astype(np.float32)
+    out = np.empty_like(logits)
+    probs = predict(
+        logits, return_proba=True, problem_type="multi-label", out=out
+    )
+    assert probs is out
+    assert np.allclose(out, 1 / (1 + np.exp(-logits)))
+
+    with pytest.raises(ValueError):
+        predict(logits, problem_type="multi-class", out=np.empty((2, 3)))
+
+
+def test_stable_activations():
+    logits = np.array([[1000.0, -1000.0], [-1000.0, 1000.0]], dtype=np.float32)
+    assert np.array_equal(softmax(logits), [[1.0, 0.0], [0.0, 1.0]])
+    assert np.array_equal(sigmoid(logits), [[1.0, 0.0], [0.0, 1.0]])
+
+
+def test_postprocess_tasks(tasks):
+    tasks = get_tasks(tasks)
+    logits = [
+        np.array([[0.0, 1.0], [1.0, 0.0]], dtype=np.float32),
+        np.zeros((2, 3), dtype=np.float32),
+    ]
+    results = postprocess_tasks(
+        logits,
+        tasks,
+        threshold={"toxicity": 0.5, "toxicity_type": np.array([0, 1, 0])},
+    )
+    assert [x["toxicity"]["labels"] for x in results] == [
+        ["OFFENSIVE"],
+        ["NOT-OFFENSIVE"],
+    ]
+    assert [x["toxicity_type"]["labels"] for x in results] == [
+        ["insult", "sexism"],
+        ["insult", "sexism"],
+    ]
@@ -1,5 +1,7 @@
 import logging
-from src.ml.logger import setup_logger
+import logging.handlers
+import numpy as np
+from src.ml.logger import lazy, setup_logger, summarize
 
 
 def test_setup_logger():
@@ -8,3 +10,30 @@ def test_setup_logger():
 
     logger = setup_logger(__name__)
     assert len(logger.handlers) == 1
+    assert isinstance(logger.handlers[0], logging.handlers.QueueHandler)
+
+
+def test_lazy():
+    calls = []
+
+    def expensive(value):
+        calls.append(value)
+        return value
+
+    logger = setup_logger(__name__)
+    logger.setLevel(logging.INFO)
+    logger.debug("value: %s", lazy(expensive, 1))
+    assert calls == []
+
+    assert str(lazy(expensive, 2)) == "2"
+    assert calls == [2]
+
+
+def test_summarize():
+    assert summarize(np.zeros((1000, 10), dtype=np.int64), max_items=2) == (
+        "<ndarray shape=(1000, 10) dtype=int64 head=[0, 0]>"
+    )
+    assert summarize(list(range(100)), max_items=3) == (
+        "<list len=100 head=[0, 1, 2]>"
+    )
+    assert summarize({"a": 1}) == "{'a': 1}"
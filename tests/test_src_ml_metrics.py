@@ -1,7 +1,12 @@
 import numpy as np
 from transformers import EvalPrediction
-from src.ml.metrics.utils import compute_metrics
-from src.ml.metrics.spans import precision_score, recall_score, f1_score
+from src.ml.metrics.utils import compute_metrics, compute_multi_task_metrics
+from src.ml.metrics.spans import (
+    precision_score,
+    recall_score,
+    f1_score,
+    span_scores,
+)
 
 
 def test_compute_metrics():
@@ -60,3 +65,38 @@ def test_recall_score():
 
 def test_f1_score():
     assert f1_score([[0, 1, 4, 5]], [[0, 1, 6]]) == 0.5714285714285715
+
+
+def test_compute_multi_task_metrics():
+    tasks = {
+        "toxicity": {
+            "labels": ["NOT-OFFENSIVE", "OFFENSIVE"],
+            "problem_type": "single_label_classification",
+        },
+        "toxicity_type": {
+            "labels": ["insult", "racism"],
+            "problem_type": "multi_label_classification",
+        },
+    }
+    predictions = (
+        np.array([[1.0, -1.0], [-1.0, 1.0], [-1.0, 1.0]]),
+        np.array([[0.0, 0.0], [1.0, -1.0], [-1.0, 1.0]]),
+    )
+    label_ids = (
+        np.array([0, 1, 1]),
+        np.array([[-100, -100], [1, 0], [0, 1]]),
+    )
+
+    metrics = compute_multi_task_metrics(
+        EvalPrediction(predictions=predictions, label_ids=label_ids),
+        tasks=tasks,
+    )
+    assert metrics["toxicity_f1"] == 1.0
+    assert metrics["toxicity_type_f1"] == 1.0
+    assert metrics["f1"] == 1.0
+
+
+def test_span_scores():
+    scores = span_scores([[0, 1, 4, 5], [], [2, 3]], [[0, 1, 6], [], []])
+    assert scores["precision"] == (2 / 3 + 1 + 0) / 3
+    assert scores["recall"] == (0.5 + 1 + 0) / 3
@@ -0,0 +1,80 @@
+import pytest
+import numpy as np
+from sklearn import metrics
+from src.ml.metrics.classification import (
+    classification_scores,
+    confusion_matrix,
+    multilabel_confusion_matrix,
+)
+
+
+def assert_same_scores(y_true, y_pred, average):
+    scores = classification_scores(y_true, y_pred, average=average)
+    assert scores["accuracy"] == pytest.approx(
+        metrics.accuracy_score(y_true, y_pred)
+    )
+    for name, metric in [
+        ("precision", metrics.precision_score),
+        ("recall", metrics.recall_score),
+        ("f1", metrics.f1_score),
+    ]:
+        expected = metric(y_true, y_pred, average=average, zero_division=0)
+        assert scores[name] == pytest.approx(expected), name
+
+
+@pytest.mark.parametrize("average", [None, "micro", "macro", "weighted"])
+def test_classification_scores_multi_label(average):
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 2, size=(100, 4))
+    y_pred = rng.integers(0, 2, size=(100, 4))
+    # A label that is never predicted.
+    y_pred[:, 3] = 0
+    assert_same_scores(y_true, y_pred, average)
+
+
+@pytest.mark.parametrize(
+    "average", [None, "binary", "micro", "macro", "weighted"]
+)
+def test_classification_scores_binary(average):
+    rng = np.random.default_rng(1)
+    assert_same_scores(
+        rng.integers(0, 2, size=100), rng.integers(0, 2, size=100), average
+    )
+
+
+@pytest.mark.parametrize("average", ["micro", "macro", "weighted"])
+def test_classification_scores_multi_class(average):
+    rng = np.random.default_rng(2)
+    y_true = rng.integers(0, 5, size=100)
+    y_pred = rng.integers(0, 5, size=100)
+    # A label that is neither in y_true nor in y_pred.
+    y_true[y_true == 3] = 4
+    y_pred[y_pred == 3] = 0
+    assert_same_scores(y_true, y_pred, average)
+
+
+def test_confusion_matrix():
+    y_true = np.array([0, 1, 2, 2, 1])
+    y_pred = np.array([0, 2, 2, 1, 1])
+    assert np.array_equal(
+        confusion_matrix(y_true, y_pred),
+        metrics.confusion_matrix(y_true, y_pred),
+    )
+    with pytest.raises(ValueError):
+        confusion_matrix(y_true, y_pred, num_labels=2)
+
+    y_true = np.array([[1, 0], [0, 1], [1, 1]])
+    y_pred = np.array([[1, 1], [0, 0], [0, 1]])
+    assert np.array_equal(
+        multilabel_confusion_matrix(y_true, y_pred),
+        metrics.multilabel_confusion_matrix(y_true, y_pred),
+    )
+
+
+def test_classification_scores_errors():
+    with pytest.raises(ValueError):
+        classification_scores(np.zeros((2, 2)), np.zeros((2, 2)), "binary")
+    with pytest.raises(ValueError):
+        classification_scores(np.zeros(2), np.zeros(2), "samples")
+    with pytest.raises(ValueError):
+        classification_scores(np.zeros(2), np.zeros(3))
@@ -0,0 +1,86 @@
+import pytest
+import numpy as np
+from sklearn.metrics import f1_score, precision_score, recall_score
+from metrics.thresholds import (
+    find_best_thresholds,
+    get_task_thresholds,
+    load_thresholds,
+    save_thresholds,
+    sweep_thresholds,
+    tune_thresholds,
+)
+
+LABELS = {0: "insult", 1: "racism", 2: "sexism"}
+
+
+def get_data(num_samples=200, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 2, size=(num_samples, 3))
+    # Round the probabilities so some samples are exactly on a threshold.
+    probs = np.round(
+        np.clip(0.3 * y_true + rng.random((num_samples, 3)) * 0.7, 0, 1), 2
+    )
+    return y_true, probs
+
+
+def test_sweep_thresholds():
+    y_true, probs = get_data()
+    thresholds = np.array([0.0, 0.25, 0.5, 0.7, 1.0, 1.1])
+    scores = sweep_thresholds(y_true, probs, thresholds)
+
+    for i, t in enumerate(thresholds):
+        y_pred = (probs >= t).astype(int)
+        for name, metric in [
+            ("precision", precision_score),
+            ("recall", recall_score),
+            ("f1", f1_score),
+        ]:
+            expected = metric(y_true, y_pred, average=None, zero_division=0)
+            assert scores[name][i] == pytest.approx(expected)
+
+
+def test_find_best_thresholds():
+    y_true = np.array([[1, 0], [1, 0], [0, 1], [0, 0]])
+    probs = np.array([[0.9, 0.2], [0.3, 0.1], [0.2, 0.15], [0.1, 0.3]])
+    best = find_best_thresholds(y_true, probs, np.array([0.1, 0.25, 0.5]))
+    assert best["thresholds"].tolist() == [0.25, 0.1]
+    assert best["scores"][0] == 1.0
+
+    with pytest.raises(ValueError):
+        find_best_thresholds(y_true, probs, metric="accuracy")
+    with pytest.raises(ValueError):
+        sweep_thresholds(y_true[:2], probs, np.array([0.5]))
+
+
+def test_tune_thresholds():
+    y_true, probs = get_data()
+    report = tune_thresholds(y_true, probs, LABELS)
+    assert list(report) == list(LABELS.values())
+    for scores in report.values():
+        assert 0 < scores["threshold"] < 1
+        assert scores["f1"] >= scores["f1@0.5"]
+
+
+def test_save_and_load_thresholds(tmp_path):
+    assert load_thresholds(str(tmp_path), LABELS) is None
+
+    save_thresholds(np.array([0.3, 0.5, 0.7]), LABELS, str(tmp_path))
+    thresholds = load_thresholds(str(tmp_path), LABELS)
+    assert thresholds == pytest.approx([0.3, 0.5, 0.7])
+
+    with pytest.raises(ValueError):
+        load_thresholds(str(tmp_path), {0: "insult", 1: "homophobia"})
+
+
+def test_get_task_thresholds(tmp_path):
+    tasks = {
+        "toxicity": ({0: "NOT-OFFENSIVE", 1: "OFFENSIVE"}, "binary"),
+        "toxicity_type": (LABELS, "multi-label"),
+    }
+    thresholds = get_task_thresholds(str(tmp_path), tasks, 0.4)
+    assert thresholds == {"toxicity": 0.4, "toxicity_type": 0.4}
+
+    save_thresholds(np.array([0.3, 0.5, 0.7]), LABELS, str(tmp_path))
+    thresholds = get_task_thresholds(str(tmp_path), tasks, 0.4)
+    assert thresholds["toxicity"] == 0.4
+    assert thresholds["toxicity_type"] == pytest.approx([0.3, 0.5, 0.7])
@@ -0,0 +1,26 @@
+import torch
+from src.ml.models.bert import ToxicityMultiTaskForSequenceClassification
+
+
+def test_multi_task_model(tmp_path, get_config, tasks):
+    model = ToxicityMultiTaskForSequenceClassification(
+        get_config(vocab_size=100), tasks=tasks
+    )
+    input_ids = torch.randint(0, 100, (4, 8))
+
+    outputs = model(
+        input_ids=input_ids,
+        toxicity_labels=torch.tensor([0, 1, 1, -100]),
+        toxicity_type_labels=torch.tensor(
+            [[-100] * 3, [1, 0, 0], [0, 1, 1], [-100] * 3]
+        ),
+    )
+    assert outputs.loss is not None
+    assert [logits.shape for logits in outputs.logits] == [(4, 2), (4, 3)]
+
+    model.save_pretrained(tmp_path)
+    model = ToxicityMultiTaskForSequenceClassification.from_pretrained(
+        tmp_path
+    )
+    assert model.tasks == tasks
+    assert model(input_ids=input_ids).loss is None
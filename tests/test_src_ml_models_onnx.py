@@ -0,0 +1,51 @@
+import numpy as np
+import onnxruntime as ort
+import torch
+from src.ml.models.bert import (
+    ToxicityMultiTaskForSequenceClassification,
+    ToxicityTypeForSequenceClassification,
+)
+from src.ml.models.onnx import export_onnx
+
+
+def run_onnx(path, tokenizer, texts):
+    session = ort.InferenceSession(path)
+    encoding = tokenizer(texts, padding=True, return_tensors="np")
+    return session.run(
+        None, {k: v.astype(np.int64) for k, v in encoding.items()}
+    )
+
+
+def test_export_onnx(tmp_path, tokenizer, get_config, texts):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3)
+    ).eval()
+
+    path = export_onnx(model, tokenizer, str(tmp_path / "model"))
+    outputs = run_onnx(path, tokenizer, texts)
+
+    with torch.no_grad():
+        expected = model(
+            **tokenizer(texts, padding=True, return_tensors="pt")
+        ).logits.numpy()
+    assert len(outputs) == 1
+    np.testing.assert_allclose(outputs[0], expected, atol=1e-5)
+
+
+def test_export_onnx_multi_task(tmp_path, tokenizer, get_config, tasks, texts):
+    model = ToxicityMultiTaskForSequenceClassification(
+        get_config(), tasks=tasks
+    ).eval()
+
+    path = export_onnx(model, tokenizer, str(tmp_path / "model"))
+    session = ort.InferenceSession(path)
+    assert [x.name for x in session.get_outputs()] == [
+        "toxicity_logits",
+        "toxicity_type_logits",
+    ]
+
+    outputs = run_onnx(path, tokenizer, texts[:1])
+    with torch.no_grad():
+        expected = model(**tokenizer(texts[:1], return_tensors="pt")).logits
+    for output, logits in zip(outputs, expected):
+        np.testing.assert_allclose(output, logits.numpy(), atol=1e-5)
@@ -0,0 +1,129 @@
+import os
+import torch
+import src.ml.models.shared as shared
+from src.ml.models.bert import (
+    ToxicityMultiTaskForSequenceClassification,
+    ToxicityTypeForSequenceClassification,
+)
+from src.ml.models.shared import (
+    SHARED_FILE_NAME,
+    get_weights_version,
+    load_shared_model,
+    load_weights,
+    save_weights,
+)
+
+
+def get_mapped_files():
+    with open("/proc/self/maps") as f:
+        return {line.split()[-1] for line in f if line.count(" ") >= 5}
+
+
+def get_mapped_ranges(path):
+    ranges = []
+    with open("/proc/self/maps") as f:
+        for line in f:
+            if line.rstrip().endswith(path):
+                begin, end = line.split()[0].split("-")
+                ranges.append((int(begin, 16), int(end, 16)))
+    return ranges
+
+
+def test_save_and_load_weights(tmp_path, get_config):
+    model = ToxicityTypeForSequenceClassification(get_config(num_labels=3))
+    path = save_weights(model, str(tmp_path / SHARED_FILE_NAME))
+
+    tensors = load_weights(path)
+    state_dict = model.state_dict()
+    assert set(tensors) == set(state_dict)
+    for name, tensor in state_dict.items():
+        assert torch.equal(tensors[name], tensor)
+
+    # The tensors are views of the mapped file, not copies.
+    ranges = get_mapped_ranges(path)
+    for tensor in tensors.values():
+        assert any(begin <= tensor.data_ptr() < end for begin, end in ranges)
+
+
+def test_load_shared_model(tmp_path, get_config):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3, problem_type="multi_label_classification")
+    ).eval()
+    model.save_pretrained(tmp_path / "model")
+    cache_dir = str(tmp_path / "cache")
+
+    shared_model = load_shared_model(
+        str(tmp_path / "model"),
+        model_class=ToxicityTypeForSequenceClassification,
+        cache_dir=cache_dir,
+    )
+    (path,) = [
+        os.path.join(cache_dir, x)
+        for x in os.listdir(cache_dir)
+        if x.endswith(".safetensors")
+    ]
+    assert path in get_mapped_files()
+
+    input_ids = torch.randint(0, 40, (2, 8))
+    with torch.inference_mode():
+        assert torch.allclose(
+            model(input_ids).logits, shared_model(input_ids).logits
+        )
+
+    # The converted weights are reused.
+    mtime = os.path.getmtime(path)
+    load_shared_model(
+        str(tmp_path / "model"),
+        model_class=ToxicityTypeForSequenceClassification,
+        cache_dir=cache_dir,
+    )
+    assert os.path.getmtime(path) == mtime
+
+
+def test_load_shared_multi_task_model(tmp_path, get_config, tasks):
+    model = ToxicityMultiTaskForSequenceClassification(
+        get_config(), tasks=tasks
+    ).eval()
+    model.save_pretrained(tmp_path / "model")
+    save_weights(model, str(tmp_path / "model" / SHARED_FILE_NAME))
+
+    shared_model = load_shared_model(
+        str(tmp_path / "model"),
+        model_class=ToxicityMultiTaskForSequenceClassification,
+    )
+    input_ids = torch.randint(0, 40, (2, 8))
+    with torch.inference_mode():
+        for expected, logits in zip(
+            model(input_ids).logits, shared_model(input_ids).logits
+        ):
+            assert torch.allclose(expected, logits)
+
+
+def test_load_shared_model_retrained(tmp_path, get_config):
+    cache_dir = str(tmp_path / "cache")
+    input_ids = torch.randint(0, 40, (2, 8))
+    for _ in range(2):
+        # The model is saved again at the same path with new weights.
+        model = ToxicityTypeForSequenceClassification(
+            get_config(num_labels=2)
+        ).eval()
+        model.save_pretrained(tmp_path / "model")
+
+        shared_model = load_shared_model(
+            str(tmp_path / "model"),
+            model_class=ToxicityTypeForSequenceClassification,
+            cache_dir=cache_dir,
+        )
+        with torch.inference_mode():
+            assert torch.allclose(
+                model(input_ids).logits, shared_model(input_ids).logits
+            )
+
+
+def test_get_weights_version_hub(monkeypatch):
+    monkeypatch.setattr(
+        shared,
+        "cached_file",
+        lambda *args, **kwargs: "/cache/models--org--model/snapshots/abc123/config.json",
+    )
+    assert get_weights_version("org/model") == "abc123"
@@ -0,0 +1,64 @@
+import spacy
+from src.ml.models.spacy import (
+    ToxicSpansDetectionModel,
+    fix_ranges,
+    fix_spans,
+    spans_to_ents,
+)
+
+
+def test_predict():
+    model = ToxicSpansDetectionModel(spacy_model="blank:pt", batch_size=2)
+    model._model = model.init_model()
+    model._model.initialize()
+
+    texts = ["você é um idiota", "bom dia", "que texto horrível"]
+    preds = model.predict(texts)
+    assert len(preds) == len(texts)
+    assert all(isinstance(pred, list) for pred in preds)
+    assert list(model.predict_stream(iter(texts))) == preds
+    assert model.predict(texts[0]) == preds[0]
+
+
+def test_prepare_examples(tmp_path):
+    model = ToxicSpansDetectionModel(spacy_model="blank:pt")
+    x = ["você é um idiota", "bom dia"]
+    y = [list(range(10, 16)), []]
+
+    examples = model.prepare_examples(x, y, cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("*.spacy"))) == 1
+
+    cached = model.prepare_examples(x, y, cache_dir=tmp_path)
+    for example, cached_example in zip(examples, cached):
+        assert [
+            (ent.start_char, ent.end_char, ent.label_)
+            for ent in example.reference.ents
+        ] == [
+            (ent.start_char, ent.end_char, ent.label_)
+            for ent in cached_example.reference.ents
+        ]
+    assert [
+        (ent.start_char, ent.end_char) for ent in cached[0].reference.ents
+    ] == [(10, 16)]
+
+
+def test_fix_spans():
+    text = "você é um  idiota"
+    assert fix_spans([4, 5, 6], text) == []
+    assert fix_spans([4, 5, 6, 7, 8], text) == [5, 6, 7, 8]
+    assert fix_spans(list(range(9, 17)), text) == list(range(11, 17))
+    assert fix_ranges(list(range(9, 17)), text) == [(11, 16)]
+
+
+def test_spans_to_ents():
+    nlp = spacy.blank("pt")
+    doc = nlp("você é um idiota e burro")
+    assert spans_to_ents(doc, set(range(10, 16)), "TOXIC") == [
+        (10, 16, "TOXIC")
+    ]
+    assert spans_to_ents(doc, {12, 17, 19, 20}, "TOXIC") == [(10, 24, "TOXIC")]
+    assert spans_to_ents(doc, {12, 19, 20}, "TOXIC") == [
+        (10, 16, "TOXIC"),
+        (19, 24, "TOXIC"),
+    ]
+    assert spans_to_ents(doc, set(), "TOXIC") == []
@@ -0,0 +1,69 @@
+import pytest
+import torch
+from src.ml.models.bert import (
+    ToxicityMultiTaskForSequenceClassification,
+    ToxicityTypeForSequenceClassification,
+)
+from src.ml.models.torchscript import export_torchscript
+
+
+def run_torchscript(path, tokenizer, texts):
+    module = torch.jit.load(path)
+    encoding = tokenizer(
+        texts, padding=True, return_tensors="pt", return_token_type_ids=True
+    )
+    with torch.no_grad():
+        return module(
+            encoding["input_ids"],
+            encoding["attention_mask"],
+            encoding["token_type_ids"],
+        )
+
+
+@pytest.mark.parametrize("num_texts", [1, 5, 15])
+def test_export_torchscript(tmp_path, tokenizer, get_config, texts, num_texts):
+    texts = (texts * 3)[:num_texts]
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3)
+    ).eval()
+
+    path = export_torchscript(model, tokenizer, str(tmp_path / "model"))
+    assert (tmp_path / "model" / "tokenizer.json").is_file()
+
+    # The batch size and the sequence length of the trace are dynamic.
+    outputs = run_torchscript(path, tokenizer, texts)
+    with torch.no_grad():
+        expected = model(
+            **tokenizer(texts, padding=True, return_tensors="pt")
+        ).logits
+    assert len(outputs) == 1
+    torch.testing.assert_close(outputs[0], expected, atol=1e-5, rtol=0)
+
+
+def test_export_torchscript_multi_task(
+    tmp_path, tokenizer, get_config, tasks, texts
+):
+    model = ToxicityMultiTaskForSequenceClassification(
+        get_config(), tasks=tasks
+    ).eval()
+
+    path = export_torchscript(model, tokenizer, str(tmp_path / "model"))
+    outputs = run_torchscript(path, tokenizer, texts)
+    with torch.no_grad():
+        expected = model(
+            **tokenizer(texts, padding=True, return_tensors="pt")
+        ).logits
+    assert len(outputs) == len(tasks)
+    for output, logits in zip(outputs, expected):
+        torch.testing.assert_close(output, logits, atol=1e-5, rtol=0)
+
+
+def test_export_torchscript_keeps_training_mode(
+    tmp_path, tokenizer, get_config
+):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=2)
+    ).train()
+
+    export_torchscript(model, tokenizer, str(tmp_path / "model"))
+    assert model.training
@@ -0,0 +1,141 @@
+import datasets
+import pytest
+import torch
+from src.ml.models.bert import (
+    ToxicityMultiTaskForSequenceClassification,
+    ToxicityTypeForSequenceClassification,
+)
+from src.ml.models.quantization import (
+    get_model_size,
+    load_quantized_model,
+    quantize_model,
+    save_quantized_model,
+)
+from src.ml.quantize import evaluate_quantization
+
+
+@pytest.fixture
+def save_model(save_model, get_config):
+    def save_int8_model(
+        path, model_class=ToxicityTypeForSequenceClassification, **kwargs
+    ):
+        # Larger than the default config, so int8 weights are smaller.
+        config = get_config(
+            hidden_size=64,
+            num_hidden_layers=2,
+            intermediate_size=128,
+            **kwargs,
+        )
+        model = model_class(config)
+        save_model(model, path)
+        return model
+
+    return save_int8_model
+
+
+def test_quantize_model(tmp_path, save_model):
+    model = save_model(tmp_path / "model", num_labels=2)
+    assert get_model_size(quantize_model(model)) < get_model_size(model)
+
+
+def test_evaluate_quantization(tmp_path, save_model, texts):
+    save_model(tmp_path / "model", num_labels=2)
+    dataset = datasets.Dataset.from_dict(
+        {"text": texts * 2, "label": [1, 0, 0, 1, 0] * 2}
+    )
+
+    report = evaluate_quantization(
+        str(tmp_path / "model"),
+        dataset,
+        output_dir=str(tmp_path / "int8"),
+        batch_size=4,
+    )
+    assert set(report) == {"float", "int8", "delta"}
+    assert set(report["delta"]) == {
+        "accuracy",
+        "f1",
+        "precision",
+        "recall",
+        "latency_ms",
+        "size_mb",
+    }
+    assert report["delta"]["size_mb"] < 0
+    assert report["delta"]["f1"] == pytest.approx(
+        report["int8"]["f1"] - report["float"]["f1"]
+    )
+
+    model = load_quantized_model(
+        str(tmp_path / "int8"), ToxicityTypeForSequenceClassification
+    )
+    assert model.config.num_labels == 2
+
+
+def test_evaluate_quantization_multi_label(tmp_path, save_model, texts):
+    save_model(
+        tmp_path / "model",
+        num_labels=2,
+        problem_type="multi_label_classification",
+        id2label={0: "insult", 1: "racism"},
+        label2id={"insult": 0, "racism": 1},
+    )
+    dataset = datasets.Dataset.from_dict(
+        {
+            "text": texts * 2,
+            "insult": [1, 0, 1, 0, 1] * 2,
+            "racism": [0, 0, 1, 1, 0] * 2,
+        }
+    )
+
+    report = evaluate_quantization(str(tmp_path / "model"), dataset)
+    assert 0 <= report["int8"]["f1"] <= 1
+
+
+def test_load_quantized_model_multi_task(
+    tmp_path, save_model, tokenizer, tasks, texts
+):
+    model = save_model(
+        tmp_path / "model",
+        model_class=ToxicityMultiTaskForSequenceClassification,
+        tasks=tasks,
+    )
+    save_quantized_model(model, tokenizer, str(tmp_path / "int8"))
+
+    quantized_model = load_quantized_model(
+        str(tmp_path / "int8"), ToxicityMultiTaskForSequenceClassification
+    )
+    encoding = tokenizer(texts, padding=True, return_tensors="pt")
+    with torch.inference_mode():
+        logits = quantized_model(**encoding).logits
+        expected = quantize_model(model)(**encoding).logits
+    assert len(logits) == len(tasks)
+    for output, exp in zip(logits, expected):
+        torch.testing.assert_close(output, exp)
+
+
+def test_evaluate_quantization_multi_task(tmp_path, save_model, tasks, texts):
+    save_model(
+        tmp_path / "model",
+        model_class=ToxicityMultiTaskForSequenceClassification,
+        tasks=tasks,
+    )
+    dataset = datasets.Dataset.from_dict(
+        {
+            "text": texts * 2,
+            "toxicity_labels": [1, 0, 1, 0, 1] * 2,
+            "toxicity_type_labels": [
+                [1, 0, 0],
+                [-100] * 3,
+                [0, 1, 1],
+                [-100] * 3,
+                [1, 1, 0],
+            ]
+            * 2,
+        }
+    )
+
+    report = evaluate_quantization(
+        str(tmp_path / "model"), dataset, output_dir=str(tmp_path / "int8")
+    )
+    for task in tasks:
+        assert 0 <= report["int8"][f"{task}_f1"] <= 1
+    assert report["delta"]["size_mb"] < 0
@@ -0,0 +1,124 @@
+import json
+import datasets
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+import torch
+from src.ml.models.bert import (
+    ToxicityMultiTaskForSequenceClassification,
+    ToxicityTypeForSequenceClassification,
+)
+from src.ml.metrics.thresholds import save_thresholds
+from src.ml.score import PredictionWriter, Scorer, forward, iter_chunks, score
+
+
+def test_iter_chunks(tmp_path, texts):
+    rows = [{"id": i, "text": text} for i, text in enumerate(texts)]
+    path = tmp_path / "input.jsonl"
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+    assert [len(x) for x in iter_chunks(str(path), chunk_size=2)] == [2, 2, 1]
+    assert sum(iter_chunks(str(path), chunk_size=2), []) == rows
+
+    dataset = datasets.DatasetDict({"test": datasets.Dataset.from_list(rows)})
+    dataset.save_to_disk(str(tmp_path / "dataset"))
+    chunks = list(iter_chunks(str(tmp_path / "dataset"), chunk_size=3))
+    assert [len(x) for x in chunks] == [3, 2]
+    assert sum(chunks, []) == rows
+
+
+def test_forward(tokenizer, texts, get_config):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(num_labels=3)
+    ).eval()
+    latency = []
+    logits = forward(
+        model, tokenizer, texts, batch_size=2, on_batch=latency.append
+    )
+    assert len(latency) == 3
+
+    # The logits are returned in the order of the texts.
+    with torch.no_grad():
+        expected = model(
+            **tokenizer(texts, padding=True, return_tensors="pt")
+        ).logits
+    assert len(logits) == 1
+    torch.testing.assert_close(
+        torch.from_numpy(logits[0]), expected, atol=1e-5, rtol=0
+    )
+
+
+@pytest.mark.parametrize("extension", ["jsonl", "parquet"])
+def test_score(tmp_path, extension, texts, get_config, save_model):
+    model = ToxicityTypeForSequenceClassification(
+        get_config(), weight=torch.ones(2)
+    )
+    scorer = Scorer(save_model(model, tmp_path / "model"), batch_size=2)
+    expected = scorer(texts)
+
+    rows = [{"id": i, "text": text} for i, text in enumerate(texts)]
+    datasets.Dataset.from_list(rows).save_to_disk(str(tmp_path / "dataset"))
+
+    output_path = str(tmp_path / f"predictions.{extension}")
+    total = score(scorer, str(tmp_path / "dataset"), output_path, chunk_size=2)
+    assert total == len(texts)
+
+    if extension == "jsonl":
+        with open(output_path) as f:
+            predictions = [json.loads(line) for line in f]
+    else:
+        predictions = pq.read_table(output_path).to_pylist()
+
+    assert [x["id"] for x in predictions] == list(range(len(texts)))
+    for prediction, exp in zip(predictions, expected):
+        assert prediction["labels"] == exp["labels"]
+        assert prediction["probabilities"] == pytest.approx(
+            exp["probabilities"]
+        )
+
+
+def test_score_multi_task(tmp_path, texts, tasks, get_config, save_model):
+    model = ToxicityMultiTaskForSequenceClassification(get_config(), tasks)
+    scorer = Scorer(save_model(model, tmp_path / "model"))
+    predictions = scorer(texts)
+
+    assert len(predictions) == len(texts)
+    assert set(predictions[0]) == {
+        "toxicity_labels",
+        "toxicity_probabilities",
+        "toxicity_type_labels",
+        "toxicity_type_probabilities",
+    }
+    assert len(predictions[0]["toxicity_labels"]) == 1
+
+
+def test_score_multi_task_thresholds(
+    tmp_path, texts, tasks, get_config, save_model
+):
+    model = ToxicityMultiTaskForSequenceClassification(get_config(), tasks)
+    path = save_model(model, tmp_path / "model")
+    labels = dict(enumerate(tasks["toxicity_type"]["labels"]))
+    save_thresholds(np.array([0.0, 1.0, 0.0]), labels, path)
+
+    predictions = Scorer(path)(texts)
+    assert all(
+        x["toxicity_type_labels"] == ["insult", "sexism"] for x in predictions
+    )
+
+
+def test_prediction_writer_schema(tmp_path):
+    path = str(tmp_path / "predictions.parquet")
+    with PredictionWriter(path) as writer:
+        # The first chunk doesn't have the types of "note" and "labels".
+        writer.write([{"id": 0, "note": None, "labels": []}])
+        writer.write(
+            [
+                {"id": 1, "note": "a note", "labels": ["insult"]},
+                {"id": 2, "labels": []},
+            ]
+        )
+
+    assert pq.read_table(path).to_pylist() == [
+        {"id": 0, "note": None, "labels": []},
+        {"id": 1, "note": "a note", "labels": ["insult"]},
+        {"id": 2, "note": None, "labels": []},
+    ]
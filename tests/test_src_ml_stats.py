@@ -0,0 +1,44 @@
+import datasets
+import numpy as np
+from transformers import BertTokenizerFast
+from src.ml.stats import compute_stats, compute_token_histogram, get_lengths
+
+TEXTS = ["você é um idiota", "bom dia", "que  comentário\tmais longo", "oi"]
+
+
+def get_tokenizer(tmp_path):
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += sorted(set("".join(TEXTS).split()))
+    (tmp_path / "vocab.txt").write_text("\n".join(vocab))
+    return BertTokenizerFast(str(tmp_path / "vocab.txt"))
+
+
+def test_compute_stats():
+    dataset = datasets.Dataset.from_dict({"text": TEXTS})
+    stats = compute_stats(dataset, num_proc=2)
+
+    assert stats == {
+        "min_length": min(len(x) for x in TEXTS),
+        "max_length": max(len(x) for x in TEXTS),
+        "avg_length": round(np.mean([len(x) for x in TEXTS]), 2),
+        "min_words": 1,
+        "max_words": 4,
+        "avg_words": round(np.mean([len(x.split()) for x in TEXTS]), 2),
+    }
+
+
+def test_compute_token_stats(tmp_path):
+    tokenizer = get_tokenizer(tmp_path)
+    dataset = datasets.Dataset.from_dict({"text": TEXTS})
+
+    stats = compute_stats(dataset, tokenizer=tokenizer)
+    assert stats["min_tokens"] == 3
+    assert stats["max_tokens"] == 6
+
+    # memoized by fingerprint and reused by the histogram
+    lengths = get_lengths(dataset, tokenizer=tokenizer)
+    assert get_lengths(dataset, tokenizer=tokenizer) is lengths
+
+    histogram = compute_token_histogram(dataset, tokenizer, bins=3)
+    assert sum(histogram["counts"]) == len(TEXTS)
+    assert len(histogram["bin_edges"]) == 4